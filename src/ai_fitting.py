@@ -0,0 +1,134 @@
+import os
+import time
+import hashlib
+import tempfile
+from datetime import datetime, timedelta
+from flask import current_app
+from src.models.user import db
+from src.models.gold_price import AIFitting
+from src.job_queue import job_queue
+
+FITTING_CATEGORIES = ('ring', 'bracelet')
+PENDING_STATUSES = ('queued', 'processing')
+
+# Magic numbers of the image formats the measurement stage can decode
+IMAGE_SIGNATURES = (b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n')
+IMAGE_HEAD_BYTES = 12
+
+def is_supported_image(head):
+    """JPEG, PNG or WebP (a RIFF container whose form type is WEBP), from the first 12 bytes"""
+    return head.startswith(IMAGE_SIGNATURES) or (head[:4] == b'RIFF' and head[8:12] == b'WEBP')
+
+class UploadError(ValueError):
+    """The uploaded image is too large or not a supported image"""
+
+def upload_dir():
+    path = current_app.config.get('AI_FITTING_UPLOAD_DIR') or os.path.join(tempfile.gettempdir(), 'bilsan-fittings')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def upload_path(image_hash, directory=None):
+    """Uploads are stored by content hash, so duplicate images share one file"""
+    return os.path.join(directory or upload_dir(), image_hash)
+
+class HashingUpload:
+    """Writable file that hashes and size-checks an image while it is received.
+    
+    Used as the multipart parser's stream factory, so the upload is written
+    to the upload directory chunk by chunk as it arrives instead of being
+    buffered and copied; the SHA-256 is known as soon as the last chunk is in.
+    """
+    
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.head = b''
+        self._digest = hashlib.sha256()
+        fd, self.temp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+        self._file = os.fdopen(fd, 'w+b')
+    
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise UploadError(f'Image is larger than {self.max_bytes // (1024 * 1024)} MB')
+        if len(self.head) < IMAGE_HEAD_BYTES:
+            self.head += data[:IMAGE_HEAD_BYTES - len(self.head)]
+        self._digest.update(data)
+        return self._file.write(data)
+    
+    def seek(self, *args):
+        return self._file.seek(*args)
+    
+    def read(self, *args):
+        return self._file.read(*args)
+    
+    def close(self):
+        self._file.close()
+    
+    def finish(self):
+        """Close the file and move it to its content-addressed path; returns the hash"""
+        self._file.close()
+        if not self.size or not is_supported_image(self.head):
+            self.discard()
+            raise UploadError('Upload a JPEG, PNG or WebP image')
+        image_hash = self._digest.hexdigest()
+        os.replace(self.temp_path, upload_path(image_hash, self.directory))
+        return image_hash
+    
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+def pending_count():
+    return AIFitting.query.filter(AIFitting.status.in_(PENDING_STATUSES)).count()
+
+def submit_fitting(image_hash, category, user_id=None, session_id=None):
+    """Create a fitting for an uploaded image; the caller commits.
+    
+    If the same image was already measured for this category the result is
+    copied and the fitting is done immediately; otherwise it is queued for
+    the job workers. Returns the fitting.
+    """
+    cached = AIFitting.query.filter_by(image_hash=image_hash, category=category, status='done').order_by(
+        AIFitting.id.desc()
+    ).first()
+    fitting = AIFitting(user_id=user_id, session_id=session_id, category=category, image_hash=image_hash)
+    if cached:
+        fitting.measurements = cached.measurements
+        fitting.recommended_size = cached.recommended_size
+        fitting.confidence_score = cached.confidence_score
+        fitting.status = 'done'
+        fitting.completed_at = datetime.utcnow()
+        db.session.add(fitting)
+        return fitting
+    
+    fitting.status = 'queued'
+    db.session.add(fitting)
+    db.session.flush()
+    job_queue.enqueue('ai_fitting', {'fitting_id': fitting.id})
+    return fitting
+
+def purge_uploads():
+    """Delete uploaded images past their retention; returns files deleted.
+    
+    Results stay cached in ai_fittings by hash after the image is gone.
+    Every worker runs this task, so a file may vanish under another worker's
+    purge between listing and deleting it.
+    """
+    cutoff = time.time() - timedelta(hours=current_app.config.get('AI_FITTING_UPLOAD_RETENTION_HOURS', 24)).total_seconds()
+    directory = upload_dir()
+    deleted = 0
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                deleted += 1
+        except FileNotFoundError:
+            continue  # Purged by another worker
+    return deleted
+
+# Upload retention is enforced by the job workers
+job_queue.add_maintenance_task(purge_uploads)
@@ -0,0 +1,105 @@
+import os
+from flask import Flask, jsonify
+from flask_cors import CORS
+from src.models.user import db
+from src.routes.user import user_bp
+from src.routes.product import product_bp
+from src.routes.cart import cart_bp
+from src.routes.order import order_bp
+from src.routes.gold_price import gold_price_bp
+from src.routes.auth import auth_bp
+from src.routes.analytics import analytics_bp
+from src.routes.site_settings import site_settings_bp
+from src.security import init_security
+from src.config import config
+
+def create_app(config_name=None, web=True):
+    """Create the application.
+    
+    The web server (src/main.py) gets the full app. Job workers and CLI
+    scripts pass web=False: they share the configuration, database and
+    models but do not serve requests, so the background threads that only
+    support the web process (stock hold reaper, site settings watcher) are
+    not started. The gold price listeners are registered in every process,
+    since whichever process holds the leader lock runs the refreshes.
+    """
+    app = Flask(__name__)
+    
+    # Load configuration
+    config_name = config_name or os.environ.get('FLASK_ENV', 'development')
+    app.config.from_object(config[config_name])
+    
+    # Initialize security
+    init_security(app)
+    
+    # Enable CORS for all routes with security considerations
+    CORS(app,
+         origins=["http://localhost:5176", "http://localhost:3000"],  # Restrict origins in production
+         supports_credentials=True,
+         allow_headers=["Content-Type", "Authorization", "X-CSRF-Token", "Idempotency-Key"],
+         methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"]
+    )
+    
+    # Register blueprints
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(product_bp, url_prefix='/api')
+    app.register_blueprint(cart_bp, url_prefix='/api')
+    app.register_blueprint(order_bp, url_prefix='/api')
+    app.register_blueprint(gold_price_bp, url_prefix='/api')
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(analytics_bp, url_prefix='/api')
+    app.register_blueprint(site_settings_bp, url_prefix='/api')
+    
+    # Initialize database
+    db.init_app(app)
+    
+    # Import all models to ensure they are registered
+    from src.models.product import Product, ProductImage, ProductReview
+    from src.models.cart import Cart, CartItem, StockHold
+    from src.models.order import Order, OrderItem
+    from src.models.gold_price import GoldPrice, SizeGuide, AIFitting
+    from src.models.site_settings import SiteSettings
+    from src.models.sales_rollup import SalesDailyRollup
+    from src.models.job import Job
+    from src.models.idempotency import IdempotencyKey
+    from src.models.gold_price_history import GoldPriceTick, GoldPriceCandle
+    from src.models.price_alert import PriceAlert
+    
+    with app.app_context():
+        # create_all() leaves existing tables alone; python src/database/migrate.py upgrades them
+        db.create_all()
+    
+    @app.route('/api/health', methods=['GET'])
+    def health():
+        """Liveness probe for the load balancer (stays up in maintenance mode)"""
+        return jsonify({'status': 'ok'}), 200
+    
+    start_price_listeners(app)
+    if web:
+        start_web_background_tasks(app)
+    
+    return app
+
+def start_price_listeners(app):
+    """Handle every live gold price refresh made by this process (listeners only run in the leader)"""
+    # Keep a history of every live gold price refresh
+    from src.gold_price_history import start_recording
+    start_recording(app)
+    
+    # Push every live gold price refresh to the evented stream server
+    from src.gold_price_stream import start_stream_push
+    start_stream_push(app)
+    
+    # Check customers' price alerts on every live gold price refresh
+    from src.price_alerts import price_alert_service
+    price_alert_service.start(app)
+
+def start_web_background_tasks(app):
+    """Start the background threads of a web server process"""
+    # Release expired cart stock holds in the background
+    from src.stock_reservation_service import reservation_service
+    reservation_service.start_reaper(app)
+    
+    # Serve 503 while maintenance mode is on, from a flag kept in memory
+    from src.maintenance import init_maintenance_mode
+    init_maintenance_mode(app)
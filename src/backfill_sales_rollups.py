@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Backfill script for the daily sales rollups
+Rebuilds sales_daily_rollups from paid order history, a few days per transaction
+
+Usage:
+    python src/backfill_sales_rollups.py [--start YYYY-MM-DD] [--end YYYY-MM-DD] [--days-per-chunk 1]
+"""
+
+import os
+import sys
+import argparse
+from datetime import date
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.models.sales_rollup import SalesDailyRollup
+from src.app_factory import create_app
+
+def main():
+    """Main backfill function"""
+    parser = argparse.ArgumentParser(description='Rebuild daily sales rollups from order history')
+    parser.add_argument('--start', type=date.fromisoformat, help='first day to rebuild (default: all history)')
+    parser.add_argument('--end', type=date.fromisoformat, help='last day to rebuild (default: all history)')
+    parser.add_argument('--days-per-chunk', type=int, default=1, help='days rebuilt per transaction')
+    args = parser.parse_args()
+    
+    app = create_app(web=False)
+    with app.app_context():
+        print("📊 Backfilling daily sales rollups...")
+        processed = SalesDailyRollup.backfill(args.start, args.end, args.days_per_chunk)
+        print(f"✅ Backfill completed: {processed} paid orders aggregated")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Cart quote benchmark.
+Renders the same cart repeatedly through Cart.to_dict() and compares the time
+spent quoting with the (product_id, tick version) memo against quoting every
+line from scratch, then checks that a new gold price tick re-quotes the cart.
+
+Usage:
+    python src/benchmarks/cart_quotes.py --lines 50 --renders 200
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Keep the benchmark off the default shared snapshot
+os.environ.setdefault('GOLD_PRICE_SNAPSHOT_PATH', os.path.join(tempfile.mkdtemp(prefix='bilsan-gold-'), 'prices.snapshot'))
+
+from src.benchmarks.harness import create_test_app, create_users, create_product
+from src.models.user import db
+from src.models.cart import Cart, CartItem
+from src.gold_price_service import gold_service
+from src.quote_engine import quote_engine
+
+def time_quotes(cart, renders, memo):
+    """Seconds spent quoting the cart `renders` times"""
+    started = time.perf_counter()
+    for _ in range(renders):
+        if not memo:
+            quote_engine.clear()
+        cart.quote()
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description='Cart quote benchmark')
+    parser.add_argument('--lines', type=int, default=50)
+    parser.add_argument('--renders', type=int, default=200)
+    args = parser.parse_args()
+    
+    # Pretend the service already has a fresh tick so no request goes upstream
+    gold_service.last_success = time.time()
+    
+    app = create_test_app('sqlite://')
+    with app.app_context():
+        user_id = create_users(1)[0]
+        cart = Cart(user_id=user_id)
+        db.session.add(cart)
+        db.session.flush()
+        for i in range(args.lines):
+            db.session.add(CartItem(cart_id=cart.id, product_id=create_product(100, name=f'Quote SKU {i}'), quantity=1 + i % 3))
+        db.session.commit()
+        cart.to_dict()  # Load products and images once
+        
+        cold = time_quotes(cart, args.renders, memo=False)
+        quote_engine.hits = quote_engine.misses = 0
+        warm = time_quotes(cart, args.renders, memo=True)
+        print(f"{args.lines} lines x {args.renders} renders: "
+              f"no memo {cold * 1000:.1f} ms, memo {warm * 1000:.1f} ms "
+              f"({quote_engine.misses} misses, {quote_engine.hits} hits)")
+        assert quote_engine.misses <= args.lines, 'repeated renders within one tick re-quoted lines'
+        
+        before = cart.quote()
+        gold_service._apply_spot_price(gold_service.price_matrix['spot_usd_per_ounce'] + 20)
+        after = cart.quote()
+        assert after['tick_version'] == before['tick_version'] + 1 and after['total'] > before['total'], \
+            'a new tick did not re-quote the cart'
+        print(f"new tick: total {before['total']:.2f} -> {after['total']:.2f} SAR")
+    print("✅ quotes memoized per tick")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Concurrency harness for checkout stock decrements.
+Runs many parallel checkouts against a single SKU and verifies that stock is
+never oversold, then reports the achieved checkout throughput.
+
+Usage:
+    python src/benchmarks/checkout_concurrency.py --checkouts 500 --stock 100 --workers 32
+    python src/benchmarks/checkout_concurrency.py --database-uri mysql+pymysql://...
+"""
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.benchmarks.harness import create_test_app, create_users, create_product, checkout_payload
+from src.models.user import db
+from src.models.cart import Cart, CartItem
+from src.models.order import Order, OrderItem
+from src.models.product import Product
+
+def prepare(app, checkouts, stock):
+    """Create one SKU and one single-line cart per checkout"""
+    with app.app_context():
+        product_id = create_product(stock)
+        user_ids = create_users(checkouts)
+        for user_id in user_ids:
+            cart = Cart(user_id=user_id)
+            cart.items.append(CartItem(product_id=product_id, quantity=1))
+            db.session.add(cart)
+        db.session.commit()
+    return product_id, user_ids
+
+def run(app, user_ids, workers):
+    """Fire all checkouts in parallel and collect status codes"""
+    def checkout(user_id):
+        client = app.test_client()
+        response = client.post('/api/orders', json=checkout_payload(user_id))
+        return response.status_code
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        statuses = list(executor.map(checkout, user_ids))
+    elapsed = time.perf_counter() - started
+    return statuses, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel checkout oversell harness')
+    parser.add_argument('--checkouts', type=int, default=300)
+    parser.add_argument('--stock', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--database-uri', default=None)
+    args = parser.parse_args()
+    
+    app = create_test_app(args.database_uri)
+    product_id, user_ids = prepare(app, args.checkouts, args.stock)
+    statuses, elapsed = run(app, user_ids, args.workers)
+    
+    created = statuses.count(201)
+    rejected = statuses.count(400)
+    errors = len(statuses) - created - rejected
+    
+    with app.app_context():
+        remaining = db.session.get(Product, product_id).stock_quantity
+        orders = Order.query.count()
+        units = db.session.query(db.func.coalesce(db.func.sum(OrderItem.quantity), 0)).scalar()
+    
+    print(f"checkouts: {len(statuses)}  created: {created}  rejected: {rejected}  errors: {errors}")
+    print(f"stock: {args.stock} -> {remaining}  orders: {orders}  units sold: {units}")
+    print(f"elapsed: {elapsed:.2f}s  throughput: {len(statuses) / elapsed:.1f} checkouts/s")
+    
+    assert errors == 0, 'checkouts failed with unexpected errors'
+    assert remaining >= 0, 'stock went negative'
+    assert units == args.stock - remaining, 'units sold do not match the stock decrement'
+    assert created == min(args.checkouts, args.stock), 'oversold or undersold the SKU'
+    print("✅ no oversell")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Checkout latency versus order size.
+Builds carts with an increasing number of lines (one product per line) and
+times POST /api/orders for each size, reporting the median latency and the
+number of SQL statements a single checkout issues.
+
+Usage:
+    python src/benchmarks/checkout_lines.py --lines 1 10 100 500 --repeat 5
+    python src/benchmarks/checkout_lines.py --database-uri mysql+pymysql://...
+"""
+
+import os
+import sys
+import time
+import statistics
+import argparse
+from sqlalchemy import event, insert
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.benchmarks.harness import create_test_app, create_users, checkout_payload
+from src.models.user import db
+from src.models.cart import Cart, CartItem
+from src.models.product import Product
+
+def create_products(count, stock_quantity):
+    """Create `count` products in one bulk insert and return their ids"""
+    db.session.execute(insert(Product), [{
+        'name': f'Line SKU {i}',
+        'name_en': f'Line SKU {i}',
+        'price': 500.0 + i,
+        'category': 'women',
+        'subcategory': 'rings',
+        'gold_karat': '21k',
+        'weight': 5.0,
+        'stock_quantity': stock_quantity
+    } for i in range(count)])
+    db.session.commit()
+    return [product_id for product_id, in db.session.query(Product.id).order_by(Product.id.desc()).limit(count)]
+
+def fill_cart(user_id, product_ids):
+    """Give the user a cart with one line per product"""
+    cart = Cart(user_id=user_id)
+    db.session.add(cart)
+    db.session.flush()
+    db.session.execute(insert(CartItem), [
+        {'cart_id': cart.id, 'product_id': product_id, 'quantity': 1} for product_id in product_ids
+    ])
+    db.session.commit()
+
+def measure(app, client, line_count, repeat):
+    """Time `repeat` checkouts of a `line_count`-line cart; returns (latencies, statements)"""
+    with app.app_context():
+        product_ids = create_products(line_count, repeat)
+        user_ids = create_users(repeat, prefix=f'lines{line_count}-')
+        for user_id in user_ids:
+            fill_cart(user_id, product_ids)
+        engine = db.engine
+    
+    statements = []
+    def count_statement(*args):
+        statements[-1] += 1
+    event.listen(engine, 'before_cursor_execute', count_statement)
+    
+    latencies = []
+    try:
+        for user_id in user_ids:
+            statements.append(0)
+            started = time.perf_counter()
+            response = client.post('/api/orders', json=checkout_payload(user_id))
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 201, response.get_json()
+            assert len(response.get_json()['order']['items']) == line_count
+    finally:
+        event.remove(engine, 'before_cursor_execute', count_statement)
+    return latencies, statements
+
+def main():
+    parser = argparse.ArgumentParser(description='Checkout latency by number of order lines')
+    parser.add_argument('--lines', type=int, nargs='+', default=[1, 10, 50, 100, 250, 500])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--database-uri', default=None)
+    args = parser.parse_args()
+    
+    app = create_test_app(args.database_uri)
+    client = app.test_client()
+    
+    print(f"{'lines':>6} {'median ms':>10} {'ms/line':>8} {'statements':>11}")
+    for line_count in args.lines:
+        latencies, statements = measure(app, client, line_count, args.repeat)
+        median = statistics.median(latencies) * 1000
+        print(f"{line_count:>6} {median:>10.1f} {median / line_count:>8.2f} {max(statements):>11}")
+    print("✅ all checkouts created")
+
+if __name__ == '__main__':
+    main()
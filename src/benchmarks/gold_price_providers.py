@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Harness for parallel gold price provider aggregation.
+Runs a ProviderPool against several local fake price servers: agreeing
+providers with small delays, one returning an outlier, one failing and one
+that never answers in time. Checks that the outlier is rejected, that the
+result is the median of the agreeing answers, and that the query returns
+with the fastest agreeing quorum instead of waiting for the slow provider.
+
+Usage:
+    python src/benchmarks/gold_price_providers.py --rounds 5 --slow-delay 3
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.benchmarks.harness import FakePriceServer
+from src.gold_price_providers import JSONProvider, FixedProvider, ProviderPool
+
+def main():
+    parser = argparse.ArgumentParser(description='Gold price provider aggregation harness')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--slow-delay', type=float, default=3.0)
+    parser.add_argument('--deadline', type=float, default=2.0)
+    args = parser.parse_args()
+    
+    servers = {
+        'fast_a': FakePriceServer(price=2400.0, delay=0.05),
+        'fast_b': FakePriceServer(price=2402.0, delay=0.08),
+        'fast_c': FakePriceServer(price=2398.0, delay=0.12),
+        'outlier': FakePriceServer(price=3100.0, delay=0.01),
+        'failing': FakePriceServer(price=2400.0, status=500),
+        'slow': FakePriceServer(price=2401.0, delay=args.slow_delay)
+    }
+    for server in servers.values():
+        server.start()
+    
+    pool = ProviderPool(
+        [JSONProvider(name, server.url, [0, 'price'], timeout_seconds=args.slow_delay + 1) for name, server in servers.items()],
+        quorum=3,
+        deadline_seconds=args.deadline
+    )
+    fx_pool = ProviderPool([FixedProvider('sar_peg', 3.75)])
+    
+    latencies = []
+    try:
+        for _ in range(args.rounds):
+            started = time.perf_counter()
+            value, details = pool.query()
+            latencies.append(time.perf_counter() - started)
+            assert value == 2400.0, f'expected the median of the agreeing answers, got {value}'
+            assert 'outlier' in details['outliers'], 'outlier was not rejected'
+            assert 'failing' in details['errors']
+            assert 'slow' in details['timed_out']
+        fx, _ = fx_pool.query()
+        assert fx == 3.75
+    finally:
+        for server in servers.values():
+            server.stop()
+    
+    sequential = sum(server.delay for server in servers.values())
+    print(f"aggregate: median {statistics.median(latencies) * 1000:.0f} ms, max {max(latencies) * 1000:.0f} ms "
+          f"per refresh over {args.rounds} rounds (sequential worst case {sequential:.2f}s + timeouts)")
+    for name, stats in pool.stats_dict().items():
+        print(f"  {name:8} ok {stats['successes']}/{stats['requests']}  errors {stats['errors']}  "
+              f"outliers {stats['outliers']}  avg {stats['avg_latency_ms']} ms")
+    assert max(latencies) < args.slow_delay, 'the query waited for the slow provider'
+    print("✅ outlier rejected, quorum reached without waiting for slow providers")
+
+if __name__ == '__main__':
+    main()
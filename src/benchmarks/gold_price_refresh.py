@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Harness for the gold price refresh path.
+Runs GoldPriceService against a local fake price server and checks that
+readers never wait for the provider, that concurrent refreshes share one
+upstream request, and that the circuit breaker backs off exponentially while
+the provider fails and closes again when it recovers.
+
+Usage:
+    python src/benchmarks/gold_price_refresh.py --callers 50 --provider-delay 0.5
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.benchmarks.harness import FakePriceServer
+from src.gold_price_service import GoldPriceService
+
+def make_service(server, **kwargs):
+    """A service with its own shared snapshot, so every check starts fresh"""
+    snapshot_path = os.path.join(tempfile.mkdtemp(prefix='bilsan-gold-'), 'prices.snapshot')
+    return GoldPriceService(spot_url=server.url, timeout_seconds=2, snapshot_path=snapshot_path, **kwargs)
+
+def check_readers_do_not_block(server, delay):
+    """Reads while a slow refresh is in flight return immediately"""
+    server.delay = delay
+    service = make_service(server)
+    started = time.perf_counter()
+    prices = service.get_current_prices()  # stale, so this starts a background refresh
+    read_ms = (time.perf_counter() - started) * 1000
+    assert prices['karat24'] == 247.00, 'reader should get the last known prices'
+    assert service.get_status()['refreshing'], 'a background refresh should be running'
+    assert service.wait_for_refresh(delay + 3), 'refresh did not finish'
+    assert service.version == 1 and service.get_current_prices()['karat24'] != 247.00
+    print(f"stale read: {read_ms:.2f} ms while the provider takes {delay * 1000:.0f} ms")
+
+def check_single_flight(server, callers, delay):
+    """Concurrent update_prices() callers share a single upstream request"""
+    server.delay = delay
+    server.hits = 0
+    service = make_service(server)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        results = list(executor.map(lambda _: service.update_prices(), range(callers)))
+    elapsed = time.perf_counter() - started
+    assert server.hits == 1, f'expected 1 upstream request, got {server.hits}'
+    assert all(result['karat24'] == results[0]['karat24'] for result in results)
+    print(f"{callers} concurrent refreshes: {server.hits} upstream request in {elapsed:.2f}s")
+
+def check_circuit_breaker(server):
+    """Failures open the circuit with doubling backoff; a success closes it"""
+    server.delay = 0
+    server.status = 503
+    server.hits = 0
+    service = make_service(server, backoff_base_seconds=0.2, backoff_max_seconds=5)
+    
+    backoffs = []
+    for attempt in range(1, 4):
+        service.update_prices()
+        assert service.consecutive_failures == attempt
+        assert service.is_circuit_open()
+        hits = server.hits
+        for _ in range(20):
+            service.update_prices()  # short-circuited while open
+        assert server.hits == hits, 'requests reached the provider while the circuit was open'
+        backoffs.append(service.circuit_open_until - time.time())
+        time.sleep(max(backoffs[-1], 0) + 0.01)
+    assert backoffs[0] < backoffs[1] < backoffs[2], f'backoff did not grow: {backoffs}'
+    assert service.get_current_prices()['karat24'] == 247.00, 'last known prices should be served'
+    
+    server.status = 200
+    service.update_prices()
+    status = service.get_status()
+    assert not status['circuit_open'] and status['consecutive_failures'] == 0 and service.version == 1
+    print(f"circuit breaker: {server.hits} upstream requests for 63 refresh calls, "
+          f"backoff {' -> '.join(f'{b:.2f}s' for b in backoffs)}, closed after recovery")
+
+def main():
+    parser = argparse.ArgumentParser(description='Gold price refresh harness')
+    parser.add_argument('--callers', type=int, default=50)
+    parser.add_argument('--provider-delay', type=float, default=0.5)
+    args = parser.parse_args()
+    
+    server = FakePriceServer().start()
+    try:
+        check_readers_do_not_block(server, args.provider_delay)
+        check_single_flight(server, args.callers, args.provider_delay)
+        check_circuit_breaker(server)
+    finally:
+        server.stop()
+    print("✅ gold price refresh checks passed")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Fan-out harness for the live gold price stream.
+Serves the app on a local threaded server, opens many SSE connections to
+/api/gold-prices/stream, pushes price changes through a fake price server and
+measures how long it takes every client to receive each change. Also reports
+the CPU the server process burns while the connections sit idle.
+
+Every open stream holds one server thread, so a process serves at most
+GOLD_PRICE_MAX_STREAMS (default 200) streams and long-polls at a time; the
+harness raises the cap to the number of clients it opens.
+
+Usage:
+    python src/benchmarks/gold_price_stream.py --clients 200 --ticks 5
+"""
+
+import os
+import sys
+import time
+import json
+import socket
+import logging
+import argparse
+import tempfile
+import threading
+import statistics
+import http.client
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Keep the harness off the default shared snapshot
+os.environ.setdefault('GOLD_PRICE_SNAPSHOT_PATH', os.path.join(tempfile.mkdtemp(prefix='bilsan-gold-'), 'prices.snapshot'))
+
+from werkzeug.serving import make_server
+from src.benchmarks.harness import create_test_app, FakePriceServer
+from src.gold_price_service import gold_service
+from src.gold_price_providers import JSONProvider
+from src.gold_price_stream import broadcaster
+
+class StreamClient(threading.Thread):
+    """Reads one SSE connection and records when each price version arrived"""
+    
+    def __init__(self, port):
+        super().__init__(daemon=True)
+        self.port = port
+        self.arrivals = {}
+        self.heartbeats = 0
+        self.connected = threading.Event()
+        self.sock = None
+    
+    def run(self):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=120)
+        connection.request('GET', '/api/gold-prices/stream', headers={'Accept': 'text/event-stream'})
+        self.sock = connection.sock
+        response = connection.getresponse()
+        event_id = None
+        while True:
+            try:
+                line = response.fp.readline()
+            except OSError:
+                return  # Closed by disconnect()
+            if not line:
+                return
+            line = line.decode().rstrip('\n')
+            if line.startswith('id: '):
+                event_id = int(line[4:])
+            elif line.startswith('data: '):
+                self.arrivals.setdefault(event_id, []).append(time.perf_counter())
+                json.loads(line[6:])
+                self.connected.set()
+            elif line.startswith(': keep-alive'):
+                self.heartbeats += 1
+    
+    def disconnect(self):
+        self.sock.shutdown(socket.SHUT_RDWR)
+
+def main():
+    parser = argparse.ArgumentParser(description='Gold price SSE fan-out harness')
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--ticks', type=int, default=5)
+    parser.add_argument('--idle-seconds', type=float, default=3.0)
+    args = parser.parse_args()
+    
+    price_server = FakePriceServer().start()
+    gold_service.use_providers([JSONProvider('fake', price_server.url, [0, 'price'])])
+    gold_service.update_prices()
+    
+    app = create_test_app('sqlite://')
+    app.config['GOLD_PRICE_STREAM_HEARTBEAT_SECONDS'] = 1
+    app.config['GOLD_PRICE_MAX_STREAMS'] = args.clients
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    
+    clients = [StreamClient(server.server_port) for _ in range(args.clients)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        assert client.connected.wait(30), 'a client never received the initial prices'
+    print(f"{args.clients} clients connected")
+    
+    # One stream past the cap is turned away instead of taking another thread
+    connection = http.client.HTTPConnection('127.0.0.1', server.server_port, timeout=10)
+    connection.request('GET', '/api/gold-prices/stream')
+    over_cap = connection.getresponse()
+    over_cap.read()
+    connection.close()
+    assert over_cap.status == 503 and over_cap.getheader('Retry-After'), 'a stream past the cap was accepted'
+    
+    # Idle: no price change, only heartbeats should flow
+    cpu_before = time.process_time()
+    time.sleep(args.idle_seconds)
+    idle_cpu = time.process_time() - cpu_before
+    
+    latencies = []
+    for _ in range(args.ticks):
+        price_server.price += 5
+        started = time.perf_counter()
+        gold_service.update_prices()
+        version = gold_service.version
+        deadline = time.monotonic() + 10
+        while any(version not in client.arrivals for client in clients):
+            assert time.monotonic() < deadline, f'version {version} did not reach every client'
+            time.sleep(0.005)
+        latencies.append(max(client.arrivals[version][0] for client in clients) - started)
+    
+    # Disconnected streams give their slot back (on the next heartbeat write at the latest)
+    for client in clients:
+        client.disconnect()
+    deadline = time.monotonic() + 10
+    while broadcaster.subscribers and time.monotonic() < deadline:
+        time.sleep(0.05)
+    leaked = broadcaster.subscribers
+    
+    server.shutdown()
+    price_server.stop()
+    
+    duplicates = sum(len(times) - 1 for client in clients for times in client.arrivals.values())
+    print(f"idle: {idle_cpu * 1000:.0f} ms CPU over {args.idle_seconds:.0f}s with {args.clients} open streams, "
+          f"{sum(client.heartbeats for client in clients)} heartbeats")
+    print(f"fan-out to all clients: median {statistics.median(latencies) * 1000:.1f} ms, "
+          f"max {max(latencies) * 1000:.1f} ms over {args.ticks} price changes")
+    assert duplicates == 0, f'{duplicates} duplicate events'
+    assert all(len(client.arrivals) == args.ticks + 1 for client in clients), 'clients received unchanged prices'
+    assert leaked == 0, f'{leaked} stream slots leaked after the clients disconnected'
+    print("✅ every client got each change exactly once")
+
+if __name__ == '__main__':
+    main()
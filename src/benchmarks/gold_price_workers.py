@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Multi-process harness for the shared gold price snapshot.
+Starts several worker processes that all run GoldPriceService against one
+snapshot file and a local fake price server, the way preforked WSGI workers
+would. Checks that exactly one process fetches from the provider, that every
+worker reads the same prices, that restarting auto-update does not add
+updater threads, and that another worker takes over when the leader dies
+halfway through the run.
+
+Usage:
+    python src/benchmarks/gold_price_workers.py --workers 4 --interval-seconds 0.5
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.benchmarks.harness import FakePriceServer
+
+def worker(index, spot_url, snapshot_path, interval_seconds, duration, results, leader_killed):
+    """One 'WSGI worker': starts auto-update (twice) and reads prices in a loop.
+    
+    The first leader exits abruptly halfway through to simulate a crash.
+    """
+    import contextlib, io
+    from src.gold_price_service import GoldPriceService
+    
+    service = GoldPriceService(spot_url=spot_url, timeout_seconds=2, snapshot_path=snapshot_path,
+                               max_age_seconds=3600)
+    service.leader_retry_seconds = 0.2
+    with contextlib.redirect_stdout(io.StringIO()):
+        first = service.start_auto_update(interval_seconds / 60)
+        second = service.start_auto_update(interval_seconds / 60)
+        
+        reads = 0
+        seen = {}
+        crashed = False
+        started = time.monotonic()
+        while time.monotonic() - started < duration:
+            prices = service.get_current_prices()
+            seen.setdefault(prices['version'], set()).add(prices['karat24'])
+            reads += 1
+            if service.leader.is_leader() and time.monotonic() - started > duration / 2 and not leader_killed.is_set():
+                leader_killed.set()
+                crashed = True
+                break
+    
+    results.put({
+        'worker': index,
+        'pid': os.getpid(),
+        'leader': service.leader.is_leader(),
+        'restart_started_thread': second,
+        'first_started_thread': first,
+        'reads': reads,
+        'version': service.version,
+        'consistent': all(len(prices) == 1 for prices in seen.values()),
+        'crashed': crashed
+    })
+    if crashed:
+        results.close()
+        results.join_thread()
+        os._exit(1)  # Exit without cleanup; the OS releases the leader lock
+
+def main():
+    parser = argparse.ArgumentParser(description='Shared gold price snapshot harness')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--interval-seconds', type=float, default=0.5)
+    parser.add_argument('--duration', type=float, default=3.0)
+    args = parser.parse_args()
+    
+    server = FakePriceServer().start()
+    snapshot_path = os.path.join(tempfile.mkdtemp(prefix='bilsan-gold-'), 'prices.snapshot')
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    leader_killed = context.Event()
+    
+    processes = [
+        context.Process(target=worker, args=(
+            i, server.url, snapshot_path, args.interval_seconds, args.duration, results, leader_killed
+        ))
+        for i in range(args.workers)
+    ]
+    try:
+        for process in processes:
+            process.start()
+        # Move the price so every new version has a new value
+        started = time.monotonic()
+        while time.monotonic() - started < args.duration:
+            server.price += 1
+            time.sleep(args.interval_seconds / 2)
+        outcome = [results.get(timeout=args.duration + 30) for _ in processes]
+        for process in processes:
+            process.join()
+    finally:
+        server.stop()
+    
+    crashed = [result for result in outcome if result['crashed']]
+    survivors = [result for result in outcome if not result['crashed']]
+    leaders = [result for result in survivors if result['leader']]
+    versions = [result['version'] for result in survivors]
+    max_fetches = 2 * (args.duration / args.interval_seconds + 2)
+    
+    print(f"{args.workers} workers, {server.hits} upstream requests in {args.duration:.1f}s "
+          f"(interval {args.interval_seconds}s)")
+    print(f"crashed leader pid {[r['pid'] for r in crashed]} at version {[r['version'] for r in crashed]}, "
+          f"new leader pid {[r['pid'] for r in leaders]}, final versions {versions}")
+    print(f"reads per worker: {[r['reads'] for r in outcome]}")
+    
+    assert len(crashed) == 1, 'the first leader should have crashed halfway'
+    assert len(leaders) == 1, 'exactly one surviving worker must take over'
+    assert server.hits <= max_fetches, 'followers fetched from the provider'
+    assert all(r['first_started_thread'] and not r['restart_started_thread'] for r in outcome), \
+        'restarting auto-update spawned another updater'
+    assert all(r['consistent'] for r in outcome), 'a version was seen with different prices'
+    assert min(versions) > crashed[0]['version'], 'prices stopped updating after the leader crashed'
+    assert max(versions) - min(versions) <= 1, f'workers disagree on the version: {versions}'
+    print("✅ one leader, consistent snapshot, failover works")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Shared helpers for the benchmark and concurrency scripts.
+Builds a minimal Flask app against a throwaway database so the scripts never
+touch the development database in src/database/app.db.
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from flask import Flask
+from src.models.user import db, User
+from src.models.product import Product, ProductImage, ProductReview
+from src.models.cart import Cart, CartItem
+from src.models.order import Order, OrderItem
+from src.models.gold_price import GoldPrice, SizeGuide, AIFitting
+from src.models.site_settings import SiteSettings
+from src.models.sales_rollup import SalesDailyRollup
+from src.models.job import Job
+from src.models.idempotency import IdempotencyKey
+from src.models.gold_price_history import GoldPriceTick, GoldPriceCandle
+from src.models.price_alert import PriceAlert
+from src.routes.cart import cart_bp
+from src.routes.order import order_bp
+from src.routes.analytics import analytics_bp
+from src.routes.gold_price import gold_price_bp
+
+def create_test_app(database_uri=None):
+    """Create an app with the order/cart/analytics/gold price blueprints on a fresh database"""
+    if database_uri is None:
+        fd, path = tempfile.mkstemp(prefix='bilsan-bench-', suffix='.db')
+        os.close(fd)
+        database_uri = f"sqlite:///{path}"
+    
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    if database_uri.startswith('sqlite'):
+        # Let concurrent writers wait for the database lock instead of failing
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30}}
+    
+    db.init_app(app)
+    app.register_blueprint(cart_bp, url_prefix='/api')
+    app.register_blueprint(order_bp, url_prefix='/api')
+    app.register_blueprint(analytics_bp, url_prefix='/api')
+    app.register_blueprint(gold_price_bp, url_prefix='/api')
+    
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    
+    return app
+
+def create_users(count, prefix='bench'):
+    """Create `count` users and return their ids"""
+    users = [
+        User(name=f'{prefix} {i}', email=f'{prefix}{i}@example.com', password_hash='x')
+        for i in range(count)
+    ]
+    db.session.add_all(users)
+    db.session.commit()
+    return [user.id for user in users]
+
+def create_product(stock_quantity, price=1000.0, name='Bench SKU'):
+    """Create a single active product and return its id"""
+    product = Product(
+        name=name,
+        name_en=name,
+        price=price,
+        category='women',
+        subcategory='rings',
+        gold_karat='21k',
+        weight=5.0,
+        stock_quantity=stock_quantity
+    )
+    db.session.add(product)
+    db.session.commit()
+    return product.id
+
+def checkout_payload(user_id):
+    """Minimal valid body for POST /api/orders"""
+    return {
+        'user_id': user_id,
+        'payment_method': 'cash_on_delivery',
+        'shipping_name': 'Bench',
+        'shipping_phone': '+966500000000',
+        'shipping_address': 'Bench street',
+        'shipping_city': 'Riyadh',
+        'shipping_country': 'SA'
+    }
+
+class FakePriceServer:
+    """Local HTTP server imitating the spot price API (`[{"price": ...}]`).
+    
+    `price`, `delay` (seconds before answering) and `status` can be changed
+    while the server runs; `hits` counts the requests it received.
+    """
+    
+    def __init__(self, price=2400.0, delay=0.0, status=200):
+        self.price = price
+        self.delay = delay
+        self.status = status
+        self.hits = 0
+        self._hits_lock = threading.Lock()
+        self._server = None
+    
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/spot/gold"
+    
+    def start(self):
+        fake = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with fake._hits_lock:
+                    fake.hits += 1
+                time.sleep(fake.delay)
+                body = json.dumps([{'price': fake.price}]).encode()
+                self.send_response(fake.status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+    
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Price alert benchmark.
+Loads a large number of active price alerts into a throwaway database, then
+replays a series of gold price ticks through PriceAlertService.evaluate() and
+compares the per-tick cost with a naive scan over every alert. Checks that
+each tick triggers exactly the alerts the naive scan finds and that the
+notifications are queued as batched jobs.
+
+Usage:
+    python src/benchmarks/price_alerts.py --alerts 1000000 --ticks 20
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Keep the benchmark off the default shared snapshot
+os.environ.setdefault('GOLD_PRICE_SNAPSHOT_PATH', os.path.join(tempfile.mkdtemp(prefix='bilsan-gold-'), 'prices.snapshot'))
+
+from sqlalchemy import insert
+from src.benchmarks.harness import create_test_app, create_users
+from src.models.user import db
+from src.models.job import Job
+from src.models.price_alert import PriceAlert
+from src.price_alerts import PriceAlertService
+
+KARAT_PRICES = {'18k': 185.50, '21k': 216.25, '24k': 247.00}
+
+def create_alerts(count, user_ids, chunk_size=50000):
+    """Insert `count` alerts with targets spread ±15% around today's price; returns them as tuples"""
+    rng = random.Random(42)
+    alerts = []
+    for start in range(0, count, chunk_size):
+        rows = []
+        for i in range(start + 1, min(start + chunk_size, count) + 1):
+            karat = rng.choice(list(KARAT_PRICES))
+            direction = rng.choice(('below', 'above'))
+            base = KARAT_PRICES[karat]
+            # 'below' alerts wait for a drop, 'above' alerts for a rise
+            target = round(base * (1 - rng.uniform(0.001, 0.15)) if direction == 'below'
+                           else base * (1 + rng.uniform(0.001, 0.15)), 2)
+            rows.append({'id': i, 'user_id': rng.choice(user_ids), 'karat': karat,
+                         'direction': direction, 'target_price': target, 'is_active': True})
+            alerts.append((i, karat, direction, target))
+        db.session.execute(insert(PriceAlert), rows)
+    db.session.commit()
+    return alerts
+
+def naive_triggered(alerts, prices, fired):
+    """Scan every alert, the way a tick would without the index"""
+    triggered = []
+    for alert_id, karat, direction, target in alerts:
+        if alert_id in fired:
+            continue
+        price = prices[karat]
+        if (direction == 'below' and price <= target) or (direction == 'above' and price >= target):
+            triggered.append(alert_id)
+    return triggered
+
+def main():
+    parser = argparse.ArgumentParser(description='Price alert benchmark')
+    parser.add_argument('--alerts', type=int, default=1000000)
+    parser.add_argument('--ticks', type=int, default=20)
+    parser.add_argument('--users', type=int, default=1000)
+    args = parser.parse_args()
+    
+    app = create_test_app()
+    with app.app_context():
+        user_ids = create_users(args.users)
+        started = time.perf_counter()
+        alerts = create_alerts(args.alerts, user_ids)
+        print(f"inserted {args.alerts} alerts in {time.perf_counter() - started:.1f}s")
+        
+        service = PriceAlertService()
+        started = time.perf_counter()
+        service.index.sync()
+        print(f"index loaded in {time.perf_counter() - started:.2f}s ({len(service.index)} alerts)")
+        
+        # Time the bisect lookups on their own, apart from the database writes
+        lookup_times = []
+        pop_triggered = service.index.pop_triggered
+        def timed_pop_triggered(karat, price):
+            started = time.perf_counter()
+            try:
+                return pop_triggered(karat, price)
+            finally:
+                lookup_times[-1] += time.perf_counter() - started
+        service.index.pop_triggered = timed_pop_triggered
+        
+        # A random walk of prices, drifting a little further from today's price every tick
+        rng = random.Random(7)
+        prices = dict(KARAT_PRICES)
+        fired = set()
+        index_times, naive_times, triggered_total = [], [], 0
+        for _ in range(args.ticks):
+            prices = {karat: round(price * (1 + rng.uniform(-0.01, 0.01)), 2) for karat, price in prices.items()}
+            
+            started = time.perf_counter()
+            expected = naive_triggered(alerts, prices, fired)
+            naive_times.append(time.perf_counter() - started)
+            
+            lookup_times.append(0.0)
+            started = time.perf_counter()
+            triggered = service.evaluate(prices)
+            db.session.commit()
+            index_times.append(time.perf_counter() - started)
+            
+            assert triggered == len(expected), f'index triggered {triggered}, scan found {len(expected)}'
+            fired.update(expected)
+            triggered_total += triggered
+        
+        jobs = Job.query.filter_by(job_type='price_alerts_triggered').all()
+        queued = sum(len(job.payload['alert_ids']) for job in jobs)
+        still_active = PriceAlert.query.filter_by(is_active=True).count()
+    
+    print(f"{args.ticks} ticks, {triggered_total} alerts triggered in {len(jobs)} jobs")
+    print(f"per tick: index lookup median {statistics.median(lookup_times) * 1000:.2f} ms, "
+          f"naive scan median {statistics.median(naive_times) * 1000:.1f} ms")
+    print(f"per tick with deactivation and job inserts: median {statistics.median(index_times) * 1000:.1f} ms")
+    assert queued == triggered_total, 'triggered alerts missing from the notification jobs'
+    assert still_active == args.alerts - triggered_total, 'triggered alerts are still active'
+    assert len(service.index) == still_active, 'the index still holds triggered alerts'
+    print("✅ every crossed alert triggered once, in batches")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Fan-out harness for the evented gold price stream server.
+Runs src/price_stream_server.py on its own event loop thread, opens many SSE
+connections and long-polls to it, refreshes the prices through a fake price
+server (the leader's listener pushes each version to the stream server) and
+measures how long it takes every client to receive each change.
+
+Usage:
+    python src/benchmarks/price_stream_server.py --clients 2000 --polls 200 --ticks 5
+"""
+
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+import tempfile
+import threading
+import statistics
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Keep the harness off the default shared snapshot
+os.environ.setdefault('GOLD_PRICE_SNAPSHOT_PATH', os.path.join(tempfile.mkdtemp(prefix='bilsan-gold-'), 'prices.snapshot'))
+
+from src.benchmarks.harness import create_test_app, FakePriceServer
+from src.gold_price_service import gold_service
+from src.gold_price_providers import JSONProvider
+from src.gold_price_stream import start_stream_push
+from src.price_stream_server import PriceStreamServer, raise_open_file_limit, STREAM_PATH, POLL_PATH, PUBLISH_PATH
+
+def run_loop(loop):
+    asyncio.set_event_loop(loop)
+    loop.run_forever()
+
+class Clients:
+    """SSE and long-poll clients, all coroutines on one client-side event loop"""
+    
+    def __init__(self, port):
+        self.port = port
+        self.arrivals = {}  # client index -> {version: [arrival times]}
+        self.poll_answers = []
+        self.connected = 0
+        self.heartbeats = 0
+    
+    async def stream(self, index):
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port, limit=1 << 20)
+        writer.write(f"GET {STREAM_PATH} HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n\r\n".encode())
+        await writer.drain()
+        arrivals = self.arrivals.setdefault(index, {})
+        event_id = None
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            line = line.decode().rstrip('\n')
+            if line.startswith('id: '):
+                event_id = int(line[4:])
+            elif line.startswith('data: '):
+                arrivals.setdefault(event_id, []).append(time.perf_counter())
+                json.loads(line[6:])
+                if len(arrivals) == 1:
+                    self.connected += 1
+            elif line.startswith(': keep-alive'):
+                self.heartbeats += 1
+    
+    async def poll(self, version):
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        writer.write(f"GET {POLL_PATH}?version={version}&timeout=30 HTTP/1.1\r\nHost: bench\r\n\r\n".encode())
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        self.poll_answers.append(json.loads(response.split(b'\r\n\r\n', 1)[1]))
+
+def main():
+    parser = argparse.ArgumentParser(description='Evented gold price stream fan-out harness')
+    parser.add_argument('--clients', type=int, default=2000)
+    parser.add_argument('--polls', type=int, default=200)
+    parser.add_argument('--ticks', type=int, default=5)
+    parser.add_argument('--idle-seconds', type=float, default=3.0)
+    args = parser.parse_args()
+    raise_open_file_limit()
+    
+    price_server = FakePriceServer().start()
+    gold_service.use_providers([JSONProvider('fake', price_server.url, [0, 'price'])])
+    gold_service.update_prices()  # Publishes the first version to the shared snapshot
+    
+    server_loop = asyncio.new_event_loop()
+    threading.Thread(target=run_loop, args=(server_loop,), daemon=True).start()
+    stream_server = PriceStreamServer(gold_service.snapshot, heartbeat_seconds=1, max_connections=args.clients + args.polls + 10)
+    listener = asyncio.run_coroutine_threadsafe(stream_server.start('127.0.0.1', 0), server_loop).result()
+    port = listener.sockets[0].getsockname()[1]
+    
+    # The leader pushes each refresh to the stream server, as in production
+    app = create_test_app('sqlite://')
+    app.config['GOLD_PRICE_STREAM_PUBLISH_URL'] = f"http://127.0.0.1:{port}{PUBLISH_PATH}"
+    start_stream_push(app)
+    
+    client_loop = asyncio.new_event_loop()
+    threading.Thread(target=run_loop, args=(client_loop,), daemon=True).start()
+    clients = Clients(port)
+    # Keep the futures: the loop only holds weak references to its tasks
+    streams = [asyncio.run_coroutine_threadsafe(clients.stream(index), client_loop) for index in range(args.clients)]
+    deadline = time.monotonic() + 60
+    while clients.connected < args.clients:
+        assert time.monotonic() < deadline, f'only {clients.connected} of {args.clients} clients received the initial prices'
+        time.sleep(0.05)
+    polls = [asyncio.run_coroutine_threadsafe(clients.poll(gold_service.version), client_loop) for _ in range(args.polls)]
+    time.sleep(0.5)
+    print(f"{args.clients} streams and {args.polls} long-polls open, "
+          f"{threading.active_count()} threads in the process")
+    
+    # Idle: no price change, only heartbeats should flow
+    cpu_before = time.process_time()
+    time.sleep(args.idle_seconds)
+    idle_cpu = time.process_time() - cpu_before
+    
+    latencies = []
+    for _ in range(args.ticks):
+        price_server.price += 5
+        started = time.perf_counter()
+        gold_service.update_prices()
+        version = gold_service.version
+        deadline = time.monotonic() + 10
+        while any(version not in arrivals for arrivals in clients.arrivals.values()):
+            assert time.monotonic() < deadline, f'version {version} did not reach every client'
+            time.sleep(0.005)
+        latencies.append(max(arrivals[version][0] for arrivals in clients.arrivals.values()) - started)
+    for poll in polls:
+        poll.result(10)
+    
+    assert stream_server.connections == args.clients, 'streams were dropped'
+    for stream in streams:
+        stream.cancel()
+    price_server.stop()
+    
+    duplicates = sum(len(times) - 1 for arrivals in clients.arrivals.values() for times in arrivals.values())
+    print(f"idle: {idle_cpu * 1000:.0f} ms CPU over {args.idle_seconds:.0f}s (server and clients) with "
+          f"{args.clients} open streams, {clients.heartbeats} heartbeats")
+    print(f"fan-out to all clients: median {statistics.median(latencies) * 1000:.1f} ms, "
+          f"max {max(latencies) * 1000:.1f} ms over {args.ticks} price changes")
+    assert duplicates == 0, f'{duplicates} duplicate events'
+    assert all(len(arrivals) == args.ticks + 1 for arrivals in clients.arrivals.values()), 'clients received unchanged prices'
+    assert all(answer['changed'] for answer in clients.poll_answers), 'a long-poll answered without a change'
+    print("✅ every client got each change exactly once from one event loop")
+
+if __name__ == '__main__':
+    main()
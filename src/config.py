@@ -21,6 +21,69 @@ class Config:
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Cart stock reservations
+    STOCK_HOLD_MINUTES = int(os.environ.get('STOCK_HOLD_MINUTES', '15'))
+    STOCK_HOLD_REAPER_INTERVAL_SECONDS = int(os.environ.get('STOCK_HOLD_REAPER_INTERVAL_SECONDS', '60'))
+    
+    # Background job queue
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '5'))
+    JOB_VISIBILITY_TIMEOUT_SECONDS = int(os.environ.get('JOB_VISIBILITY_TIMEOUT_SECONDS', '300'))
+    
+    # Idempotency-Key records for checkout and payment retries
+    IDEMPOTENCY_KEY_TTL_HOURS = int(os.environ.get('IDEMPOTENCY_KEY_TTL_HOURS', '24'))
+    
+    # Order archival (delivered/cancelled orders untouched for this many days)
+    ORDER_ARCHIVE_AFTER_DAYS = int(os.environ.get('ORDER_ARCHIVE_AFTER_DAYS', '60'))
+    ORDER_ARCHIVE_BATCH_SIZE = int(os.environ.get('ORDER_ARCHIVE_BATCH_SIZE', '500'))
+    
+    # Gold price history retention (1d candles are kept forever)
+    GOLD_TICK_RETENTION_DAYS = int(os.environ.get('GOLD_TICK_RETENTION_DAYS', '7'))
+    GOLD_CANDLE_1M_RETENTION_DAYS = int(os.environ.get('GOLD_CANDLE_1M_RETENTION_DAYS', '30'))
+    GOLD_CANDLE_1H_RETENTION_DAYS = int(os.environ.get('GOLD_CANDLE_1H_RETENTION_DAYS', '730'))
+    
+    # Live gold price stream (/gold-prices/stream) and long-poll (/gold-prices/poll)
+    GOLD_PRICE_STREAM_HEARTBEAT_SECONDS = int(os.environ.get('GOLD_PRICE_STREAM_HEARTBEAT_SECONDS', '15'))
+    GOLD_PRICE_STREAM_MAX_SECONDS = int(os.environ.get('GOLD_PRICE_STREAM_MAX_SECONDS', '600'))
+    GOLD_PRICE_LONG_POLL_SECONDS = int(os.environ.get('GOLD_PRICE_LONG_POLL_SECONDS', '25'))
+    # Production serves both from the evented stream server (src/price_stream_server.py); the leader
+    # pushes each new version to it. The in-app routes hold a thread per client and are capped (503 beyond).
+    GOLD_PRICE_STREAM_PUBLISH_URL = os.environ.get('GOLD_PRICE_STREAM_PUBLISH_URL')  # e.g. http://127.0.0.1:5001/internal/gold-prices/publish
+    GOLD_PRICE_STREAM_SERVER_MAX_CONNECTIONS = int(os.environ.get('GOLD_PRICE_STREAM_SERVER_MAX_CONNECTIONS', '10000'))
+    GOLD_PRICE_MAX_STREAMS = int(os.environ.get('GOLD_PRICE_MAX_STREAMS', '200'))
+    
+    # Gold price alerts: triggered alerts are notified in jobs of this many alerts
+    PRICE_ALERT_BATCH_SIZE = int(os.environ.get('PRICE_ALERT_BATCH_SIZE', '500'))
+    
+    # Live quotes for gold items: weight × karat rate + making charge, VAT added on the order subtotal
+    GOLD_MAKING_CHARGE_PER_GRAM = float(os.environ.get('GOLD_MAKING_CHARGE_PER_GRAM', '30'))
+    VAT_RATE = float(os.environ.get('VAT_RATE', '0.15'))
+    PRICE_LOCK_SECONDS = int(os.environ.get('PRICE_LOCK_SECONDS', '600'))
+    
+    # AI fitting: images are measured by the job workers
+    AI_FITTING_UPLOAD_DIR = os.environ.get('AI_FITTING_UPLOAD_DIR')  # Defaults to a temp directory
+    AI_FITTING_MAX_UPLOAD_MB = int(os.environ.get('AI_FITTING_MAX_UPLOAD_MB', '5'))
+    AI_FITTING_MAX_PENDING = int(os.environ.get('AI_FITTING_MAX_PENDING', '100'))
+    AI_FITTING_RETRY_AFTER_SECONDS = int(os.environ.get('AI_FITTING_RETRY_AFTER_SECONDS', '5'))
+    AI_FITTING_PIXELS_PER_MM = float(os.environ.get('AI_FITTING_PIXELS_PER_MM', '10'))
+    AI_FITTING_UPLOAD_RETENTION_HOURS = int(os.environ.get('AI_FITTING_UPLOAD_RETENTION_HOURS', '24'))
+    AI_FITTING_STREAM_MAX_SECONDS = int(os.environ.get('AI_FITTING_STREAM_MAX_SECONDS', '120'))
+    
+    # Site settings: how often each worker checks the settings row for changes
+    SITE_SETTINGS_CHECK_SECONDS = int(os.environ.get('SITE_SETTINGS_CHECK_SECONDS', '2'))
+    MAINTENANCE_RETRY_AFTER_SECONDS = int(os.environ.get('MAINTENANCE_RETRY_AFTER_SECONDS', '300'))
+    
+    # Customer notifications (order updates, price alerts) are emailed over SMTP by the job workers
+    MAIL_SERVER = os.environ.get('MAIL_SERVER')
+    MAIL_PORT = int(os.environ.get('MAIL_PORT', '587'))
+    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', 'true').lower() == 'true'
+    MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
+    MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'no-reply@bilsan.com')
+    MAIL_SUPPRESS_SEND = False  # Log instead of sending
+    
+    # Authenticated requests: how long a user's role and security version are cached
+    AUTH_CACHE_TTL_SECONDS = int(os.environ.get('AUTH_CACHE_TTL_SECONDS', '30'))
+    
     # Security settings
     WTF_CSRF_ENABLED = True
     SESSION_COOKIE_SECURE = True
@@ -29,6 +92,7 @@ class Config:
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    MAIL_SUPPRESS_SEND = os.environ.get('MAIL_SERVER') is None
     # Use SQLite for development
     SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
 
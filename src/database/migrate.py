@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Schema upgrades for existing databases.
+db.create_all() creates missing tables but never changes a table that already
+exists, so columns and indexes added to existing tables are listed here and
+applied by upgrade_schema(). The app does not alter the schema on startup:
+run this script once per deployment, before starting the new web and worker
+processes. Every step checks the live schema first, so running it again is
+a no-op. The statements are plain SQL that MySQL and SQLite both accept.
+
+Usage:
+    python src/database/migrate.py
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import inspect, text
+
+# (table, column, column definition, statement filling in existing rows or None)
+COLUMNS = [
+    # Account security columns missing from databases created before them
+    ('users', 'failed_login_attempts', 'INTEGER DEFAULT 0', None),
+    ('users', 'account_locked_until', 'DATETIME', None),
+    ('users', 'password_changed_at', 'DATETIME', None),
+    ('users', 'two_factor_enabled', 'BOOLEAN DEFAULT 0', None),
+    ('users', 'two_factor_secret', 'VARCHAR(32)', None),
+    ('products', 'reserved_quantity', 'INTEGER NOT NULL DEFAULT 0', None),
+    ('products', 'making_charge', 'FLOAT', None),
+    ('size_guides', 'updated_at', 'DATETIME', None),
+    ('ai_fittings', 'image_hash', 'VARCHAR(64)', None),
+    # Fittings stored before the job queue were measured synchronously
+    ('ai_fittings', 'status', 'VARCHAR(20)', "UPDATE ai_fittings SET status = 'done' WHERE status IS NULL"),
+    ('ai_fittings', 'error', 'TEXT', None),
+    ('ai_fittings', 'completed_at', 'DATETIME', None),
+    ('site_settings', 'version', 'INTEGER NOT NULL DEFAULT 1', None),
+    ('users', 'security_version', 'INTEGER NOT NULL DEFAULT 1', None),
+    ('price_alerts', 'notified_at', 'DATETIME', None),
+]
+
+# (index name, table, columns, unique, statement run before creating it or None)
+INDEXES = [
+    ('ix_order_items_order_id', 'order_items', ('order_id',), False, None),
+    # Keep the latest row of any duplicated karat/currency before making the pair unique
+    ('uq_gold_prices_karat_currency', 'gold_prices', ('karat', 'currency'), True,
+     'DELETE FROM gold_prices WHERE id NOT IN '
+     '(SELECT id FROM (SELECT MAX(id) AS id FROM gold_prices GROUP BY karat, currency) AS latest)'),
+    ('ix_ai_fittings_status', 'ai_fittings', ('status',), False, None),
+    ('ix_ai_fittings_image_hash_category', 'ai_fittings', ('image_hash', 'category'), False, None),
+    ('ix_ai_fittings_user_id_id', 'ai_fittings', ('user_id', 'id'), False, None),
+    ('ix_ai_fittings_session_id_id', 'ai_fittings', ('session_id', 'id'), False, None),
+    ('ix_price_alerts_created_at', 'price_alerts', ('created_at',), False, None),
+]
+
+def upgrade_schema(engine):
+    """Add the missing columns and indexes in one transaction; returns what was applied"""
+    applied = []
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        tables = set(inspector.get_table_names())
+        
+        columns = {}
+        for table, column, definition, backfill in COLUMNS:
+            if table not in tables:
+                continue
+            if table not in columns:
+                columns[table] = {existing['name'] for existing in inspector.get_columns(table)}
+            if column in columns[table]:
+                continue
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+            if backfill:
+                connection.execute(text(backfill))
+            columns[table].add(column)
+            applied.append(f"{table}.{column}")
+        
+        for name, table, index_columns, unique, before in INDEXES:
+            if table not in tables:
+                continue
+            existing = {index['name'] for index in inspector.get_indexes(table)}
+            existing.update(constraint['name'] for constraint in inspector.get_unique_constraints(table))
+            if name in existing:
+                continue
+            if before:
+                connection.execute(text(before))
+            connection.execute(text(
+                f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {table} ({', '.join(index_columns)})"
+            ))
+            applied.append(name)
+    
+    return applied
+
+if __name__ == "__main__":
+    from src.models.user import db
+    from src.app_factory import create_app
+    
+    # Creates the missing tables, then alters the existing ones
+    app = create_app(web=False)
+    with app.app_context():
+        applied = upgrade_schema(db.engine)
+    if applied:
+        print("Applied: " + ", ".join(applied))
+    else:
+        print("✅ Schema is up to date")
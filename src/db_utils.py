@@ -0,0 +1,35 @@
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from src.models.user import db
+
+def upsert(model, rows, index_elements, update=None):
+    """Insert rows, updating existing ones on a unique-key conflict, in one statement.
+    
+    Uses INSERT ... ON DUPLICATE KEY UPDATE on MySQL and INSERT ... ON CONFLICT
+    on SQLite/PostgreSQL. `index_elements` names the columns of the unique
+    index. `update(existing, incoming)` returns {column: expression} for the
+    conflict case, where `existing` is the table's columns and `incoming` the
+    values that failed to insert; by default every non-key column is
+    overwritten with the incoming value.
+    """
+    if not rows:
+        return None
+    
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+    
+    if update is None:
+        columns = [key for key in rows[0] if key not in index_elements]
+        update = lambda existing, incoming: {key: incoming[key] for key in columns}
+    
+    if dialect == 'mysql':
+        statement = mysql.insert(table).values(rows)
+        statement = statement.on_duplicate_key_update(update(table.c, statement.inserted))
+    else:
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        statement = insert(table).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=index_elements,
+            set_=update(table.c, statement.excluded)
+        )
+    
+    return db.session.execute(statement)
@@ -0,0 +1,112 @@
+import math
+from datetime import datetime
+import numpy as np
+from PIL import Image
+from flask import current_app
+from src.models.user import db
+from src.models.gold_price import AIFitting
+from src.ai_fitting import upload_path
+from src.job_queue import job_queue
+
+# AI fitting runs in the job worker processes, so CPU-bound image work never
+# blocks a request worker. Handlers may run more than once for the same job.
+
+# Longest image side measured; larger photos are downscaled first
+MEASURE_MAX_SIDE = 1024
+
+def otsu_threshold(pixels):
+    """Grey level that best separates the image into two classes, and how well (0-1)"""
+    histogram = np.bincount(pixels.ravel(), minlength=256).astype(np.float64)
+    probabilities = histogram / histogram.sum()
+    levels = np.arange(256)
+    weight = np.cumsum(probabilities)
+    mean = np.cumsum(probabilities * levels)
+    total_mean = mean[-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        between = (total_mean * weight - mean) ** 2 / (weight * (1 - weight))
+    between = np.nan_to_num(between)
+    threshold = int(np.argmax(between))
+    total_variance = float(np.sum(probabilities * (levels - total_mean) ** 2))
+    separability = float(between[threshold] / total_variance) if total_variance else 0.0
+    return threshold, separability
+
+def measure_image(path, pixels_per_mm):
+    """Measure the hand/wrist in a photo; returns (measurements in mm, confidence).
+    
+    The image is segmented with Otsu's threshold and the class covering the
+    centre of the frame is taken as the hand. Its width is the median row
+    width over the middle of the object, the length its vertical extent, and
+    the circumference is estimated as π × width.
+    """
+    with Image.open(path) as image:
+        original_width = image.width
+        image.draft('L', (MEASURE_MAX_SIDE, MEASURE_MAX_SIDE))  # Cheap JPEG downscale while decoding
+        image = image.convert('L')
+        image.thumbnail((MEASURE_MAX_SIDE, MEASURE_MAX_SIDE))
+        pixels = np.asarray(image, dtype=np.uint8)
+    scale = pixels.shape[1] / original_width
+    pixels_per_mm = pixels_per_mm * scale
+    
+    threshold, separability = otsu_threshold(pixels)
+    mask = pixels > threshold
+    height, width = mask.shape
+    if not mask[height // 2, width // 2]:
+        mask = ~mask
+    
+    row_widths = mask.sum(axis=1)
+    rows = np.flatnonzero(row_widths)
+    if rows.size == 0:
+        raise ValueError('No hand or wrist found in the image')
+    middle = row_widths[rows[0] + rows.size // 4:rows[0] + 3 * rows.size // 4 + 1]
+    width_mm = float(np.median(middle)) / pixels_per_mm
+    length_mm = rows.size / pixels_per_mm
+    
+    # Confidence drops when the object fills (or barely appears in) the frame
+    coverage = float(mask.mean())
+    confidence = separability * (1 - abs(coverage - 0.35) / 0.65)
+    measurements = {
+        'width': round(width_mm, 1),
+        'length': round(length_mm, 1),
+        'circumference': round(math.pi * width_mm, 1)
+    }
+    return measurements, round(min(max(confidence, 0.0), 1.0), 2)
+
+def recommended_size(category, circumference):
+    if category == 'ring':
+        return 'M' if circumference < 60 else 'L'
+    return 'S' if circumference < 160 else 'M'  # bracelet
+
+@job_queue.handler('ai_fitting')
+def process_fitting(payload):
+    """Measure one uploaded image (or reuse the result for an identical image)"""
+    fitting = db.session.get(AIFitting, payload['fitting_id'])
+    if not fitting or fitting.status in ('done', 'failed'):
+        return
+    
+    cached = AIFitting.query.filter(
+        AIFitting.image_hash == fitting.image_hash,
+        AIFitting.category == fitting.category,
+        AIFitting.status == 'done'
+    ).first()
+    if cached:
+        measurements, confidence = cached.measurements, cached.confidence_score
+    else:
+        fitting.status = 'processing'
+        db.session.commit()
+        try:
+            measurements, confidence = measure_image(
+                upload_path(fitting.image_hash),
+                current_app.config.get('AI_FITTING_PIXELS_PER_MM', 10.0)
+            )
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            # A bad or missing image does not get better on retry
+            fitting.status = 'failed'
+            fitting.error = str(e)
+            fitting.completed_at = datetime.utcnow()
+            return
+    
+    fitting.measurements = measurements
+    fitting.confidence_score = confidence
+    fitting.recommended_size = recommended_size(fitting.category, measurements['circumference'])
+    fitting.status = 'done'
+    fitting.completed_at = datetime.utcnow()
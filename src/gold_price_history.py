@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from src.models.user import db
+from src.models.gold_price import GoldPrice
+from src.models.gold_price_history import GoldPriceTick, GoldPriceCandle
+from src.gold_price_service import gold_service
+from src.job_queue import job_queue
+
+# GoldPriceService keys -> karat names used in the database
+SERVICE_KARATS = {'karat18': '18k', 'karat21': '21k', 'karat24': '24k'}
+
+_recording_apps = set()
+
+def service_prices_by_karat(prices):
+    """{'karat21': 216.25, ...} -> {'21k': 216.25, ...}"""
+    return {karat: prices.get(key) for key, karat in SERVICE_KARATS.items()}
+
+def start_recording(app):
+    """Save every successful GoldPriceService refresh to gold_prices and the tick history (once per app).
+    
+    This is the only place live prices are persisted, so each refreshed
+    version is written exactly once, whatever triggered the refresh.
+    """
+    if id(app) in _recording_apps:
+        return
+    _recording_apps.add(id(app))
+    
+    def record(prices):
+        with app.app_context():
+            try:
+                GoldPrice.save_prices([
+                    {'karat': karat, 'price_per_gram': price}
+                    for karat, price in service_prices_by_karat(prices).items()
+                    if price is not None
+                ], source='api_auto')
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Gold price history error: {e}")
+    
+    gold_service.add_listener(record)
+
+def compact_history():
+    """Delete raw ticks and fine candles past their retention; returns rows deleted.
+    
+    Ticks are already folded into the candles when they are recorded, so
+    compaction only has to drop what is no longer needed.
+    """
+    now = datetime.utcnow()
+    deleted = GoldPriceTick.query.filter(
+        GoldPriceTick.recorded_at < now - timedelta(days=current_app.config.get('GOLD_TICK_RETENTION_DAYS', 7))
+    ).delete(synchronize_session=False)
+    
+    retention = {
+        '1m': current_app.config.get('GOLD_CANDLE_1M_RETENTION_DAYS', 30),
+        '1h': current_app.config.get('GOLD_CANDLE_1H_RETENTION_DAYS', 730)
+    }
+    for resolution, days in retention.items():
+        deleted += GoldPriceCandle.query.filter(
+            GoldPriceCandle.resolution == resolution,
+            GoldPriceCandle.bucket_start < now - timedelta(days=days)
+        ).delete(synchronize_session=False)
+    
+    db.session.commit()
+    return deleted
+
+# Retention is enforced by the job workers
+job_queue.add_maintenance_task(compact_history)
@@ -0,0 +1,195 @@
+import time
+import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+
+class PriceProvider:
+    """A source of one number: a spot price (USD per troy ounce) or an FX rate.
+    
+    Subclasses implement fetch(); it must return a positive float or raise.
+    """
+    
+    def __init__(self, name, timeout_seconds=5):
+        self.name = name
+        self.timeout_seconds = timeout_seconds
+    
+    def fetch(self):
+        raise NotImplementedError
+
+class JSONProvider(PriceProvider):
+    """GET a JSON document and read the value at `path` (keys / list indexes)"""
+    
+    def __init__(self, name, url, path, timeout_seconds=5, scale=1.0):
+        super().__init__(name, timeout_seconds)
+        self.url = url
+        self.path = path
+        self.scale = scale
+    
+    def fetch(self):
+        response = requests.get(self.url, timeout=self.timeout_seconds)
+        response.raise_for_status()
+        value = response.json()
+        for key in self.path:
+            value = value[key]
+        return float(value) * self.scale
+
+class FixedProvider(PriceProvider):
+    """A constant, e.g. a pegged exchange rate such as USD/SAR 3.75"""
+    
+    def __init__(self, name, value):
+        super().__init__(name, timeout_seconds=0)
+        self.value = value
+    
+    def fetch(self):
+        return self.value
+
+class ProviderStats:
+    """Request counters and latency of one provider"""
+    
+    def __init__(self):
+        self.requests = 0
+        self.successes = 0
+        self.errors = 0
+        self.late = 0  # Answered after the pool's deadline or quorum
+        self.outliers = 0
+        self.total_latency = 0.0
+        self.last_latency = None
+        self.last_value = None
+        self.last_error = None
+    
+    def to_dict(self):
+        return {
+            'requests': self.requests,
+            'successes': self.successes,
+            'errors': self.errors,
+            'late': self.late,
+            'outliers': self.outliers,
+            'avg_latency_ms': round(self.total_latency / self.successes * 1000, 1) if self.successes else None,
+            'last_latency_ms': round(self.last_latency * 1000, 1) if self.last_latency is not None else None,
+            'last_value': self.last_value,
+            'last_error': self.last_error
+        }
+
+class ProviderPool:
+    """Queries several providers of the same value concurrently and aggregates them.
+    
+    query() returns as soon as `quorum` answers agree (each within
+    `tolerance` of the median of all answers so far), or when every provider
+    answered or `deadline_seconds` passed. Answers far from the median are
+    rejected as outliers and the median of the rest is returned, so refresh
+    latency is that of the fastest agreeing quorum rather than the sum of
+    timeouts. Providers still running when query() returns finish in the
+    background; their outcome only counts in the stats, and they are skipped
+    by later queries until they do, so a hung provider never holds more than
+    one thread.
+    """
+    
+    def __init__(self, providers, quorum=None, deadline_seconds=5, tolerance=0.02):
+        self.providers = list(providers)
+        self.quorum = quorum or len(self.providers) // 2 + 1
+        self.deadline_seconds = deadline_seconds
+        self.tolerance = tolerance
+        self.stats = {provider.name: ProviderStats() for provider in self.providers}
+        self._in_flight = {}
+        self._stats_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(len(self.providers), 1),
+                                            thread_name_prefix='price-provider')
+    
+    def _call(self, provider):
+        started = time.perf_counter()
+        try:
+            value = provider.fetch()
+            if not value or value <= 0:
+                raise ValueError(f'invalid value {value!r}')
+            return value, time.perf_counter() - started
+        except Exception as e:
+            with self._stats_lock:
+                stats = self.stats[provider.name]
+                stats.errors += 1
+                stats.last_error = str(e)
+            raise
+    
+    def _agreeing(self, answers):
+        """Split answers {name: value} into (kept, outliers) around their median"""
+        median = statistics.median(answers.values())
+        kept = {name: value for name, value in answers.items() if abs(value - median) <= median * self.tolerance}
+        outliers = {name: value for name, value in answers.items() if name not in kept}
+        return kept, outliers
+    
+    def query(self):
+        """Aggregate value, or None if no quorum agreed before the deadline.
+        
+        Returns (value, details) where details lists the answers used, the
+        rejected outliers, failures and providers that did not answer in time.
+        """
+        futures = {}
+        busy = []
+        for provider in self.providers:
+            previous = self._in_flight.get(provider.name)
+            if previous is not None and not previous.done():
+                busy.append(provider.name)
+                continue
+            future = self._executor.submit(self._call, provider)
+            self._in_flight[provider.name] = future
+            futures[future] = provider
+        with self._stats_lock:
+            for provider in futures.values():
+                self.stats[provider.name].requests += 1
+        
+        deadline = time.monotonic() + self.deadline_seconds
+        answers, errors = {}, {}
+        pending = set(futures)
+        
+        while pending:
+            done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                break  # Deadline
+            for future in done:
+                provider = futures[future]
+                try:
+                    value, latency = future.result()
+                except Exception as e:
+                    errors[provider.name] = str(e)
+                    continue
+                answers[provider.name] = value
+                with self._stats_lock:
+                    stats = self.stats[provider.name]
+                    stats.successes += 1
+                    stats.total_latency += latency
+                    stats.last_latency = latency
+                    stats.last_value = value
+                    stats.last_error = None
+            if answers and len(self._agreeing(answers)[0]) >= self.quorum:
+                break
+        
+        for future in pending:
+            # Too slow for this round; count it when (if) it answers
+            future.add_done_callback(lambda future, name=futures[future].name: self._record_late(name, future))
+        
+        details = {
+            'answers': answers,
+            'errors': errors,
+            'timed_out': sorted([futures[future].name for future in pending] + busy),
+            'outliers': {}
+        }
+        if not answers:
+            return None, details
+        
+        kept, outliers = self._agreeing(answers)
+        details['outliers'] = outliers
+        with self._stats_lock:
+            for name in outliers:
+                self.stats[name].outliers += 1
+        if len(kept) < min(self.quorum, len(answers)) or not kept:
+            return None, details
+        return statistics.median(kept.values()), details
+    
+    def _record_late(self, name, future):
+        if future.exception() is None:
+            with self._stats_lock:
+                self.stats[name].late += 1
+    
+    def stats_dict(self):
+        with self._stats_lock:
+            return {name: stats.to_dict() for name, stats in self.stats.items()}
@@ -1,124 +1,451 @@
-import requests
 import json
+import os
+import random
+import tempfile
 from datetime import datetime
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.shared_snapshot import SharedSnapshot, LeaderLock
+from src.gold_price_providers import JSONProvider, FixedProvider, ProviderPool
+
+# محاور جدول الأسعار: العيارات والعملات ووحدات الوزن (بالجرام)
+MATRIX_KARATS = (9, 14, 18, 21, 22, 24)
+MATRIX_CURRENCIES = ('SAR', 'USD', 'AED', 'KWD')
+MATRIX_UNITS = {'gram': 1.0, 'ounce': 31.1035, 'tola': 11.6638}
+CURRENCY_DECIMALS = {'KWD': 3}  # الدينار الكويتي بثلاث خانات عشرية (فلس)
+TROY_OUNCE_GRAMS = 31.1035
+
+def build_price_matrix(gold_usd_per_ounce, fx_rates):
+    """جدول الأسعار (عيار × عملة × وحدة) من سعر الأونصة بالدولار وأسعار الصرف.
+    
+    كل قيمة هي حاصل ضرب سعر جرام الذهب الخالص بالدولار في ثلاثة متجهات
+    عوامل (النقاء karat/24، سعر الصرف، وزن الوحدة)، أي جداء خارجي يُحسب
+    مرة واحدة لكل تحديث. values[i][j][k] تقابل karats[i] وcurrencies[j]
+    وunits[k].
+    """
+    usd_per_gram = gold_usd_per_ounce / TROY_OUNCE_GRAMS
+    purities = [karat / 24 for karat in MATRIX_KARATS]
+    rates = [(fx_rates[currency], CURRENCY_DECIMALS.get(currency, 2)) for currency in MATRIX_CURRENCIES]
+    grams = list(MATRIX_UNITS.values())
+    return {
+        'karats': [f"{karat}k" for karat in MATRIX_KARATS],
+        'currencies': list(MATRIX_CURRENCIES),
+        'units': list(MATRIX_UNITS),
+        'spot_usd_per_ounce': round(gold_usd_per_ounce, 2),
+        'fx_rates': {currency: fx_rates[currency] for currency in MATRIX_CURRENCIES},
+        'values': [
+            [[round(usd_per_gram * purity * rate * weight, decimals) for weight in grams] for rate, decimals in rates]
+            for purity in purities
+        ]
+    }
+
+def matrix_price(matrix, karat, currency='SAR', unit='gram'):
+    """سعر واحد من جدول الأسعار، مثل matrix_price(matrix, '21k')"""
+    return matrix['values'][matrix['karats'].index(karat)][matrix['currencies'].index(currency)][matrix['units'].index(unit)]
+
+def matrix_prices_by_karat(matrix, currency='SAR', unit='gram'):
+    """أسعار كل عيارات الجدول بعملة ووحدة واحدة، مثل {'9k': 92.7, ..., '24k': 247.0}"""
+    return {karat: matrix_price(matrix, karat, currency, unit) for karat in matrix['karats']}
 
 class GoldPriceService:
-    def __init__(self):
+    """خدمة أسعار الذهب.
+    
+    الطلبات تقرأ آخر أسعار معروفة فوراً ولا تنتظر المزود الخارجي أبداً؛
+    التحديث يتم في خيط خلفي واحد فقط في كل مرة (single-flight). عند فشل
+    المزود يُفتح قاطع الدائرة (circuit breaker) لفترة تتضاعف مع كل فشل متتالٍ
+    فلا تُرسل طلبات إليه حتى تنتهي هذه الفترة.
+    
+    عند تشغيل عدة عمليات (workers) تجلب الأسعار عملية قائدة واحدة فقط يتم
+    انتخابها بقفل ملف، وتنشر النتيجة في ملف مشترك (mmap) تقرأ منه كل العمليات
+    دون أقفال.
+    
+    سعر الأونصة وسعر الصرف يُجلبان من عدة مزودين بالتوازي (ProviderPool)
+    ويُؤخذ الوسيط بعد استبعاد القيم الشاذة.
+    """
+    
+    def __init__(self, spot_url=None, fallback_url=None, timeout_seconds=5, max_age_seconds=1800,
+                 backoff_base_seconds=30, backoff_max_seconds=1800, snapshot_path=None,
+                 spot_providers=None, fx_providers=None, currency_providers=None):
         # يمكن الحصول على API key مجاني من metals-api.com
         self.api_key = "YOUR_API_KEY_HERE"  # يجب استبدالها بـ API key حقيقي
         self.base_url = "https://metals-api.com/api"
+        # عناوين المزود قابلة للتغيير (مثلاً لخادم أسعار وهمي في الاختبارات)
+        self.spot_url = spot_url or os.environ.get('GOLD_PRICE_API_URL', 'https://api.metals.live/v1/spot/gold')
+        self.fallback_url = fallback_url or os.environ.get('GOLD_PRICE_FALLBACK_API_URL', self.spot_url)
+        self.timeout_seconds = timeout_seconds
+        # أسعار صرف الدولار (آخر قيم معروفة)
+        self.fx_rates = {'USD': 1.0, 'SAR': 3.75, 'AED': 3.6725, 'KWD': 0.307}
+        self.usd_to_sar = self.fx_rates['SAR']  # سعر تحويل الدولار للريال السعودي
+        
+        # رقم إصدار يزيد مع كل تحديث ناجح للأسعار (مشترك بين العمليات)
+        self.version = 0
+        # أسعار افتراضية حتى أول تحديث (عيار 24 بسعر 247 ريال للجرام)
+        self._apply_spot_price(247.00 / self.usd_to_sar * TROY_OUNCE_GRAMS, version=0)
+        
+        # مزودو سعر الأونصة بالدولار وسعر صرف الدولار مقابل الريال
+        if spot_providers is None:
+            spot_providers = [JSONProvider('spot_primary', self.spot_url, [0, 'price'], timeout_seconds)]
+            if self.fallback_url != self.spot_url:
+                spot_providers.append(JSONProvider('spot_fallback', self.fallback_url, [0, 'price'], timeout_seconds))
+        if fx_providers is None:
+            fx_providers = [FixedProvider('sar_peg', 3.75)]
+            if os.environ.get('GOLD_FX_API_URL'):
+                fx_providers.append(JSONProvider('fx_api', os.environ['GOLD_FX_API_URL'], ['rates', 'SAR'], timeout_seconds))
+        if currency_providers is None:
+            currency_providers = {'AED': [FixedProvider('aed_peg', 3.6725)]}
+            if os.environ.get('GOLD_FX_API_URL'):
+                currency_providers['AED'].append(JSONProvider('fx_api', os.environ['GOLD_FX_API_URL'], ['rates', 'AED'], timeout_seconds))
+                currency_providers['KWD'] = [JSONProvider('fx_api', os.environ['GOLD_FX_API_URL'], ['rates', 'KWD'], timeout_seconds)]
+            # الدينار الكويتي غير مربوط بالدولار: بدون GOLD_FX_API_URL يبقى على آخر قيمة معروفة
+        self.fx_pools = {}
+        self._query_executor = ThreadPoolExecutor(max_workers=len(MATRIX_CURRENCIES), thread_name_prefix='fx-query')
+        self.use_providers(spot_providers, fx_providers, currency_providers)
+        self.provider_stats = {}
+        
+        self.last_success = None  # time.time() لآخر تحديث ناجح
+        self.max_age_seconds = max_age_seconds
+        
+        # اللقطة المشتركة بين العمليات وقفل انتخاب العملية القائدة
+        snapshot_path = snapshot_path or os.environ.get(
+            'GOLD_PRICE_SNAPSHOT_PATH', os.path.join(tempfile.gettempdir(), 'bilsan-gold-prices.snapshot')
+        )
+        self.snapshot = SharedSnapshot(snapshot_path)
+        self.leader = LeaderLock(snapshot_path + '.lock')
+        # إعداد التحديث التلقائي وطلبات التحديث مشتركة بين العمليات عبر ملفين:
+        # أي عملية تكتبهما والعملية القائدة وحدها تنفذهما
+        self.auto_update_path = snapshot_path + '.auto-update'
+        self.refresh_request_path = snapshot_path + '.refresh-request'
+        self.leader_retry_seconds = 15
+        self.poll_seconds = 1.0  # كل كم ثانية تفحص العملية القائدة الإعداد والطلبات
+        self.update_interval_seconds = None
+        self._interval_read_at = None
+        self._refresh_requested_at = 0
+        self._updater_thread = None
+        self._updater_lock = threading.Lock()
+        
+        # قاطع الدائرة
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.consecutive_failures = 0
+        self.circuit_open_until = 0
+        self.last_error = None
+        
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self._listeners = []
+    
+    def _apply_spot_price(self, gold_usd_per_ounce, version=None):
+        """حساب جدول الأسعار وأسعار العيارات من سعر الأونصة بالدولار ونشرها"""
+        if version is None:
+            version = self.version + 1
+        last_updated = datetime.now().isoformat()
+        matrix = build_price_matrix(gold_usd_per_ounce, self.fx_rates)
+        matrix.update(version=version, last_updated=last_updated)
+        
+        # استبدال القواميس كاملة (مع رقم الإصدار) حتى لا يرى القراء أسعاراً نصف محدثة
+        self.price_matrix = matrix
         self.current_prices = {
-            'karat18': 185.50,
-            'karat21': 216.25,
-            'karat24': 247.00,
-            'last_updated': datetime.now().isoformat()
+            'karat18': matrix_price(matrix, '18k'),
+            'karat21': matrix_price(matrix, '21k'),
+            'karat24': matrix_price(matrix, '24k'),
+            'last_updated': last_updated,
+            'version': version
         }
-        self.usd_to_sar = 3.75  # سعر تحويل الدولار للريال السعودي
+        self.version = version
+    
+    def use_providers(self, spot_providers=None, fx_providers=None, currency_providers=None):
+        """استبدال مزودي سعر الأونصة و/أو سعر صرف الريال و/أو أسعار صرف العملات الأخرى ({العملة: مزودون})"""
+        if spot_providers is not None:
+            self.spot_pool = ProviderPool(spot_providers, deadline_seconds=self.timeout_seconds)
+        if fx_providers is not None:
+            self.fx_pools['SAR'] = ProviderPool(fx_providers, deadline_seconds=self.timeout_seconds)
+        for currency, providers in (currency_providers or {}).items():
+            self.fx_pools[currency] = ProviderPool(providers, deadline_seconds=self.timeout_seconds)
+    
+    def fetch_prices(self):
+        """جلب سعر الأونصة وسعر الصرف من كل المزودين بالتوازي.
         
-    def get_live_gold_price(self):
-        """جلب أسعار الذهب الحية من API"""
-        try:
-            # استخدام API مجاني للحصول على أسعار الذهب
-            url = "https://api.metals.live/v1/spot/gold"
-            response = requests.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                gold_usd_per_ounce = data[0]["price"]
-                    
-                # تحويل إلى ريال سعودي لكل جرام
-                gold_sar_per_gram = (gold_usd_per_ounce / 31.1035) * self.usd_to_sar
-                    
-                # حساب أسعار العيارات المختلفة
-                karat24_price = gold_sar_per_gram
-                karat21_price = gold_sar_per_gram * (21/24)
-                karat18_price = gold_sar_per_gram * (18/24)
-                    
-                self.current_prices = {
-                    'karat18': round(karat18_price, 2),
-                    'karat21': round(karat21_price, 2),
-                    'karat24': round(karat24_price, 2),
-                    'last_updated': datetime.now().isoformat()
-                }
-                    
-                print(f"تم تحديث أسعار الذهب: {self.current_prices}")
-                return True
+        المدة الكلية محدودة بأسرع مجموعة متفقة من المزودين (أو بالمهلة)، وليس
+        بمجموع مهل المزودين.
+        """
+        fx_futures = {currency: self._query_executor.submit(pool.query) for currency, pool in self.fx_pools.items()}
+        spot, spot_details = self.spot_pool.query()
+        
+        fx_rates = dict(self.fx_rates)
+        for currency, future in fx_futures.items():
+            rate, fx_details = future.result()
+            if rate:
+                fx_rates[currency] = rate
             else:
-                print(f"خطأ في الاتصال: {response.status_code}")
-                return False
-                
-        except requests.exceptions.RequestException as e:
-            print(f"خطأ في الشبكة: {e}")
+                # الاستمرار بآخر سعر صرف معروف
+                print(f"تعذر تحديث سعر صرف {currency}، استخدام {fx_rates[currency]}: {fx_details}")
+        self.fx_rates = fx_rates
+        self.usd_to_sar = fx_rates['SAR']
+        
+        if spot is None:
+            self.last_error = f"no agreeing spot price: {spot_details}"
+            print(f"خطأ في جلب سعر الذهب: {spot_details}")
             return False
+        
+        self._apply_spot_price(spot)
+        print(f"تم تحديث أسعار الذهب: {self.current_prices}")
+        return True
+    
+    def is_circuit_open(self):
+        return time.time() < self.circuit_open_until
+    
+    def backoff_seconds(self, failures):
+        """مدة فتح القاطع بعد عدد من الإخفاقات المتتالية (تتضاعف مع عشوائية بسيطة)"""
+        delay = min(self.backoff_base_seconds * (2 ** max(failures - 1, 0)), self.backoff_max_seconds)
+        return delay * random.uniform(0.8, 1.2)
+    
+    def _refresh(self):
+        """محاولة واحدة لجلب الأسعار مع تحديث حالة قاطع الدائرة"""
+        try:
+            success = self.fetch_prices()
         except Exception as e:
+            self.last_error = str(e)
             print(f"خطأ عام: {e}")
+            success = False
+        self.provider_stats = {
+            'spot': self.spot_pool.stats_dict(),
+            'fx': {currency: pool.stats_dict() for currency, pool in self.fx_pools.items()}
+        }
+        
+        if success:
+            self.consecutive_failures = 0
+            self.circuit_open_until = 0
+            self.last_error = None
+            self.last_success = time.time()
+        else:
+            self.consecutive_failures += 1
+            backoff = self.backoff_seconds(self.consecutive_failures)
+            self.circuit_open_until = time.time() + backoff
+            # استخدام آخر أسعار معروفة حتى يُعاد فتح الاتصال
+            print(f"فشل في جلب الأسعار من جميع المصادر، استخدام آخر أسعار معروفة لمدة {backoff:.0f} ثانية")
+        
+        self._publish()
+        if success:
+            self._notify_listeners()
+        return success
+    
+    def _publish(self):
+        """نشر الحالة الحالية في اللقطة المشتركة (العملية القائدة فقط)"""
+        self.snapshot.write({
+            'prices': self.current_prices,
+            'matrix': self.price_matrix,
+            'version': self.version,
+            'last_success': self.last_success,
+            'consecutive_failures': self.consecutive_failures,
+            'circuit_open_until': self.circuit_open_until,
+            'last_error': self.last_error,
+            'usd_to_sar': self.usd_to_sar,
+            'fx_rates': self.fx_rates,
+            'providers': self.provider_stats
+        })
+    
+    def _sync_from_snapshot(self, force=False):
+        """اعتماد آخر حالة نشرتها العملية القائدة (قراءة بدون أقفال)"""
+        if self.leader.is_leader() and not force:
+            return
+        state = self.snapshot.read()
+        if not state or state['version'] < self.version:
+            return
+        self.price_matrix = state.get('matrix', self.price_matrix)
+        self.current_prices = state['prices']
+        self.version = state['version']
+        self.last_success = state['last_success']
+        self.consecutive_failures = state['consecutive_failures']
+        self.circuit_open_until = state['circuit_open_until']
+        self.last_error = state['last_error']
+        self.usd_to_sar = state.get('usd_to_sar', self.usd_to_sar)
+        self.fx_rates = state.get('fx_rates', self.fx_rates)
+        self.provider_stats = state.get('providers', {})
+    
+    def _try_lead(self):
+        """تولي القيادة إن لم تكن هناك عملية قائدة؛ يعيد True إذا كانت هذه العملية هي القائدة"""
+        if self.leader.is_leader():
+            return True
+        if not self.leader.acquire():
             return False
+        # العملية القائدة الجديدة تكمل من آخر حالة منشورة
+        self._sync_from_snapshot(force=True)
+        # العملية القائدة تشغّل حلقة التحديث دائماً، أياً كانت العملية التي طلبت التحديث التلقائي
+        self._start_updater()
+        return True
     
-    def get_fallback_prices(self):
-        """الحصول على أسعار احتياطية في حالة فشل API"""
-        try:
-            # يمكن استخدام API بديل مجاني
-            url = "https://api.metals.live/v1/spot/gold"
-            response = requests.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                gold_usd_per_ounce = data[0]['price']
-                
-                # تحويل إلى ريال سعودي لكل جرام
-                gold_sar_per_gram = (gold_usd_per_ounce / 31.1035) * self.usd_to_sar
-                
-                # حساب أسعار العيارات المختلفة
-                karat24_price = gold_sar_per_gram
-                karat21_price = gold_sar_per_gram * (21/24)
-                karat18_price = gold_sar_per_gram * (18/24)
-                
-                self.current_prices = {
-                    'karat18': round(karat18_price, 2),
-                    'karat21': round(karat21_price, 2),
-                    'karat24': round(karat24_price, 2),
-                    'last_updated': datetime.now().isoformat()
-                }
-                
-                print(f"تم تحديث أسعار الذهب من المصدر البديل: {self.current_prices}")
-                return True
-        except:
+    def _auto_update_interval(self):
+        """فترة التحديث التلقائي المشتركة بالثواني (None إذا لم يُفعّل)، تُقرأ مرة كل poll_seconds"""
+        now = time.monotonic()
+        if self._interval_read_at is None or now - self._interval_read_at >= self.poll_seconds:
+            try:
+                with open(self.auto_update_path) as f:
+                    self.update_interval_seconds = json.load(f).get('interval_seconds')
+            except (OSError, ValueError):
+                pass
+            self._interval_read_at = now
+        return self.update_interval_seconds
+    
+    def _request_refresh(self):
+        """طلب تحديث من العملية القائدة بتحديث وقت تعديل ملف الطلبات (مرة كل poll_seconds على الأكثر)"""
+        now = time.time()
+        if now - self._refresh_requested_at < self.poll_seconds:
+            return
+        self._refresh_requested_at = now
+        with open(self.refresh_request_path, 'a'):
             pass
+        os.utime(self.refresh_request_path, (now, now))
+    
+    def _refresh_requested_since(self, timestamp):
+        try:
+            return os.stat(self.refresh_request_path).st_mtime > timestamp
+        except FileNotFoundError:
+            return False
+    
+    def is_overdue(self):
+        """هل تأخر التحديث التلقائي عن موعده (مثلاً لتوقف العملية القائدة)"""
+        interval = self._auto_update_interval()
+        if interval is None or self.last_success is None:
+            return False
+        return time.time() - self.last_success > interval + max(self.poll_seconds, self.timeout_seconds)
+    
+    def refresh_async(self):
+        """بدء تحديث في الخلفية إن لم يكن هناك تحديث جارٍ ولم يكن القاطع مفتوحاً.
         
-        return False
+        لا تجلب الأسعار إلا العملية القائدة؛ بقية العمليات تقرأ ما تنشره
+        وتطلب منها التحديث. يعيد True إذا بدأ تحديث جديد.
+        """
+        with self._lock:
+            if self._refresh_thread and self._refresh_thread.is_alive():
+                return False
+            if not self._try_lead():
+                self._request_refresh()
+                return False
+            if self.is_circuit_open():
+                return False
+            self._refresh_thread = threading.Thread(target=self._refresh, daemon=True)
+            self._refresh_thread.start()
+            return True
+    
+    def wait_for_refresh(self, timeout=None):
+        """انتظار انتهاء التحديث الجاري (إن وجد) لمدة أقصاها timeout ثانية"""
+        thread = self._refresh_thread
+        if thread:
+            thread.join(timeout)
+        return not (thread and thread.is_alive())
+    
+    def is_stale(self):
+        return self.last_success is None or time.time() - self.last_success > self.max_age_seconds
     
     def update_prices(self):
-        """تحديث أسعار الذهب"""
-        success = self.get_live_gold_price()
-        
-        if not success:
-            # محاولة استخدام مصدر بديل
-            success = self.get_fallback_prices()
+        """تحديث أسعار الذهب.
         
-        if not success:
-            # استخدام أسعار افتراضية محدثة يدوياً
-            print("فشل في جلب الأسعار من جميع المصادر، استخدام الأسعار الافتراضية")
-            
+        الطلبات المتزامنة تشترك في نفس عملية الجلب بدلاً من أن يجلب كل منها
+        بنفسه، ولا يتم أي جلب أثناء فتح قاطع الدائرة.
+        """
+        self.refresh_async()
+        self.wait_for_refresh()
+        self._sync_from_snapshot()
         return self.current_prices
     
     def get_current_prices(self):
-        """الحصول على الأسعار الحالية"""
+        """الحصول على الأسعار الحالية فوراً، مع تحديثها في الخلفية إذا كانت قديمة"""
+        self._sync_from_snapshot()
+        if self.is_stale() or self.is_overdue():
+            self.refresh_async()
         return self.current_prices
     
+    def get_price_matrix(self):
+        """جدول الأسعار الكامل (عيار × عملة × وحدة) لآخر تحديث، بنفس شروط get_current_prices"""
+        self.get_current_prices()
+        return self.price_matrix
+    
+    def get_status(self):
+        """حالة التحديث وقاطع الدائرة"""
+        self._sync_from_snapshot()
+        return {
+            'version': self.version,
+            'stale': self.is_stale(),
+            'leader': self.leader.is_leader(),
+            'refreshing': bool(self._refresh_thread and self._refresh_thread.is_alive()),
+            'auto_update_interval_seconds': self._auto_update_interval(),
+            'age_seconds': round(time.time() - self.last_success, 1) if self.last_success is not None else None,
+            'consecutive_failures': self.consecutive_failures,
+            'circuit_open': self.is_circuit_open(),
+            'retry_in_seconds': round(max(self.circuit_open_until - time.time(), 0), 1),
+            'last_error': self.last_error,
+            'usd_to_sar': self.usd_to_sar,
+            'fx_rates': self.fx_rates,
+            'providers': self.provider_stats
+        }
+    
+    def add_listener(self, callback):
+        """تسجيل دالة تُستدعى بالأسعار الجديدة بعد كل تحديث ناجح"""
+        self._listeners.append(callback)
+    
+    def _notify_listeners(self):
+        prices = self.current_prices
+        for callback in self._listeners:
+            try:
+                callback(prices)
+            except Exception as e:
+                print(f"خطأ في مستمع الأسعار: {e}")
+    
     def start_auto_update(self, interval_minutes=30):
-        """بدء التحديث التلقائي للأسعار"""
-        def update_loop():
-            while True:
-                self.update_prices()
-                time.sleep(interval_minutes * 60)  # تحويل الدقائق إلى ثوان
-        
-        # تشغيل التحديث في خيط منفصل
-        update_thread = threading.Thread(target=update_loop, daemon=True)
-        update_thread.start()
-        print(f"تم بدء التحديث التلقائي كل {interval_minutes} دقيقة")
+        """بدء التحديث التلقائي للأسعار.
+        
+        الفترة تُنشر لكل العمليات، فتلتزم بها العملية القائدة أياً كانت
+        العملية التي استقبلت الطلب. آمنة للاستدعاء أكثر من مرة: إذا كان خيط
+        التحديث يعمل يتم تغيير الفترة فقط. في كل عملية خيط واحد؛ العملية
+        القائدة تجلب الأسعار وبقية العمليات تحاول تولي القيادة دورياً إذا
+        توقفت العملية القائدة. يعيد True إذا بدأ خيط جديد.
+        """
+        interval = interval_minutes * 60  # تحويل الدقائق إلى ثوان
+        temp_path = f"{self.auto_update_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({'interval_seconds': interval}, f)
+        os.replace(temp_path, self.auto_update_path)
+        self.update_interval_seconds = interval
+        self._interval_read_at = time.monotonic()
+        
+        started = self._start_updater()
+        if started:
+            print(f"تم بدء التحديث التلقائي كل {interval_minutes} دقيقة")
+        else:
+            print(f"التحديث التلقائي يعمل بالفعل، الفترة الآن {interval_minutes} دقيقة")
+        return started
+    
+    def _start_updater(self):
+        """تشغيل خيط التحديث في هذه العملية إن لم يكن يعمل؛ يعيد True إذا بدأ خيط جديد"""
+        with self._updater_lock:
+            if self._updater_thread and self._updater_thread.is_alive():
+                return False
+            
+            def update_loop():
+                last_attempt = 0
+                while True:
+                    if not self._try_lead():
+                        time.sleep(self.leader_retry_seconds)
+                        continue
+                    interval = self._auto_update_interval()
+                    due = interval is not None and (
+                        time.time() - last_attempt >= interval or self.consecutive_failures > 0
+                    )
+                    # التحديث عند حلول الفترة أو عند طلب عملية أخرى وجدت الأسعار قديمة،
+                    # وبعد الفشل تُعاد المحاولة فور إغلاق قاطع الدائرة
+                    if (due or self._refresh_requested_since(last_attempt)) and not self.is_circuit_open():
+                        last_attempt = time.time()
+                        self.update_prices()
+                    delay = self.poll_seconds
+                    if interval is not None:
+                        delay = min(delay, max(last_attempt + interval - time.time(), 0.05))
+                    time.sleep(delay)
+            
+            # تشغيل التحديث في خيط منفصل
+            self._updater_thread = threading.Thread(target=update_loop, daemon=True)
+            self._updater_thread.start()
+            return True
 
 # إنشاء مثيل عام للخدمة
 gold_service = GoldPriceService()
-
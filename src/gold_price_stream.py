@@ -0,0 +1,110 @@
+import json
+import time
+import threading
+import requests
+from src.gold_price_service import gold_service
+
+class PriceBroadcaster:
+    """Fans gold price changes out to every waiting stream or long-poll client.
+    
+    One watcher thread per process follows the shared price snapshot (the
+    leader process is also notified directly by GoldPriceService). Each new
+    version is serialized once and handed to all clients waiting on a single
+    Condition, so idle connections cost no CPU and no polling.
+    
+    Each waiting client still holds one server thread for as long as it
+    waits (the app runs on synchronous threaded workers), so subscribe()
+    caps the open streams and long-polls per process at `max_subscribers`.
+    This is the fallback for a single-process setup; production routes the
+    stream and long-poll to src/price_stream_server.py, which serves them
+    from one event loop and gets each version pushed by the leader.
+    """
+    
+    def __init__(self, poll_interval_seconds=0.5, max_subscribers=200):
+        self.poll_interval_seconds = poll_interval_seconds
+        self.max_subscribers = max_subscribers
+        self.version = None
+        self.prices = None
+        self.event = None  # The current prices as a ready-to-send SSE message
+        self.subscribers = 0
+        self._condition = threading.Condition()
+        self._watcher = None
+        self._start_lock = threading.Lock()
+    
+    def publish(self, prices):
+        """Make `prices` current and wake every waiting client if the version changed"""
+        with self._condition:
+            if prices.get('version') == self.version:
+                return
+            data = json.dumps(prices, separators=(',', ':'))
+            self.version = prices.get('version')
+            self.prices = prices
+            self.event = f"id: {self.version}\nevent: prices\ndata: {data}\n\n"
+            self._condition.notify_all()
+    
+    def start(self):
+        """Start following the price snapshot (once per process)"""
+        with self._start_lock:
+            if self._watcher and self._watcher.is_alive():
+                return
+            self.publish(gold_service.get_current_prices())
+            if self._watcher is None:
+                gold_service.add_listener(self.publish)
+            
+            def watch():
+                while True:
+                    try:
+                        self.publish(gold_service.get_current_prices())
+                    except Exception as e:
+                        print(f"Gold price stream watcher error: {e}")
+                    time.sleep(self.poll_interval_seconds)
+            
+            self._watcher = threading.Thread(target=watch, daemon=True)
+            self._watcher.start()
+    
+    def wait_for_change(self, version, timeout):
+        """Block until the version differs from `version` or `timeout` passes.
+        
+        Returns (version, prices, event) as of wake-up.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self.version != version, timeout)
+            return self.version, self.prices, self.event
+    
+    def subscribe(self, max_subscribers=None):
+        """Take a client slot; returns False when `max_subscribers` clients are already waiting"""
+        with self._condition:
+            if self.subscribers >= (max_subscribers or self.max_subscribers):
+                return False
+            self.subscribers += 1
+            return True
+    
+    def unsubscribe(self):
+        with self._condition:
+            self.subscribers -= 1
+
+# Shared broadcaster instance
+broadcaster = PriceBroadcaster()
+
+_push_apps = set()
+
+def start_stream_push(app):
+    """Push every price refresh of this process to the stream server (once per app).
+    
+    Listeners only run in the gold price leader, so each version is pushed
+    once, right after it is published. Does nothing without
+    GOLD_PRICE_STREAM_PUBLISH_URL.
+    """
+    url = app.config.get('GOLD_PRICE_STREAM_PUBLISH_URL')
+    if not url or id(app) in _push_apps:
+        return
+    _push_apps.add(id(app))
+    
+    def push(prices):
+        try:
+            requests.post(url, data=json.dumps(prices), headers={'Content-Type': 'application/json'}, timeout=2)
+        except requests.RequestException as e:
+            # The stream server also resyncs from the shared snapshot
+            app.logger.warning("Pushing gold prices to the stream server failed: %s", e)
+    
+    gold_service.add_listener(push)
@@ -0,0 +1,158 @@
+import time
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import request, jsonify, current_app, make_response, Response
+from sqlalchemy import update, delete
+from sqlalchemy.exc import IntegrityError
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
+from src.models.user import db
+from src.models.idempotency import IdempotencyKey
+from src.job_queue import job_queue
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+# Seconds a duplicate waits for the first request to finish before giving up
+DUPLICATE_WAIT_SECONDS = 10
+DUPLICATE_POLL_SECONDS = 0.1
+
+def _replay(record):
+    response = Response(record.response_body, status=record.response_code, mimetype=record.response_mimetype)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def _caller():
+    """JWT identity of the caller, or None for anonymous requests"""
+    try:
+        verify_jwt_in_request(optional=True)
+    except (JWTExtendedException, PyJWTError):
+        return None  # Endpoints that require a token reject it themselves
+    return get_jwt_identity()
+
+def _acquire(scope, key, request_hash):
+    """Insert the key row, or return the existing one if another request owns the key"""
+    now = datetime.utcnow()
+    ttl_hours = current_app.config.get('IDEMPOTENCY_KEY_TTL_HOURS', 24)
+    try:
+        db.session.add(IdempotencyKey(
+            key=key,
+            scope=scope,
+            request_hash=request_hash,
+            status='in_progress',
+            locked_at=now,
+            expires_at=now + timedelta(hours=ttl_hours)
+        ))
+        db.session.commit()
+        return None
+    except IntegrityError:
+        db.session.rollback()
+        return IdempotencyKey.query.filter_by(scope=scope, key=key).first()
+
+def _take_over(record):
+    """Claim a key whose record expired"""
+    now = datetime.utcnow()
+    ttl_hours = current_app.config.get('IDEMPOTENCY_KEY_TTL_HOURS', 24)
+    result = db.session.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.id == record.id, IdempotencyKey.locked_at == record.locked_at)
+        .values(
+            status='in_progress',
+            locked_at=now,
+            expires_at=now + timedelta(hours=ttl_hours),
+            response_code=None,
+            response_body=None
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+def idempotent(f):
+    """Make a write endpoint safe to retry with an Idempotency-Key header.
+    
+    The first request with a key runs the view and stores its response; retries
+    with the same key and body get the stored response without running the view.
+    Concurrent duplicates wait for the first request to finish. Requests without
+    the header run normally. 5xx responses are not stored so the client can retry.
+    
+    Keys are scoped to the caller (JWT identity) and the endpoint, so two users
+    cannot see each other's responses by sending the same key. A key still in
+    progress is never taken over, even if its execution looks slow; one whose
+    process died holds the key until the record expires.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return f(*args, **kwargs)
+        if len(key) > 255:
+            return jsonify({'success': False, 'error': f'{IDEMPOTENCY_HEADER} is too long'}), 400
+        
+        scope = f"{_caller() or 'anonymous'} {request.method} {request.path}"
+        request_hash = hashlib.sha256(request.get_data()).hexdigest()
+        
+        deadline = time.monotonic() + DUPLICATE_WAIT_SECONDS
+        while True:
+            record = _acquire(scope, key, request_hash)
+            if record is None:
+                break
+            if record.request_hash != request_hash:
+                return jsonify({
+                    'success': False,
+                    'error': f'{IDEMPOTENCY_HEADER} was already used with a different request'
+                }), 422
+            
+            now = datetime.utcnow()
+            expired = record.expires_at < now
+            if record.status == 'completed' and not expired:
+                return _replay(record)
+            if expired and _take_over(record):
+                break
+            
+            if time.monotonic() >= deadline:
+                return jsonify({
+                    'success': False,
+                    'error': 'A request with this Idempotency-Key is still being processed'
+                }), 409
+            # Serialize on the key: wait for the request that owns it
+            time.sleep(DUPLICATE_POLL_SECONDS)
+            db.session.rollback()
+        
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.scope == scope, IdempotencyKey.key == key))
+            db.session.commit()
+            raise
+        
+        if response.status_code >= 500:
+            db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.scope == scope, IdempotencyKey.key == key))
+        else:
+            db.session.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+                .values(
+                    status='completed',
+                    response_code=response.status_code,
+                    response_body=response.get_data(as_text=True),
+                    response_mimetype=response.mimetype
+                )
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+        return response
+    return decorated_function
+
+def purge_expired_keys():
+    """Delete idempotency records past their TTL"""
+    deleted = IdempotencyKey.query.filter(
+        IdempotencyKey.expires_at < datetime.utcnow()
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+# Expired keys are purged by the job workers
+job_queue.add_maintenance_task(purge_expired_keys)
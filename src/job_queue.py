@@ -0,0 +1,178 @@
+from datetime import datetime, timedelta
+import time
+import random
+import traceback
+from flask import current_app
+from sqlalchemy import insert, update, or_, and_
+from src.models.user import db
+from src.models.job import Job
+
+class JobQueue:
+    """Persistent job queue stored in the jobs table.
+    
+    Jobs are enqueued in the caller's transaction, so they only become visible
+    once the change that produced them commits. Workers claim jobs with a
+    conditional UPDATE that sets a visibility timeout; a job whose worker dies
+    becomes claimable again when the timeout passes, which gives at-least-once
+    delivery. Handlers must therefore be idempotent.
+    """
+    
+    def __init__(self, visibility_timeout_seconds=300, retry_base_seconds=30, retry_max_seconds=3600,
+                 retention_days=7):
+        self.visibility_timeout_seconds = visibility_timeout_seconds
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.retention_days = retention_days
+        self.handlers = {}
+        self.maintenance_tasks = [self.purge_finished]
+    
+    def handler(self, job_type):
+        """Decorator registering the function that processes `job_type` jobs"""
+        def decorator(f):
+            self.handlers[job_type] = f
+            return f
+        return decorator
+    
+    def add_maintenance_task(self, task):
+        """Register a cleanup function the workers run periodically (e.g. TTL purges)"""
+        self.maintenance_tasks.append(task)
+    
+    def enqueue(self, job_type, payload=None, delay_seconds=0, max_attempts=None):
+        """Add a job to the current transaction (the caller commits)"""
+        job = Job(
+            job_type=job_type,
+            payload=payload or {},
+            status='queued',
+            run_at=datetime.utcnow() + timedelta(seconds=delay_seconds),
+            max_attempts=max_attempts or current_app.config.get('JOB_MAX_ATTEMPTS', 5)
+        )
+        db.session.add(job)
+        return job
+    
+    def enqueue_many(self, job_type, payloads, max_attempts=None):
+        """Add one job per payload to the current transaction with a single bulk insert"""
+        if not payloads:
+            return
+        now = datetime.utcnow()
+        max_attempts = max_attempts or current_app.config.get('JOB_MAX_ATTEMPTS', 5)
+        db.session.execute(insert(Job), [{
+            'job_type': job_type,
+            'payload': payload,
+            'status': 'queued',
+            'attempts': 0,
+            'max_attempts': max_attempts,
+            'run_at': now,
+            'created_at': now
+        } for payload in payloads])
+    
+    def _claimable(self, now):
+        return or_(
+            and_(Job.status == 'queued', Job.run_at <= now),
+            and_(Job.status == 'running', Job.locked_until < now)
+        )
+    
+    def claim(self, worker_id, limit=10):
+        """Claim up to `limit` due jobs for this worker and commit the claim"""
+        now = datetime.utcnow()
+        timeout = current_app.config.get('JOB_VISIBILITY_TIMEOUT_SECONDS', self.visibility_timeout_seconds)
+        candidates = [job_id for job_id, in db.session.query(Job.id).filter(
+            self._claimable(now)
+        ).order_by(Job.run_at).limit(limit)]
+        
+        claimed = []
+        for job_id in candidates:
+            # Another worker may claim the same candidate; only one UPDATE matches
+            result = db.session.execute(
+                update(Job)
+                .where(Job.id == job_id, self._claimable(now))
+                .values(
+                    status='running',
+                    attempts=Job.attempts + 1,
+                    locked_until=now + timedelta(seconds=timeout),
+                    locked_by=worker_id
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                claimed.append(job_id)
+        db.session.commit()
+        
+        if not claimed:
+            return []
+        return Job.query.filter(Job.id.in_(claimed)).order_by(Job.run_at).all()
+    
+    def complete(self, job):
+        job.status = 'done'
+        job.finished_at = datetime.utcnow()
+        job.locked_until = None
+        job.last_error = None
+        db.session.commit()
+    
+    def retry_delay(self, attempts):
+        """Exponential backoff with jitter for the given attempt number"""
+        delay = min(self.retry_base_seconds * (2 ** max(attempts - 1, 0)), self.retry_max_seconds)
+        return delay * random.uniform(0.8, 1.2)
+    
+    def fail(self, job, error):
+        """Record a failed attempt and schedule a retry, or give up after max_attempts"""
+        job.last_error = error
+        job.locked_until = None
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+        else:
+            job.status = 'queued'
+            job.run_at = datetime.utcnow() + timedelta(seconds=self.retry_delay(job.attempts))
+        db.session.commit()
+    
+    def process(self, job):
+        handler = self.handlers.get(job.job_type)
+        if handler is None:
+            job.attempts = job.max_attempts
+            self.fail(job, f"No handler registered for job type '{job.job_type}'")
+            return False
+        
+        try:
+            handler(job.payload or {})
+            self.complete(job)
+            return True
+        except Exception:
+            error = traceback.format_exc()
+            db.session.rollback()
+            print(f"Job {job.id} ({job.job_type}) failed on attempt {job.attempts}: {error}")
+            self.fail(job, error)
+            return False
+    
+    def purge_finished(self):
+        """Delete done/failed jobs older than the retention period"""
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+        deleted = Job.query.filter(
+            Job.status.in_(['done', 'failed']),
+            Job.finished_at < cutoff
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+    
+    def run_worker(self, app, worker_id, batch_size=10, poll_interval=1.0, maintenance_interval=3600):
+        """Process jobs forever in the current process"""
+        with app.app_context():
+            next_maintenance = 0
+            while True:
+                try:
+                    if time.monotonic() >= next_maintenance:
+                        for task in self.maintenance_tasks:
+                            task()
+                        next_maintenance = time.monotonic() + maintenance_interval
+                    
+                    jobs = self.claim(worker_id, batch_size)
+                    for job in jobs:
+                        self.process(job)
+                    if not jobs:
+                        time.sleep(poll_interval)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Job worker {worker_id} error: {e}")
+                    time.sleep(poll_interval)
+
+# Shared queue instance
+job_queue = JobQueue()
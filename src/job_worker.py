@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Job worker for Bilsan Jewelry Backend
+Runs a pool of worker processes that execute queued background jobs
+
+Usage:
+    python src/job_worker.py [--processes 4] [--batch-size 10] [--poll-interval 1.0]
+"""
+
+import os
+import sys
+import socket
+import argparse
+import multiprocessing
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def work(worker_id, batch_size, poll_interval):
+    """Entry point of one worker process"""
+    from src.app_factory import create_app
+    from src.job_queue import job_queue
+    import src.order_jobs  # Registers the order job handlers
+    import src.price_alerts  # Registers the price alert handler
+    import src.fitting_jobs  # Registers the AI fitting handler
+    
+    # No web-only background threads in the workers
+    app = create_app(web=False)
+    print(f"👷 Worker {worker_id} started")
+    job_queue.run_worker(app, worker_id, batch_size=batch_size, poll_interval=poll_interval)
+
+def main():
+    """Start the worker pool and wait for it"""
+    parser = argparse.ArgumentParser(description='Run background job workers')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--poll-interval', type=float, default=1.0)
+    args = parser.parse_args()
+    
+    # Spawn fresh interpreters so no database connections are shared across processes
+    context = multiprocessing.get_context('spawn')
+    host = socket.gethostname()
+    workers = [
+        context.Process(
+            target=work,
+            args=(f"{host}:{os.getpid()}:{index}", args.batch_size, args.poll_interval),
+            daemon=True
+        )
+        for index in range(args.processes)
+    ]
+    for worker in workers:
+        worker.start()
+    
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        print("Stopping workers...")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+from flask import request, current_app, Response
+from src.site_settings_cache import site_settings_cache
+
+# Paths that keep working in maintenance mode: admins must still be able to
+# sign in and switch it off, the storefront reads the maintenance message
+# from /api/settings, and load balancers keep probing /api/health.
+MAINTENANCE_ALLOWED_PATHS = ('/api/admin/', '/api/auth/', '/api/settings', '/api/health')
+
+def init_maintenance_mode(app):
+    """Answer 503 to every non-exempt request while maintenance mode is on.
+    
+    The gate only reads the flag held by site_settings_cache, which the
+    settings watcher thread keeps current, so it never queries the database
+    and costs a normal request one attribute lookup.
+    """
+    
+    @app.before_request
+    def maintenance_gate():
+        if not site_settings_cache.maintenance_mode:
+            return None
+        if request.method == 'OPTIONS' or request.path.startswith(MAINTENANCE_ALLOWED_PATHS):
+            return None
+        
+        response = Response(site_settings_cache.maintenance_body, status=503, mimetype='application/json')
+        response.headers['Retry-After'] = str(current_app.config.get('MAINTENANCE_RETRY_AFTER_SECONDS', 300))
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    
+    # Register the gate ahead of the other before_request hooks (rate limiting etc.)
+    hooks = app.before_request_funcs.setdefault(None, [])
+    hooks.insert(0, hooks.pop())
+    
+    site_settings_cache.start_watcher(app)
@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from src.models.user import db
+from src.quote_engine import quote_engine
 
 class Cart(db.Model):
     __tablename__ = 'carts'
@@ -14,14 +15,22 @@ class Cart(db.Model):
     # Relationships
     items = db.relationship('CartItem', backref='cart', lazy=True, cascade='all, delete-orphan')
     
+    def quote(self):
+        """Live quote of every line against the current gold price tick"""
+        return quote_engine.quote_lines([(item.product, item.quantity) for item in self.items if item.product])
+    
     def to_dict(self):
+        quote = self.quote()
         return {
             'id': self.id,
             'user_id': self.user_id,
             'session_id': self.session_id,
             'items': [item.to_dict() for item in self.items],
             'total_items': sum(item.quantity for item in self.items),
-            'total_price': sum(item.quantity * item.product.price for item in self.items),
+            'total_price': quote['total'],
+            'vat': quote['vat'],
+            'total_with_vat': quote['total_with_vat'],
+            'price_version': quote['tick_version'],
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -38,6 +47,7 @@ class CartItem(db.Model):
     added_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
+        unit_price = quote_engine.quote_product(self.product)['unit_price'] if self.product else 0
         return {
             'id': self.id,
             'product_id': self.product_id,
@@ -46,6 +56,30 @@ class CartItem(db.Model):
             'custom_engraving': self.custom_engraving,
             'added_at': self.added_at.isoformat() if self.added_at else None,
             'product': self.product.to_dict() if self.product else None,
-            'subtotal': self.quantity * self.product.price if self.product else 0
+            'unit_price': unit_price,
+            'subtotal': round(self.quantity * unit_price, 2)
         }
 
+
+class StockHold(db.Model):
+    __tablename__ = 'stock_holds'
+    __table_args__ = (
+        db.UniqueConstraint('cart_id', 'product_id', name='uq_stock_holds_cart_product'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    cart_id = db.Column(db.Integer, db.ForeignKey('carts.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)  # Total held for this product in this cart
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)  # Scanned by the reaper
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'cart_id': self.cart_id,
+            'product_id': self.product_id,
+            'quantity': self.quantity,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
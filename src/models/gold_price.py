@@ -1,9 +1,14 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from src.models.user import db
+from src.models.gold_price_history import GoldPriceTick
+from src.db_utils import upsert
 
 class GoldPrice(db.Model):
     __tablename__ = 'gold_prices'
+    __table_args__ = (
+        db.UniqueConstraint('karat', 'currency', name='uq_gold_prices_karat_currency'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     karat = db.Column(db.String(10), nullable=False)  # 18k, 21k, 24k
@@ -23,6 +28,40 @@ class GoldPrice(db.Model):
             'last_updated': self.last_updated.isoformat() if self.last_updated else None,
             'is_active': self.is_active
         }
+    
+    @staticmethod
+    def save_prices(rows, source=None):
+        """Write a whole price table and its history ticks in the caller's transaction.
+        
+        `rows` are dicts with karat, price_per_gram and optionally currency
+        (default SAR) and source. All rows go through one upsert on the
+        (karat, currency) unique key and one tick insert; if a karat/currency
+        appears twice the last row wins.
+        """
+        now = datetime.utcnow()
+        latest = {}
+        for row in rows:
+            currency = row.get('currency') or 'SAR'
+            latest[(row['karat'], currency)] = {
+                'karat': row['karat'],
+                'currency': currency,
+                'price_per_gram': row['price_per_gram'],
+                'source': row.get('source') or source,
+                'last_updated': now,
+                'is_active': True
+            }
+        if not latest:
+            return 0
+        
+        upsert(GoldPrice, list(latest.values()), ['karat', 'currency'])
+        GoldPriceTick.record_rows([{
+            'karat': row['karat'],
+            'currency': row['currency'],
+            'price_per_gram': row['price_per_gram'],
+            'source': row['source'],
+            'recorded_at': now
+        } for row in latest.values()])
+        return len(latest)
 
 class SizeGuide(db.Model):
     __tablename__ = 'size_guides'
@@ -33,6 +72,7 @@ class SizeGuide(db.Model):
     size_value = db.Column(db.Float)  # Measurement in mm or cm
     description = db.Column(db.String(200))
     is_active = db.Column(db.Boolean, default=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # Part of the cache version
     
     def to_dict(self):
         return {
@@ -46,6 +86,12 @@ class SizeGuide(db.Model):
 
 class AIFitting(db.Model):
     __tablename__ = 'ai_fittings'
+    __table_args__ = (
+        db.Index('ix_ai_fittings_image_hash_category', 'image_hash', 'category'),
+        # History is read newest first per user or guest session
+        db.Index('ix_ai_fittings_user_id_id', 'user_id', 'id'),
+        db.Index('ix_ai_fittings_session_id_id', 'session_id', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
@@ -55,6 +101,10 @@ class AIFitting(db.Model):
     measurements = db.Column(db.JSON)  # AI-detected measurements
     recommended_size = db.Column(db.String(20))
     confidence_score = db.Column(db.Float)  # AI confidence (0-1)
+    image_hash = db.Column(db.String(64))  # SHA-256 of the uploaded image (results cache key)
+    status = db.Column(db.String(20), default='queued', index=True)  # queued, processing, done, failed
+    error = db.Column(db.Text)
+    completed_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
@@ -67,6 +117,19 @@ class AIFitting(db.Model):
             'measurements': self.measurements,
             'recommended_size': self.recommended_size,
             'confidence_score': self.confidence_score,
+            'status': self.status,
+            'error': self.error,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+    
+    # Columns of a history entry; measurements are fetched per fitting
+    HISTORY_COLUMNS = ['id', 'category', 'recommended_size', 'confidence_score', 'status', 'created_at']
+    
+    @staticmethod
+    def history_to_dict(row):
+        """Serialize a row of HISTORY_COLUMNS"""
+        entry = dict(row._mapping)
+        entry['created_at'] = entry['created_at'].isoformat() if entry['created_at'] else None
+        return entry
 
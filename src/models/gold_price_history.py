@@ -0,0 +1,185 @@
+from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from src.models.user import db
+from src.db_utils import upsert
+
+class GoldPriceTick(db.Model):
+    """Append-only log of every gold price observed (live refreshes and manual updates)"""
+    __tablename__ = 'gold_price_ticks'
+    __table_args__ = (
+        db.Index('ix_gold_price_ticks_series', 'karat', 'currency', 'recorded_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    karat = db.Column(db.String(10), nullable=False)  # 18k, 21k, 24k
+    currency = db.Column(db.String(10), nullable=False, default='SAR')
+    price_per_gram = db.Column(db.Float, nullable=False)
+    source = db.Column(db.String(100))  # api_auto, manual
+    recorded_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'karat': self.karat,
+            'currency': self.currency,
+            'price_per_gram': self.price_per_gram,
+            'source': self.source,
+            'recorded_at': self.recorded_at.isoformat() if self.recorded_at else None
+        }
+    
+    @staticmethod
+    def record(prices, source=None, currency='SAR', recorded_at=None):
+        """Append one tick per karat ({karat: price_per_gram}) and fold them into the candles.
+        
+        Runs inside the caller's transaction.
+        """
+        recorded_at = recorded_at or datetime.utcnow()
+        GoldPriceTick.record_rows([{
+            'karat': karat,
+            'currency': currency,
+            'price_per_gram': price,
+            'source': source,
+            'recorded_at': recorded_at
+        } for karat, price in prices.items() if price is not None])
+    
+    @staticmethod
+    def record_rows(rows):
+        """Append tick rows (karat, currency, price_per_gram, source, recorded_at) in one insert"""
+        if not rows:
+            return
+        db.session.execute(insert(GoldPriceTick), rows)
+        GoldPriceCandle.add_ticks(rows)
+    
+    @staticmethod
+    def price_at(karat, at, currency='SAR'):
+        """Price in effect at a given time: the last tick at or before it, or the
+        close of the finest candle covering it once raw ticks have been compacted"""
+        tick = GoldPriceTick.query.filter(
+            GoldPriceTick.karat == karat,
+            GoldPriceTick.currency == currency,
+            GoldPriceTick.recorded_at <= at
+        ).order_by(GoldPriceTick.recorded_at.desc()).first()
+        if tick:
+            return tick.price_per_gram
+        
+        for resolution in GoldPriceCandle.RESOLUTIONS:
+            candle = GoldPriceCandle.query.filter(
+                GoldPriceCandle.resolution == resolution,
+                GoldPriceCandle.karat == karat,
+                GoldPriceCandle.currency == currency,
+                GoldPriceCandle.bucket_start <= at
+            ).order_by(GoldPriceCandle.bucket_start.desc()).first()
+            if candle:
+                return candle.close
+        return None
+
+class GoldPriceCandle(db.Model):
+    """OHLC buckets of the tick log at 1 minute, 1 hour and 1 day resolution.
+    
+    Candles are updated in the same transaction as the ticks, so charts never
+    read raw ticks and raw ticks can be deleted after their retention period.
+    """
+    __tablename__ = 'gold_price_candles'
+    __table_args__ = (
+        db.UniqueConstraint('resolution', 'karat', 'currency', 'bucket_start', name='uq_gold_price_candles_bucket'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    resolution = db.Column(db.String(5), nullable=False)  # 1m, 1h, 1d
+    karat = db.Column(db.String(10), nullable=False)
+    currency = db.Column(db.String(10), nullable=False, default='SAR')
+    bucket_start = db.Column(db.DateTime, nullable=False)  # UTC
+    open = db.Column(db.Float, nullable=False)
+    high = db.Column(db.Float, nullable=False)
+    low = db.Column(db.Float, nullable=False)
+    close = db.Column(db.Float, nullable=False)
+    open_at = db.Column(db.DateTime, nullable=False)  # Time of the tick that set open
+    close_at = db.Column(db.DateTime, nullable=False)  # Time of the tick that set close
+    tick_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    RESOLUTIONS = {
+        '1m': timedelta(minutes=1),
+        '1h': timedelta(hours=1),
+        '1d': timedelta(days=1)
+    }
+    
+    def to_dict(self):
+        return {
+            't': self.bucket_start.isoformat() if self.bucket_start else None,
+            'open': self.open,
+            'high': self.high,
+            'low': self.low,
+            'close': self.close,
+            'ticks': self.tick_count
+        }
+    
+    @staticmethod
+    def bucket_start_for(resolution, at):
+        if resolution == '1m':
+            return at.replace(second=0, microsecond=0)
+        if resolution == '1h':
+            return at.replace(minute=0, second=0, microsecond=0)
+        return at.replace(hour=0, minute=0, second=0, microsecond=0)
+    
+    @staticmethod
+    def add_ticks(ticks):
+        """Fold tick rows into every resolution with one upsert per resolution"""
+        for resolution in GoldPriceCandle.RESOLUTIONS:
+            # Pre-aggregate ticks sharing a bucket; one statement may not touch a row twice
+            buckets = {}
+            for tick in sorted(ticks, key=lambda tick: tick['recorded_at']):
+                key = (tick['karat'], tick['currency'], GoldPriceCandle.bucket_start_for(resolution, tick['recorded_at']))
+                price, at = tick['price_per_gram'], tick['recorded_at']
+                candle = buckets.get(key)
+                if candle is None:
+                    buckets[key] = {
+                        'resolution': resolution,
+                        'karat': key[0],
+                        'currency': key[1],
+                        'bucket_start': key[2],
+                        'open': price, 'high': price, 'low': price, 'close': price,
+                        'open_at': at, 'close_at': at,
+                        'tick_count': 1
+                    }
+                else:
+                    candle['high'] = max(candle['high'], price)
+                    candle['low'] = min(candle['low'], price)
+                    candle['close'], candle['close_at'] = price, at
+                    candle['tick_count'] += 1
+            
+            # Keys are ordered: MySQL applies the assignments left to right, so
+            # open/close must be compared before open_at/close_at are overwritten
+            upsert(
+                GoldPriceCandle,
+                list(buckets.values()),
+                ['resolution', 'karat', 'currency', 'bucket_start'],
+                update=lambda existing, incoming: {
+                    'open': db.case((incoming.open_at < existing.open_at, incoming.open), else_=existing.open),
+                    'high': db.case((incoming.high > existing.high, incoming.high), else_=existing.high),
+                    'low': db.case((incoming.low < existing.low, incoming.low), else_=existing.low),
+                    'close': db.case((incoming.close_at >= existing.close_at, incoming.close), else_=existing.close),
+                    'open_at': db.case((incoming.open_at < existing.open_at, incoming.open_at), else_=existing.open_at),
+                    'close_at': db.case((incoming.close_at >= existing.close_at, incoming.close_at), else_=existing.close_at),
+                    'tick_count': existing.tick_count + incoming.tick_count
+                }
+            )
+    
+    @staticmethod
+    def resolution_for(start, end, max_points):
+        """Finest resolution that covers the range in at most max_points buckets"""
+        for resolution, step in GoldPriceCandle.RESOLUTIONS.items():
+            if (end - start) / step <= max_points:
+                return resolution
+        return '1d'
+    
+    @staticmethod
+    def query_range(karat, currency, resolution, start, end):
+        """Candles of one series in [start, end), read from the unique bucket index"""
+        return GoldPriceCandle.query.filter(
+            GoldPriceCandle.resolution == resolution,
+            GoldPriceCandle.karat == karat,
+            GoldPriceCandle.currency == currency,
+            GoldPriceCandle.bucket_start >= GoldPriceCandle.bucket_start_for(resolution, start),
+            GoldPriceCandle.bucket_start < end
+        ).order_by(GoldPriceCandle.bucket_start).all()
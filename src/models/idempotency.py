@@ -0,0 +1,21 @@
+from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
+from src.models.user import db
+
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'key', name='uq_idempotency_keys_scope_key'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(255), nullable=False)  # Client supplied Idempotency-Key header
+    scope = db.Column(db.String(255), nullable=False)  # Caller's JWT identity (or anonymous), HTTP method and path
+    request_hash = db.Column(db.String(64), nullable=False)  # SHA-256 of the request body
+    status = db.Column(db.String(20), default='in_progress')  # in_progress, completed
+    response_code = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    response_mimetype = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime, default=datetime.utcnow)  # When the current execution started
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
@@ -0,0 +1,38 @@
+from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
+from src.models.user import db
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.JSON)
+    status = db.Column(db.String(20), default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=5)
+    run_at = db.Column(db.DateTime, default=datetime.utcnow)  # Earliest time the job may run
+    locked_until = db.Column(db.DateTime)  # Visibility timeout of the current attempt
+    locked_by = db.Column(db.String(100))
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'job_type': self.job_type,
+            'payload': self.payload,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'run_at': self.run_at.isoformat() if self.run_at else None,
+            'locked_until': self.locked_until.isoformat() if self.locked_until else None,
+            'locked_by': self.locked_by,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
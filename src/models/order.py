@@ -1,9 +1,25 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-from src.models.user import db
+import random
+from src.models.user import db, User
+from src.models.product import Product
+from src.db_utils import upsert
+
+ORDER_STATUSES = ['pending', 'confirmed', 'processing', 'shipped', 'delivered', 'cancelled']
+
+# Allowed fulfillment transitions (re-sending the current status is always allowed)
+ORDER_STATUS_TRANSITIONS = {
+    'pending': ['confirmed', 'processing', 'cancelled'],
+    'confirmed': ['processing', 'shipped', 'cancelled'],
+    'processing': ['shipped', 'cancelled'],
+    'shipped': ['delivered'],
+    'delivered': [],
+    'cancelled': []
+}
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = {'sqlite_autoincrement': True}  # Never reuse the id of an archived order
     
     id = db.Column(db.Integer, primary_key=True)
     order_number = db.Column(db.String(50), unique=True, nullable=False)
@@ -37,6 +53,50 @@ class Order(db.Model):
     # Relationships
     items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
     
+    # Columns returned by the summary listing view
+    SUMMARY_COLUMNS = [
+        'id', 'order_number', 'user_id', 'status', 'payment_status', 'payment_method',
+        'total_amount', 'shipping_cost', 'tax_amount', 'discount_amount',
+        'shipping_name', 'shipping_city', 'shipping_country', 'tracking_number',
+        'created_at', 'updated_at'
+    ]
+    
+    @staticmethod
+    def detail_options():
+        """Eager-load options so to_dict() runs a fixed number of queries for any page size"""
+        products = db.selectinload(Order.items).joinedload(OrderItem.product)
+        return [
+            db.joinedload(Order.user),
+            products.selectinload(Product.images),
+            products.selectinload(Product.reviews)
+        ]
+    
+    @staticmethod
+    def summary_query(order_model=None, item_model=None):
+        """Single query projecting order columns, user name and item totals (of the archive tables when given)"""
+        order_model, item_model = order_model or Order, item_model or OrderItem
+        item_count = db.select(db.func.count(item_model.id)).where(
+            item_model.order_id == order_model.id
+        ).correlate(order_model).scalar_subquery()
+        total_quantity = db.select(db.func.coalesce(db.func.sum(item_model.quantity), 0)).where(
+            item_model.order_id == order_model.id
+        ).correlate(order_model).scalar_subquery()
+        
+        return order_model.query.outerjoin(User, User.id == order_model.user_id).with_entities(
+            *[getattr(order_model, column) for column in Order.SUMMARY_COLUMNS],
+            User.name.label('user_name'),
+            item_count.label('item_count'),
+            total_quantity.label('total_quantity')
+        )
+    
+    @staticmethod
+    def summary_to_dict(row):
+        """Serialize a row returned by summary_query()"""
+        summary = dict(row._mapping)
+        for key in ('created_at', 'updated_at'):
+            summary[key] = summary[key].isoformat() if summary[key] else None
+        return summary
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -67,9 +127,10 @@ class Order(db.Model):
 
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
+    __table_args__ = {'sqlite_autoincrement': True}  # Never reuse the id of an archived item
     
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     unit_price = db.Column(db.Float, nullable=False)  # Price at time of order
@@ -88,3 +149,187 @@ class OrderItem(db.Model):
             'product': self.product.to_dict() if self.product else None
         }
 
+
+class OrderArchive(db.Model):
+    """Cold storage for delivered/cancelled orders moved out of `orders`.
+    
+    Columns mirror Order (same ids) so rows can be copied with INSERT ... SELECT.
+    """
+    __tablename__ = 'orders_archive'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    order_number = db.Column(db.String(50), unique=True, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    status = db.Column(db.String(50))
+    total_amount = db.Column(db.Float, nullable=False)
+    shipping_cost = db.Column(db.Float, default=0)
+    tax_amount = db.Column(db.Float, default=0)
+    discount_amount = db.Column(db.Float, default=0)
+    payment_method = db.Column(db.String(50))
+    payment_status = db.Column(db.String(50))
+    
+    # Shipping Information
+    shipping_name = db.Column(db.String(100), nullable=False)
+    shipping_phone = db.Column(db.String(20), nullable=False)
+    shipping_email = db.Column(db.String(100))
+    shipping_address = db.Column(db.Text, nullable=False)
+    shipping_city = db.Column(db.String(100), nullable=False)
+    shipping_country = db.Column(db.String(100), nullable=False)
+    shipping_postal_code = db.Column(db.String(20))
+    
+    # Tracking
+    tracking_number = db.Column(db.String(100))
+    estimated_delivery = db.Column(db.DateTime)
+    delivered_at = db.Column(db.DateTime)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, index=True)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    items = db.relationship('OrderItemArchive', backref='order', lazy=True, cascade='all, delete-orphan')
+    user = db.relationship('User', viewonly=True)
+    
+    summary_to_dict = staticmethod(Order.summary_to_dict)
+    
+    @staticmethod
+    def detail_options():
+        """Eager-load options so to_dict() runs a fixed number of queries for any page size"""
+        products = db.selectinload(OrderArchive.items).joinedload(OrderItemArchive.product)
+        return [
+            db.joinedload(OrderArchive.user),
+            products.selectinload(Product.images),
+            products.selectinload(Product.reviews)
+        ]
+    
+    @staticmethod
+    def summary_query():
+        return Order.summary_query(OrderArchive, OrderItemArchive)
+    
+    def to_dict(self):
+        data = Order.to_dict(self)
+        data['archived_at'] = self.archived_at.isoformat() if self.archived_at else None
+        return data
+
+class OrderItemArchive(db.Model):
+    __tablename__ = 'order_items_archive'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders_archive.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    unit_price = db.Column(db.Float, nullable=False)
+    size = db.Column(db.String(10))
+    custom_engraving = db.Column(db.String(200))
+    
+    # Relationships
+    product = db.relationship('Product', viewonly=True)
+    
+    to_dict = OrderItem.to_dict
+
+class OrderStats(db.Model):
+    """Materialized order counters for the admin dashboard.
+    
+    The counters are spread over SHARDS rows so concurrent checkouts don't all
+    update the same row; a read sums the shards and never scans orders.
+    """
+    __tablename__ = 'order_stats'
+    
+    SHARDS = 8
+    
+    id = db.Column(db.Integer, primary_key=True)  # Shard number
+    total_orders = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    pending_orders = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    confirmed_orders = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    processing_orders = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    shipped_orders = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    delivered_orders = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    cancelled_orders = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_revenue = db.Column(db.Float, nullable=False, default=0, server_default='0')  # Sum of paid orders, excluding VAT
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    COUNTERS = ['total_orders'] + [f'{status}_orders' for status in ORDER_STATUSES] + ['total_revenue']
+    
+    @staticmethod
+    def compute():
+        """Compute stats with one GROUP BY query over hot orders and one over the archive"""
+        stats = {counter: 0 for counter in OrderStats.COUNTERS}
+        for model in (Order, OrderArchive):
+            rows = db.session.query(
+                model.status,
+                db.func.count(model.id),
+                db.func.sum(db.case(
+                    (model.payment_status == 'paid', model.total_amount - db.func.coalesce(model.tax_amount, 0)),
+                    else_=0
+                ))
+            ).group_by(model.status).all()
+            
+            for status, count, revenue in rows:
+                stats['total_orders'] += count
+                stats['total_revenue'] += revenue or 0
+                if status in ORDER_STATUSES:
+                    stats[f'{status}_orders'] += count
+        return stats
+    
+    @staticmethod
+    def rebuild():
+        """Recompute the materialized counters from scratch, in one transaction.
+        
+        The shard rows are created if missing (a concurrent first-use rebuild
+        inserting them too is not an error) and locked before the orders are
+        counted. record() calls from other checkouts wait for the new values
+        and add their change on top, so nothing is lost or counted twice.
+        """
+        now = datetime.utcnow()
+        zeros = {counter: 0 for counter in OrderStats.COUNTERS}
+        shard_ids = list(range(OrderStats.SHARDS))
+        upsert(OrderStats, [dict(zeros, id=shard, updated_at=now) for shard in shard_ids], ['id'],
+               update=lambda existing, incoming: {'id': existing.id})
+        db.session.query(OrderStats.id).filter(OrderStats.id.in_(shard_ids)).with_for_update().all()
+        
+        stats = OrderStats.compute()
+        upsert(OrderStats, [dict(stats, id=0, updated_at=now)] + [
+            dict(zeros, id=shard, updated_at=now) for shard in shard_ids[1:]
+        ], ['id'])
+        db.session.commit()
+        return stats
+    
+    @staticmethod
+    def get_stats():
+        """Current stats summed over the shards (rebuilt on first use)"""
+        row = db.session.query(
+            *[db.func.sum(getattr(OrderStats, counter)) for counter in OrderStats.COUNTERS]
+        ).one()
+        if row[0] is None:
+            return OrderStats.rebuild()
+        return {counter: value or 0 for counter, value in zip(OrderStats.COUNTERS, row)}
+    
+    @staticmethod
+    def record(old_status=None, new_status=None, revenue_delta=0, count=1):
+        """Apply `count` identical order changes to a random shard inside the caller's transaction.
+        
+        old_status=None means a new order. Nothing is recorded before the first
+        rebuild; that rebuild counts the order anyway.
+        """
+        values = {}
+        if old_status is None:
+            values['total_orders'] = OrderStats.total_orders + count
+        if old_status != new_status:
+            if old_status in ORDER_STATUSES:
+                column = getattr(OrderStats, f'{old_status}_orders')
+                values[column.key] = column - count
+            if new_status in ORDER_STATUSES:
+                column = getattr(OrderStats, f'{new_status}_orders')
+                values[column.key] = column + count
+        if revenue_delta:
+            values['total_revenue'] = OrderStats.total_revenue + revenue_delta
+        if not values:
+            return
+        
+        db.session.execute(
+            db.update(OrderStats)
+            .where(OrderStats.id == random.randrange(OrderStats.SHARDS))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
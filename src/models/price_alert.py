@@ -0,0 +1,38 @@
+from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
+from src.models.user import db
+
+PRICE_ALERT_DIRECTIONS = ('below', 'above')
+
+class PriceAlert(db.Model):
+    __tablename__ = 'price_alerts'
+    __table_args__ = (
+        db.Index('ix_price_alerts_user_active', 'user_id', 'is_active'),
+        db.Index('ix_price_alerts_created_at', 'created_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    karat = db.Column(db.String(10), nullable=False)  # 9k, 14k, 18k, 21k, 22k, 24k
+    direction = db.Column(db.String(10), nullable=False)  # below, above
+    target_price = db.Column(db.Float, nullable=False)  # SAR per gram
+    is_active = db.Column(db.Boolean, default=True)  # One-shot: cleared when triggered
+    triggered_at = db.Column(db.DateTime)
+    triggered_price = db.Column(db.Float)
+    notified_at = db.Column(db.DateTime)  # Set once the owner was notified of the trigger
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    user = db.relationship('User', lazy=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'karat': self.karat,
+            'direction': self.direction,
+            'target_price': self.target_price,
+            'is_active': self.is_active,
+            'triggered_at': self.triggered_at.isoformat() if self.triggered_at else None,
+            'triggered_price': self.triggered_price,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from src.models.user import db
+from src.quote_engine import quote_engine
 
 class Product(db.Model):
     __tablename__ = 'products'
@@ -15,7 +16,9 @@ class Product(db.Model):
     subcategory = db.Column(db.String(100))  # rings, necklaces, bracelets, etc.
     gold_karat = db.Column(db.String(10))  # 18k, 21k, 24k
     weight = db.Column(db.Float)  # weight in grams
+    making_charge = db.Column(db.Float)  # SAR per gram; GOLD_MAKING_CHARGE_PER_GRAM when unset
     stock_quantity = db.Column(db.Integer, default=0)
+    reserved_quantity = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # held by active cart reservations
     is_featured = db.Column(db.Boolean, default=False)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -39,7 +42,10 @@ class Product(db.Model):
             'subcategory': self.subcategory,
             'gold_karat': self.gold_karat,
             'weight': self.weight,
+            'making_charge': self.making_charge,
+            'quote': quote_engine.quote_product(self),
             'stock_quantity': self.stock_quantity,
+            'available_quantity': (self.stock_quantity or 0) - (self.reserved_quantity or 0),
             'is_featured': self.is_featured,
             'is_active': self.is_active,
             'created_at': self.created_at.isoformat() if self.created_at else None,
@@ -0,0 +1,199 @@
+from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime, date, timedelta
+from src.models.user import db
+from src.models.order import Order, OrderItem, OrderArchive, OrderItemArchive
+from src.models.product import Product
+from src.db_utils import upsert
+
+class SalesDailyRollup(db.Model):
+    """Paid sales aggregated per day, category, subcategory and gold karat.
+    
+    Dimensions are stored as '' instead of NULL so they take part in the
+    unique key. Revenue is the sum of line subtotals (quantity * unit_price).
+    """
+    __tablename__ = 'sales_daily_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('day', 'category', 'subcategory', 'gold_karat', name='uq_sales_daily_rollups_bucket'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)  # Order creation date (UTC)
+    category = db.Column(db.String(100), nullable=False, default='')
+    subcategory = db.Column(db.String(100), nullable=False, default='')
+    gold_karat = db.Column(db.String(10), nullable=False, default='')
+    orders = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    units = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    revenue = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    DIMENSIONS = ['category', 'subcategory', 'gold_karat']
+    
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat() if self.day else None,
+            'category': self.category or None,
+            'subcategory': self.subcategory or None,
+            'gold_karat': self.gold_karat or None,
+            'orders': self.orders,
+            'units': self.units,
+            'revenue': self.revenue
+        }
+    
+    @staticmethod
+    def _aggregate(order_model, item_model, *criteria):
+        """Aggregate paid order lines matching `criteria` into rollup rows.
+        
+        Works on either the hot tables (Order, OrderItem) or the archive tables.
+        """
+        day = db.func.date(order_model.created_at)
+        rows = db.session.query(
+            day,
+            Product.category,
+            Product.subcategory,
+            Product.gold_karat,
+            db.func.count(db.distinct(order_model.id)),
+            db.func.sum(item_model.quantity),
+            db.func.sum(item_model.quantity * item_model.unit_price)
+        ).join(item_model, item_model.order_id == order_model.id).join(
+            Product, Product.id == item_model.product_id
+        ).filter(*criteria).group_by(
+            day, Product.category, Product.subcategory, Product.gold_karat
+        ).all()
+        
+        return [{
+            'day': date.fromisoformat(bucket_day) if isinstance(bucket_day, str) else bucket_day,
+            'category': category or '',
+            'subcategory': subcategory or '',
+            'gold_karat': gold_karat or '',
+            'orders': orders,
+            'units': int(units or 0),
+            'revenue': float(revenue or 0)
+        } for bucket_day, category, subcategory, gold_karat, orders, units, revenue in rows]
+    
+    @staticmethod
+    def _increment(rows, sign=1):
+        """Add (or subtract) aggregated rows to their buckets in one upsert"""
+        for row in rows:
+            for counter in ('orders', 'units', 'revenue'):
+                row[counter] *= sign
+        
+        upsert(
+            SalesDailyRollup,
+            rows,
+            ['day', 'category', 'subcategory', 'gold_karat'],
+            update=lambda existing, incoming: {
+                'orders': existing.orders + incoming.orders,
+                'units': existing.units + incoming.units,
+                'revenue': existing.revenue + incoming.revenue,
+                'updated_at': datetime.utcnow()
+            }
+        )
+    
+    @staticmethod
+    def record_order(order, sign=1):
+        """Add a newly paid order (sign=1) or remove a no longer paid one (sign=-1).
+        
+        Runs inside the caller's transaction.
+        """
+        SalesDailyRollup._increment(SalesDailyRollup._aggregate(Order, OrderItem, Order.id == order.id), sign)
+    
+    @staticmethod
+    def _history_bounds():
+        """First and last day with paid orders or rollup buckets, or (None, None)"""
+        days = []
+        for order_model in (OrderArchive, Order):
+            first, last = db.session.query(
+                db.func.min(order_model.created_at), db.func.max(order_model.created_at)
+            ).filter(order_model.payment_status == 'paid').one()
+            days += [value.date() if isinstance(value, datetime) else date.fromisoformat(value[:10])
+                     for value in (first, last) if value]
+        days += [value for value in db.session.query(
+            db.func.min(SalesDailyRollup.day), db.func.max(SalesDailyRollup.day)
+        ).one() if value]
+        return (min(days), max(days)) if days else (None, None)
+    
+    @staticmethod
+    def backfill(start_date=None, end_date=None, days_per_chunk=1):
+        """Rebuild the rollups for a date range (inclusive) from order history.
+        
+        The range is rebuilt `days_per_chunk` days at a time, one transaction
+        per chunk: the chunk's buckets are locked, its paid orders (hot and
+        archived) aggregated, and the buckets overwritten with the fresh
+        totals (buckets left without sales are deleted). Payment status
+        changes made meanwhile wait for the lock and apply on top, so nothing
+        is counted twice, and readers see either the old or the new totals of
+        a day, never an emptied one. Returns the number of orders processed.
+        """
+        first_day, last_day = SalesDailyRollup._history_bounds()
+        start_date = start_date or first_day
+        end_date = end_date or last_day
+        if start_date is None or end_date is None:
+            return 0
+        
+        keys = ['day'] + SalesDailyRollup.DIMENSIONS
+        processed = 0
+        day = start_date
+        while day <= end_date:
+            chunk_end = min(day + timedelta(days=days_per_chunk - 1), end_date)
+            
+            # Lock the chunk's buckets (and the range, for new ones) before reading the orders
+            existing = {
+                tuple(row[1:]): row[0]
+                for row in db.session.query(SalesDailyRollup.id, *[getattr(SalesDailyRollup, key) for key in keys]).filter(
+                    SalesDailyRollup.day >= day, SalesDailyRollup.day <= chunk_end
+                ).with_for_update()
+            }
+            
+            buckets = {}
+            for order_model, item_model in ((OrderArchive, OrderItemArchive), (Order, OrderItem)):
+                order_filter = [
+                    order_model.payment_status == 'paid',
+                    order_model.created_at >= datetime.combine(day, datetime.min.time()),
+                    order_model.created_at < datetime.combine(chunk_end + timedelta(days=1), datetime.min.time())
+                ]
+                processed += db.session.query(db.func.count(order_model.id)).filter(*order_filter).scalar()
+                for row in SalesDailyRollup._aggregate(order_model, item_model, *order_filter):
+                    bucket = buckets.setdefault(tuple(row[key] for key in keys), dict(row, orders=0, units=0, revenue=0.0))
+                    for counter in ('orders', 'units', 'revenue'):
+                        bucket[counter] += row[counter]
+            
+            now = datetime.utcnow()
+            upsert(SalesDailyRollup, [dict(bucket, updated_at=now) for bucket in buckets.values()], keys)
+            stale_ids = [bucket_id for key, bucket_id in existing.items() if key not in buckets]
+            if stale_ids:
+                SalesDailyRollup.query.filter(SalesDailyRollup.id.in_(stale_ids)).delete(synchronize_session=False)
+            db.session.commit()
+            
+            if buckets or stale_ids:
+                print(f"  rebuilt {day.isoformat()}..{chunk_end.isoformat()} ({processed} orders so far)")
+            day = chunk_end + timedelta(days=1)
+        
+        return processed
+    
+    @staticmethod
+    def query_range(start_date, end_date, group_by=None):
+        """Sum the daily buckets in a date range, split by the requested dimensions.
+        
+        `orders` counts an order once per bucket it has lines in, so summing
+        across dimensions counts multi-category orders more than once.
+        """
+        dimensions = [getattr(SalesDailyRollup, name) for name in (group_by or [])]
+        rows = db.session.query(
+            SalesDailyRollup.day,
+            *dimensions,
+            db.func.sum(SalesDailyRollup.orders),
+            db.func.sum(SalesDailyRollup.units),
+            db.func.sum(SalesDailyRollup.revenue)
+        ).filter(
+            SalesDailyRollup.day >= start_date,
+            SalesDailyRollup.day <= end_date
+        ).group_by(SalesDailyRollup.day, *dimensions).order_by(SalesDailyRollup.day).all()
+        
+        series = []
+        for row in rows:
+            point = {'day': row[0].isoformat()}
+            for index, name in enumerate(group_by or [], start=1):
+                point[name] = row[index] or None
+            point['orders'], point['units'], point['revenue'] = int(row[-3] or 0), int(row[-2] or 0), float(row[-1] or 0)
+            series.append(point)
+        return series
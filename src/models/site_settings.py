@@ -75,6 +75,19 @@ class SiteSettings(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     updated_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     
+    # Bumped on every write so each worker's settings cache can tell the row changed
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    
+    # Settings exposed to the storefront through the public /api/settings endpoint
+    PUBLIC_FIELDS = (
+        'site_name', 'site_title', 'site_description', 'site_keywords', 'site_logo', 'site_favicon',
+        'contact_email', 'contact_phone', 'contact_whatsapp', 'contact_address',
+        'facebook_url', 'instagram_url', 'twitter_url', 'youtube_url', 'tiktok_url',
+        'business_hours', 'currency', 'language',
+        'newsletter_enabled', 'newsletter_title', 'newsletter_description',
+        'maintenance_mode', 'maintenance_message'
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -126,6 +139,9 @@ class SiteSettings(db.Model):
             'updated_by': self.updated_by
         }
     
+    def to_public_dict(self):
+        return {field: getattr(self, field) for field in SiteSettings.PUBLIC_FIELDS}
+    
     @staticmethod
     def get_settings():
         """Get current site settings or create default if none exist"""
@@ -139,11 +155,12 @@ class SiteSettings(db.Model):
     def update_settings(self, data, user_id):
         """Update site settings with new data"""
         for key, value in data.items():
-            if hasattr(self, key):
+            if key != 'version' and hasattr(self, key):
                 setattr(self, key, value)
         
         self.updated_by = user_id
         self.updated_at = datetime.utcnow()
+        self.version = SiteSettings.version + 1  # Incremented in SQL, so concurrent writers never reuse a version
         db.session.commit()
         return self
 
@@ -25,6 +25,7 @@ class User(db.Model):
     password_changed_at = db.Column(db.DateTime)
     two_factor_enabled = db.Column(db.Boolean, default=False)
     two_factor_secret = db.Column(db.String(32))
+    security_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # Bumped to revoke every issued token
     
     # Address Information
     address = db.Column(db.Text)
@@ -52,6 +53,10 @@ class User(db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
     
+    def bump_security_version(self):
+        """Invalidate every token issued so far (incremented in SQL); the caller commits"""
+        self.security_version = User.security_version + 1
+    
     def to_dict(self):
         return {
             'id': self.id,
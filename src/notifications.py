@@ -0,0 +1,47 @@
+import smtplib
+from email.message import EmailMessage
+from flask import current_app
+
+class NotificationError(Exception):
+    """A notification could not be delivered; the job raising it is retried"""
+
+class Notifier:
+    """Sends customer notifications by email through the configured SMTP server.
+    
+    Delivery failures raise NotificationError so the calling job is retried
+    with backoff instead of being marked done. With MAIL_SUPPRESS_SEND (the
+    default in development when no MAIL_SERVER is set) messages are only
+    logged.
+    """
+    
+    def __init__(self, timeout_seconds=10):
+        self.timeout_seconds = timeout_seconds
+    
+    def send_email(self, to, subject, body):
+        config = current_app.config
+        if config.get('MAIL_SUPPRESS_SEND'):
+            current_app.logger.info("Email to %s suppressed: %s", to, subject)
+            return
+        if not config.get('MAIL_SERVER'):
+            raise NotificationError("MAIL_SERVER is not configured")
+        
+        message = EmailMessage()
+        message['From'] = config.get('MAIL_DEFAULT_SENDER')
+        message['To'] = to
+        message['Subject'] = subject
+        message.set_content(body)
+        
+        try:
+            with smtplib.SMTP(config['MAIL_SERVER'], config.get('MAIL_PORT', 587), timeout=self.timeout_seconds) as smtp:
+                if config.get('MAIL_USE_TLS'):
+                    smtp.starttls()
+                if config.get('MAIL_USERNAME'):
+                    smtp.login(config['MAIL_USERNAME'], config.get('MAIL_PASSWORD') or '')
+                smtp.send_message(message)
+        except (smtplib.SMTPException, OSError) as e:
+            raise NotificationError(f"Sending email to {to} failed: {e}") from e
+        
+        current_app.logger.info("Email sent to %s: %s", to, subject)
+
+# Shared notifier instance
+notifier = Notifier()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Order archival for Bilsan Jewelry Backend
+Moves delivered/cancelled orders that have not changed for a configurable
+number of days from orders/order_items into orders_archive/order_items_archive
+
+Usage:
+    python src/order_archive.py [--older-than-days 60] [--batch-size 500]
+"""
+
+import os
+import sys
+import argparse
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import current_app
+from sqlalchemy import insert, select, delete
+from src.models.user import db
+from src.models.order import Order, OrderItem, OrderArchive, OrderItemArchive
+
+ARCHIVABLE_STATUSES = ['delivered', 'cancelled']
+
+def archive_batch(cutoff, batch_size):
+    """Move one batch of archivable orders in a single transaction; returns how many moved"""
+    # The newest order and item rows stay: SQLite tables created without
+    # AUTOINCREMENT hand out max(id) + 1, so archiving them would let the next
+    # order reuse an archived id
+    newest = [order_id for order_id in (
+        db.session.scalar(select(db.func.max(Order.id))),
+        db.session.scalar(select(OrderItem.order_id).order_by(OrderItem.id.desc()).limit(1))
+    ) if order_id is not None]
+    order_ids = [order_id for order_id, in db.session.query(Order.id).filter(
+        Order.status.in_(ARCHIVABLE_STATUSES),
+        Order.updated_at < cutoff,
+        Order.id.notin_(newest)
+    ).order_by(Order.id).limit(batch_size).with_for_update()]
+    if not order_ids:
+        return 0
+    
+    order_columns = Order.__table__.columns.keys()
+    item_columns = OrderItem.__table__.columns.keys()
+    
+    db.session.execute(insert(OrderArchive).from_select(
+        order_columns,
+        select(*[Order.__table__.c[name] for name in order_columns]).where(Order.id.in_(order_ids))
+    ))
+    db.session.execute(insert(OrderItemArchive).from_select(
+        item_columns,
+        select(*[OrderItem.__table__.c[name] for name in item_columns]).where(OrderItem.order_id.in_(order_ids))
+    ))
+    db.session.execute(delete(OrderItem).where(OrderItem.order_id.in_(order_ids)))
+    db.session.execute(delete(Order).where(Order.id.in_(order_ids)))
+    db.session.commit()
+    return len(order_ids)
+
+def archive_orders(older_than_days=None, batch_size=None):
+    """Archive all eligible orders in batches; returns the number of orders moved"""
+    older_than_days = older_than_days or current_app.config.get('ORDER_ARCHIVE_AFTER_DAYS', 60)
+    batch_size = batch_size or current_app.config.get('ORDER_ARCHIVE_BATCH_SIZE', 500)
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    
+    archived = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        if not moved:
+            break
+        archived += moved
+        print(f"  archived {archived} orders")
+    return archived
+
+def main():
+    """Main archival function"""
+    parser = argparse.ArgumentParser(description='Move old delivered/cancelled orders to the archive tables')
+    parser.add_argument('--older-than-days', type=int, help='minimum days since the last order update')
+    parser.add_argument('--batch-size', type=int, help='orders moved per transaction')
+    args = parser.parse_args()
+    
+    from src.app_factory import create_app
+    app = create_app(web=False)
+    with app.app_context():
+        print("🗄️  Archiving orders...")
+        archived = archive_orders(args.older_than_days, args.batch_size)
+        print(f"✅ Archival completed: {archived} orders moved")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+from flask import current_app
+from src.models.user import db
+from src.models.order import Order
+from src.job_queue import job_queue
+from src.notifications import notifier
+
+# Post-checkout work runs in the job worker, outside the request.
+# Handlers may run more than once for the same job and must be idempotent.
+# A failed delivery raises NotificationError, which leaves the job queued for a retry.
+
+def order_recipient(order):
+    """Email address the order's notifications go to"""
+    return order.shipping_email or (order.user.email if order.user else None)
+
+@job_queue.handler('order_created')
+def send_order_confirmation(payload):
+    """Notify the customer that their order was received"""
+    order = db.session.get(Order, payload['order_id'])
+    if not order:
+        return
+    
+    recipient = order_recipient(order)
+    if not recipient:
+        current_app.logger.warning("Order %s has no email address; confirmation not sent", order.order_number)
+        return
+    
+    notifier.send_email(
+        recipient,
+        f"Order {order.order_number} received",
+        f"Thank you for your order {order.order_number}.\n"
+        f"Total: {order.total_amount:.2f}\n"
+        f"We will let you know when its status changes."
+    )
+
+@job_queue.handler('order_status_changed')
+def send_status_notification(payload):
+    """Notify the customer about an order status change"""
+    order = db.session.get(Order, payload['order_id'])
+    if not order:
+        return
+    
+    recipient = order_recipient(order)
+    if not recipient:
+        current_app.logger.warning("Order %s has no email address; status update not sent", order.order_number)
+        return
+    
+    body = f"Your order {order.order_number} is now {payload.get('new_status')}."
+    if order.tracking_number:
+        body += f"\nTracking number: {order.tracking_number}"
+    notifier.send_email(recipient, f"Order {order.order_number}: {payload.get('new_status')}", body)
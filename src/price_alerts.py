@@ -0,0 +1,209 @@
+import time
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update
+from src.models.user import db
+from src.models.price_alert import PriceAlert
+from src.gold_price_service import gold_service, matrix_prices_by_karat, MATRIX_KARATS
+from src.job_queue import job_queue
+from src.notifications import notifier
+
+# Alerts can be set on every karat of the price matrix (SAR per gram)
+ALERT_KARATS = tuple(f"{karat}k" for karat in MATRIX_KARATS)
+
+class PriceAlertIndex:
+    """Active price alerts kept as sorted target prices per (karat, direction).
+    
+    For a new price the triggered alerts form one contiguous slice of each
+    array: 'below' alerts with target >= price sit at the top of the array,
+    'above' alerts with target <= price at the bottom. bisect finds the slice
+    boundary in O(log n) and the slice is cut off in one operation, so a tick
+    costs O(log n + triggered) no matter how many alerts are waiting.
+    
+    The index lives in the process that evaluates ticks (the gold price
+    leader). Before each evaluation it picks up the alerts created since the
+    last sync by created_at, reaching `overlap_seconds` further back: ids are
+    allocated before their transactions commit, so an alert may become
+    visible after one with a higher id, but not later than the overlap. Ids
+    seen within the overlap window are remembered so no alert is added twice.
+    The index is rebuilt from the database every `reload_seconds` to forget
+    alerts that were deleted in the meantime.
+    """
+    
+    def __init__(self, reload_seconds=3600, overlap_seconds=300):
+        self.reload_seconds = reload_seconds
+        self.overlap_seconds = overlap_seconds
+        self.synced_at = None
+        self.loaded_at = None
+        self._recent_ids = {}  # id -> created_at of the alerts inside the overlap window
+        self._books = {}
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return sum(len(targets) for targets, _ in self._books.values())
+    
+    def load(self, rows, synced_at=None):
+        """Replace the index with rows of (id, karat, direction, target_price, created_at)
+        
+        `synced_at` is when the rows were read (the next sync starts from it).
+        """
+        synced_at = synced_at or datetime.utcnow()
+        cutoff = synced_at - timedelta(seconds=self.overlap_seconds)
+        grouped = {}
+        recent_ids = {}
+        for alert_id, karat, direction, target_price, created_at in rows:
+            grouped.setdefault((karat, direction), []).append((target_price, alert_id))
+            if created_at and created_at >= cutoff:
+                recent_ids[alert_id] = created_at
+        books = {}
+        for key, entries in grouped.items():
+            entries.sort()
+            books[key] = ([target for target, _ in entries], [alert_id for _, alert_id in entries])
+        with self._lock:
+            self._books = books
+            self._recent_ids = recent_ids
+            self.synced_at = synced_at
+            self.loaded_at = time.monotonic()
+    
+    def add(self, alert_id, karat, direction, target_price):
+        with self._lock:
+            targets, ids = self._books.setdefault((karat, direction), ([], []))
+            position = bisect_right(targets, target_price)
+            targets.insert(position, target_price)
+            ids.insert(position, alert_id)
+    
+    def pop_triggered(self, karat, price):
+        """Remove and return the ids of every alert on `karat` that `price` triggers"""
+        triggered = []
+        with self._lock:
+            book = self._books.get((karat, 'below'))
+            if book:
+                targets, ids = book
+                start = bisect_left(targets, price)
+                triggered.extend(ids[start:])
+                del targets[start:], ids[start:]
+            book = self._books.get((karat, 'above'))
+            if book:
+                targets, ids = book
+                end = bisect_right(targets, price)
+                triggered.extend(ids[:end])
+                del targets[:end], ids[:end]
+        return triggered
+    
+    def sync(self):
+        """Bring the index up to date with the price_alerts table"""
+        columns = (PriceAlert.id, PriceAlert.karat, PriceAlert.direction, PriceAlert.target_price,
+                   PriceAlert.created_at)
+        now = datetime.utcnow()
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > self.reload_seconds:
+            self.load(db.session.query(*columns).filter(PriceAlert.is_active == True).yield_per(10000), now)
+            return
+        
+        since = self.synced_at - timedelta(seconds=self.overlap_seconds)
+        for alert_id, karat, direction, target_price, created_at in db.session.query(*columns).filter(
+            PriceAlert.created_at >= since, PriceAlert.is_active == True
+        ):
+            if alert_id in self._recent_ids:
+                continue
+            self.add(alert_id, karat, direction, target_price)
+            self._recent_ids[alert_id] = created_at
+        
+        cutoff = now - timedelta(seconds=self.overlap_seconds)
+        self._recent_ids = {
+            alert_id: created_at for alert_id, created_at in self._recent_ids.items() if created_at >= cutoff
+        }
+        self.synced_at = now
+
+class PriceAlertService:
+    """Evaluates price alerts on every gold price tick and queues the notifications"""
+    
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.index = PriceAlertIndex()
+        self._apps = set()
+    
+    def evaluate(self, prices_by_karat):
+        """Trigger the alerts crossed by {karat: price}; the caller commits.
+        
+        Triggered alerts are deactivated and handed to the job worker in
+        batches of `batch_size` (one job per batch), in the same transaction.
+        Returns the number of alerts triggered.
+        """
+        self.index.sync()
+        batch_size = current_app.config.get('PRICE_ALERT_BATCH_SIZE', self.batch_size)
+        now = datetime.utcnow()
+        triggered = 0
+        
+        for karat, price in prices_by_karat.items():
+            if price is None:
+                continue
+            candidate_ids = self.index.pop_triggered(karat, price)
+            payloads = []
+            for start in range(0, len(candidate_ids), batch_size):
+                chunk = candidate_ids[start:start + batch_size]
+                # Skip alerts deleted or triggered since the index was loaded
+                alert_ids = [alert_id for alert_id, in db.session.query(PriceAlert.id).filter(
+                    PriceAlert.id.in_(chunk), PriceAlert.is_active == True
+                )]
+                if not alert_ids:
+                    continue
+                db.session.execute(
+                    update(PriceAlert)
+                    .where(PriceAlert.id.in_(alert_ids))
+                    .values(is_active=False, triggered_at=now, triggered_price=price)
+                )
+                payloads.append({'alert_ids': alert_ids, 'karat': karat, 'price': price})
+                triggered += len(alert_ids)
+            job_queue.enqueue_many('price_alerts_triggered', payloads)
+        
+        return triggered
+    
+    def start(self, app):
+        """Evaluate alerts after every successful GoldPriceService refresh (once per app)"""
+        if id(app) in self._apps:
+            return
+        self._apps.add(id(app))
+        
+        def evaluate(prices):
+            with app.app_context():
+                try:
+                    # Listeners run right after the leader's refresh, so the matrix is the same version
+                    self.evaluate(matrix_prices_by_karat(gold_service.price_matrix))
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    # The popped alerts are still active in the database; reload them next tick
+                    self.index.loaded_at = None
+                    app.logger.exception("Price alert evaluation failed: %s", e)
+        
+        gold_service.add_listener(evaluate)
+
+# Shared price alert service instance
+price_alert_service = PriceAlertService()
+
+@job_queue.handler('price_alerts_triggered')
+def send_price_alerts(payload):
+    """Notify the owners of one batch of triggered alerts.
+    
+    Each alert is marked notified as soon as its email is sent, so when a
+    delivery fails (NotificationError) and the job is retried, only the
+    alerts not notified yet are sent again.
+    """
+    alerts = PriceAlert.query.options(db.joinedload(PriceAlert.user)).filter(
+        PriceAlert.id.in_(payload['alert_ids']), PriceAlert.notified_at.is_(None)
+    ).all()
+    
+    for alert in alerts:
+        if not alert.user or not alert.user.email:
+            current_app.logger.warning("Price alert %s has no email address; not notified", alert.id)
+        else:
+            notifier.send_email(
+                alert.user.email,
+                f"Gold {alert.karat} is {alert.direction} {alert.target_price:g} SAR/g",
+                f"Your price alert was triggered: {alert.karat} gold is now {payload['price']:.2f} SAR per gram "
+                f"({alert.direction} your target of {alert.target_price:g})."
+            )
+        alert.notified_at = datetime.utcnow()
+        db.session.commit()
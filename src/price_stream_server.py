@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Evented server for the live gold price stream and long-poll
+Serves /api/gold-prices/stream (SSE) and /api/gold-prices/poll from one
+asyncio event loop, so an idle connection costs a socket and a coroutine
+instead of a web worker thread. Run one per host next to the web workers
+and route those two paths to it from the reverse proxy.
+
+The gold price leader pushes every new version to it (POST
+/internal/gold-prices/publish, accepted from loopback only, see
+GOLD_PRICE_STREAM_PUBLISH_URL). It also reads the shared price snapshot on
+start and every --resync-seconds in case a push was missed.
+
+Usage:
+    python src/price_stream_server.py [--host 0.0.0.0] [--port 5001]
+"""
+
+import os
+import sys
+import json
+import asyncio
+import argparse
+import ipaddress
+from urllib.parse import urlsplit, parse_qs
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+STREAM_PATH = '/api/gold-prices/stream'
+POLL_PATH = '/api/gold-prices/poll'
+PUBLISH_PATH = '/internal/gold-prices/publish'
+MAX_HEADER_BYTES = 16384
+MAX_PUBLISH_BYTES = 65536
+
+REASONS = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found', 503: 'Service Unavailable'}
+
+class PriceStreamServer:
+    """Fans gold price versions out to SSE and long-poll clients from one event loop.
+    
+    Every version is serialized once. Waiting clients share one asyncio.Event
+    that is set and replaced on each new version, so a price change wakes
+    them all at once and idle connections cost no CPU besides heartbeats.
+    """
+    
+    def __init__(self, snapshot, heartbeat_seconds=15, max_stream_seconds=600, long_poll_seconds=25,
+                 resync_seconds=30, max_connections=10000):
+        self.snapshot = snapshot
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_stream_seconds = max_stream_seconds
+        self.long_poll_seconds = long_poll_seconds
+        self.resync_seconds = resync_seconds
+        self.max_connections = max_connections
+        self.version = None
+        self.prices = None
+        self.event = None  # The current prices as a ready-to-send SSE message
+        self.connections = 0
+        self._changed = None
+        self._resync_task = None
+    
+    def publish(self, prices):
+        """Make `prices` current and wake every waiting client; older versions are ignored"""
+        version = prices.get('version')
+        if self.version is not None and (version is None or version <= self.version):
+            return False
+        data = json.dumps(prices, separators=(',', ':'))
+        self.version = version
+        self.prices = prices
+        self.event = f"id: {version}\nevent: prices\ndata: {data}\n\n".encode()
+        changed, self._changed = self._changed, asyncio.Event()
+        if changed:
+            changed.set()
+        return True
+    
+    def load_snapshot(self):
+        state = self.snapshot.read()
+        if state:
+            self.publish(state['prices'])
+    
+    async def wait_for_change(self, version, timeout):
+        """Wait until the version differs from `version` or `timeout` passes; returns (version, prices, event)"""
+        if self.version == version:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.version, self.prices, self.event
+    
+    async def resync(self):
+        while True:
+            await asyncio.sleep(self.resync_seconds)
+            try:
+                self.load_snapshot()
+            except Exception as e:
+                print(f"Price stream snapshot error: {e}")
+    
+    async def start(self, host, port):
+        """Start listening; returns the asyncio server"""
+        self._changed = asyncio.Event()
+        self.load_snapshot()
+        self._resync_task = asyncio.get_running_loop().create_task(self.resync())
+        return await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+    
+    async def handle(self, reader, writer):
+        try:
+            if self.connections >= self.max_connections:
+                await self.respond(writer, 503, {'success': False, 'error': 'Too many open price streams, try again shortly'},
+                                   {'Retry-After': '5'})
+                return
+            self.connections += 1
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 10)
+                request_line, *header_lines = head.decode('latin-1').split('\r\n')
+                method, target, _ = request_line.split(' ', 2)
+                headers = {}
+                for line in header_lines:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+                url = urlsplit(target)
+                
+                if method == 'GET' and url.path == STREAM_PATH:
+                    await self.stream(writer, headers.get('last-event-id'))
+                elif method == 'GET' and url.path == POLL_PATH:
+                    await self.poll(writer, parse_qs(url.query))
+                elif method == 'POST' and url.path == PUBLISH_PATH:
+                    await self.accept_publish(reader, writer, headers)
+                else:
+                    await self.respond(writer, 404, {'success': False, 'error': 'Not found'})
+            finally:
+                self.connections -= 1
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError, ValueError):
+            pass  # Client went away or sent a malformed request
+        finally:
+            writer.close()
+    
+    async def respond(self, writer, status, body, headers=None):
+        payload = json.dumps(body, separators=(',', ':')).encode()
+        lines = [f"HTTP/1.1 {status} {REASONS[status]}", 'Content-Type: application/json',
+                 f"Content-Length: {len(payload)}", 'Cache-Control: no-store', 'Connection: close']
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + payload)
+        await writer.drain()
+    
+    async def stream(self, writer, last_event_id):
+        """Current prices on connect (unless Last-Event-ID matches), then one event per version and heartbeats"""
+        loop = asyncio.get_running_loop()
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                     b"X-Accel-Buffering: no\r\nConnection: close\r\n\r\nretry: 5000\n\n")
+        version = self.version
+        if self.event and str(version) != last_event_id:
+            writer.write(self.event)
+        await writer.drain()
+        
+        deadline = loop.time() + self.max_stream_seconds
+        while loop.time() < deadline:
+            new_version, _, event = await self.wait_for_change(version, min(self.heartbeat_seconds, deadline - loop.time()))
+            if new_version == version:
+                writer.write(b": keep-alive\n\n")
+            else:
+                version = new_version
+                writer.write(event)
+            await writer.drain()  # Raises once the client is gone
+    
+    async def poll(self, writer, query):
+        """Answer as soon as the version differs from ?version=, or on timeout"""
+        try:
+            version = int(query['version'][0]) if 'version' in query else None
+            timeout = min(float(query['timeout'][0]) if 'timeout' in query else self.long_poll_seconds, 60)
+        except ValueError:
+            await self.respond(writer, 400, {'success': False, 'error': 'version and timeout must be numbers'})
+            return
+        new_version, prices, _ = await self.wait_for_change(version, timeout)
+        await self.respond(writer, 200, {
+            'success': True,
+            'changed': new_version != version,
+            'version': new_version,
+            'prices': prices
+        })
+    
+    async def accept_publish(self, reader, writer, headers):
+        """New prices pushed by the gold price leader on this host"""
+        peer = writer.get_extra_info('peername')
+        if not peer or not ipaddress.ip_address(peer[0]).is_loopback:
+            await self.respond(writer, 403, {'success': False, 'error': 'Publishing is only accepted from this host'})
+            return
+        length = int(headers.get('content-length', 0))
+        if not 0 < length <= MAX_PUBLISH_BYTES:
+            await self.respond(writer, 400, {'success': False, 'error': 'Invalid body'})
+            return
+        prices = json.loads(await reader.readexactly(length))
+        self.publish(prices)
+        await self.respond(writer, 200, {'success': True, 'version': self.version})
+
+def raise_open_file_limit():
+    """Every connection is a file descriptor: allow as many as the hard limit permits"""
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+def main():
+    """Run the stream server until interrupted"""
+    from src.config import config
+    from src.gold_price_service import gold_service
+    
+    settings = config[os.environ.get('FLASK_ENV', 'development')]
+    parser = argparse.ArgumentParser(description='Serve the live gold price stream and long-poll')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--resync-seconds', type=float, default=30)
+    args = parser.parse_args()
+    
+    raise_open_file_limit()
+    server = PriceStreamServer(
+        gold_service.snapshot,  # Read only: this process never refreshes or leads
+        heartbeat_seconds=settings.GOLD_PRICE_STREAM_HEARTBEAT_SECONDS,
+        max_stream_seconds=settings.GOLD_PRICE_STREAM_MAX_SECONDS,
+        long_poll_seconds=settings.GOLD_PRICE_LONG_POLL_SECONDS,
+        resync_seconds=args.resync_seconds,
+        max_connections=settings.GOLD_PRICE_STREAM_SERVER_MAX_CONNECTIONS
+    )
+    
+    async def serve():
+        listener = await server.start(args.host, args.port)
+        print(f"📡 Gold price stream server on {args.host}:{args.port}")
+        async with listener:
+            await listener.serve_forever()
+    
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        print("Stopping stream server...")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from src.gold_price_service import gold_service, matrix_price
+
+class PriceLockError(ValueError):
+    """A price lock token that is invalid, expired or issued for another cart"""
+
+class QuoteEngine:
+    """Prices gold items from the live gold price tick.
+    
+    unit price = weight × karat rate + weight × making charge, before VAT.
+    VAT (VAT_RATE) is computed here on the line total and is what the order
+    stores as tax_amount. Products without a karat/weight, or any product
+    while the gold price service has no fresh successful tick (bootstrap
+    prices, failing providers), keep their catalogue price. Quotes are
+    memoized by (product_id, tick version) and dropped when a new tick
+    arrives, so rendering the same cart again within one tick only costs
+    dictionary lookups. A product edited mid-tick (different updated_at) is
+    quoted again.
+    """
+    
+    LOCK_SALT = 'price-lock'
+    
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._quotes = {}
+        self._version = None
+        self._lock = threading.Lock()
+    
+    def current_matrix(self):
+        """The live price matrix, or None while the last successful tick is missing or too old"""
+        matrix = gold_service.get_price_matrix()
+        if gold_service.is_stale():
+            return None
+        return matrix
+    
+    def vat(self, amount):
+        """VAT due on a pre-VAT amount"""
+        return round(amount * current_app.config.get('VAT_RATE', 0.15), 2)
+    
+    def _compute(self, product, matrix):
+        rate = None
+        if matrix and product.weight and product.gold_karat in matrix['karats']:
+            rate = matrix_price(matrix, product.gold_karat)
+        if not rate:
+            return {
+                'product_id': product.id,
+                'tick_version': matrix.get('version') if matrix else None,
+                'live': False,
+                'unit_price': product.price,
+                'vat': self.vat(product.price or 0)
+            }
+        
+        making_charge_per_gram = product.making_charge
+        if making_charge_per_gram is None:
+            making_charge_per_gram = current_app.config.get('GOLD_MAKING_CHARGE_PER_GRAM', 30)
+        gold_value = product.weight * rate
+        making_charge = product.weight * making_charge_per_gram
+        return {
+            'product_id': product.id,
+            'tick_version': matrix.get('version'),
+            'live': True,
+            'karat': product.gold_karat,
+            'weight': product.weight,
+            'gold_rate': rate,
+            'gold_value': round(gold_value, 2),
+            'making_charge': round(making_charge, 2),
+            'unit_price': round(gold_value + making_charge, 2),
+            'vat': self.vat(gold_value + making_charge)
+        }
+    
+    def quote_product(self, product, matrix=None):
+        """Quote for one product (anything with the Product pricing columns).
+        
+        `matrix` is a current_matrix() result; it is looked up when omitted.
+        """
+        if matrix is None:
+            matrix = self.current_matrix()
+        key = (product.id, matrix.get('version') if matrix else None)
+        cached = self._quotes.get(key)
+        if cached is not None and cached[0] == product.updated_at:
+            self.hits += 1
+            return cached[1]
+        
+        self.misses += 1
+        quote = self._compute(product, matrix)
+        with self._lock:
+            if key[1] != self._version or len(self._quotes) >= self.max_entries:
+                # New tick: the previous tick's quotes can never be hit again
+                self._quotes = {}
+                self._version = key[1]
+            self._quotes[key] = (product.updated_at, quote)
+        return quote
+    
+    def quote_lines(self, lines):
+        """Quote [(product, quantity), ...] against a single tick; `vat` is what the order will charge"""
+        matrix = self.current_matrix()
+        quoted = []
+        for product, quantity in lines:
+            unit_price = self.quote_product(product, matrix)['unit_price']
+            quoted.append({
+                'product_id': product.id,
+                'quantity': quantity,
+                'unit_price': unit_price,
+                'subtotal': round(quantity * unit_price, 2)
+            })
+        total = round(sum(line['subtotal'] for line in quoted), 2)
+        vat = self.vat(total)
+        return {
+            'tick_version': matrix.get('version') if matrix else None,
+            'lines': quoted,
+            'total': total,
+            'vat': vat,
+            'total_with_vat': round(total + vat, 2)
+        }
+    
+    def _serializer(self):
+        return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=self.LOCK_SALT)
+    
+    def lock(self, cart_id, quote):
+        """Signed token fixing the unit prices of a quote_lines() result for this cart.
+        
+        Returns (token, expires_at).
+        """
+        seconds = current_app.config.get('PRICE_LOCK_SECONDS', 600)
+        token = self._serializer().dumps({
+            'cart_id': cart_id,
+            'tick_version': quote['tick_version'],
+            'prices': {str(line['product_id']): line['unit_price'] for line in quote['lines']}
+        })
+        return token, datetime.utcnow() + timedelta(seconds=seconds)
+    
+    def read_lock(self, token, cart_id):
+        """Locked unit prices {product_id: unit_price}; raises PriceLockError"""
+        try:
+            payload = self._serializer().loads(token, max_age=current_app.config.get('PRICE_LOCK_SECONDS', 600))
+        except SignatureExpired:
+            raise PriceLockError('Price lock has expired')
+        except BadSignature:
+            raise PriceLockError('Invalid price lock')
+        if payload.get('cart_id') != cart_id:
+            raise PriceLockError('Price lock was issued for another cart')
+        return {int(product_id): price for product_id, price in payload['prices'].items()}
+    
+    def clear(self):
+        with self._lock:
+            self._quotes = {}
+            self._version = None
+
+# Shared quote engine instance
+quote_engine = QuoteEngine()
@@ -0,0 +1,46 @@
+from flask import Blueprint, request, jsonify
+from src.models.sales_rollup import SalesDailyRollup
+from src.security import admin_required
+from datetime import date, timedelta
+
+analytics_bp = Blueprint('analytics', __name__)
+
+@analytics_bp.route('/analytics/sales', methods=['GET'])
+@admin_required
+def get_sales_analytics():
+    """Daily paid sales for a date range, served from the rollup tables (Admin only)"""
+    try:
+        end = request.args.get('end')
+        start = request.args.get('start')
+        group_by = request.args.get('group_by', '')
+        
+        end_date = date.fromisoformat(end) if end else date.today()
+        start_date = date.fromisoformat(start) if start else end_date - timedelta(days=29)
+        if start_date > end_date:
+            return jsonify({'success': False, 'error': 'start must not be after end'}), 400
+        
+        dimensions = [name for name in group_by.split(',') if name]
+        invalid = [name for name in dimensions if name not in SalesDailyRollup.DIMENSIONS]
+        if invalid:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid group_by: {", ".join(invalid)} (allowed: {", ".join(SalesDailyRollup.DIMENSIONS)})'
+            }), 400
+        
+        series = SalesDailyRollup.query_range(start_date, end_date, dimensions)
+        
+        return jsonify({
+            'success': True,
+            'start': start_date.isoformat(),
+            'end': end_date.isoformat(),
+            'group_by': dimensions,
+            'series': series,
+            'totals': {
+                'units': sum(point['units'] for point in series),
+                'revenue': sum(point['revenue'] for point in series)
+            }
+        })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -1,13 +1,13 @@
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from src.models.user import User, db
 from src.security import (
     hash_password, check_password, validate_password_strength, 
     validate_email, sanitize_input, rate_limit_by_user, 
     log_security_event, check_suspicious_activity, revoke_token,
-    limiter
+    create_user_token, user_auth_cache, limiter
 )
-from datetime import datetime, timedelta
+from datetime import datetime
 import re
 
 auth_bp = Blueprint('auth', __name__)
@@ -77,10 +77,7 @@ def register():
         log_security_event('user_registered', user_id=user.id, details={'email': email})
         
         # Create access token
-        access_token = create_access_token(
-            identity=user.id,
-            expires_delta=timedelta(hours=24)
-        )
+        access_token = create_user_token(user)
         
         return jsonify({
             'message': 'تم إنشاء الحساب بنجاح',
@@ -145,10 +142,7 @@ def login():
         log_security_event('user_login', user_id=user.id)
         
         # Create access token
-        access_token = create_access_token(
-            identity=user.id,
-            expires_delta=timedelta(hours=24)
-        )
+        access_token = create_user_token(user)
         
         return jsonify({
             'message': 'تم تسجيل الدخول بنجاح',
@@ -225,12 +219,17 @@ def change_password():
         # Update password
         user.password_hash = hash_password(new_password)
         user.password_changed_at = datetime.utcnow()
+        user.bump_security_version()  # Sign out every other session
         db.session.commit()
+        user_auth_cache.invalidate(user.id)
         
         # Log password change
         log_security_event('password_changed', user_id=current_user_id)
         
-        return jsonify({'message': 'تم تغيير كلمة المرور بنجاح'}), 200
+        return jsonify({
+            'message': 'تم تغيير كلمة المرور بنجاح',
+            'access_token': create_user_token(user)
+        }), 200
         
     except Exception as e:
         log_security_event('password_change_error', details={'error': str(e)})
@@ -301,6 +300,7 @@ def update_profile():
         
         user.updated_at = datetime.utcnow()
         db.session.commit()
+        user_auth_cache.invalidate(user.id)
         
         # Log profile update
         log_security_event('profile_updated', user_id=current_user_id)
@@ -325,7 +325,8 @@ def verify_token():
     """Verify JWT token validity"""
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        # Cached auth state, already loaded by the token revocation check
+        user = user_auth_cache.get(current_user_id)
         
         if not user or not user.is_active:
             return jsonify({'valid': False}), 401
@@ -333,7 +334,7 @@ def verify_token():
         return jsonify({
             'valid': True,
             'user': {
-                'id': user.id,
+                'id': int(current_user_id),
                 'name': user.name,
                 'email': user.email,
                 'is_admin': user.is_admin
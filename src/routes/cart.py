@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify, session
 from src.models.user import db
-from src.models.cart import Cart, CartItem
+from src.models.cart import Cart, CartItem, StockHold
 from src.models.product import Product
+from src.stock_reservation_service import reservation_service
+from src.quote_engine import quote_engine
 
 cart_bp = Blueprint('cart', __name__)
 
@@ -63,10 +65,6 @@ def add_to_cart():
         if not product or not product.is_active:
             return jsonify({'success': False, 'error': 'Product not found'}), 404
         
-        # Check stock
-        if product.stock_quantity < quantity:
-            return jsonify({'success': False, 'error': 'Insufficient stock'}), 400
-        
         cart = get_or_create_cart(user_id, session_id)
         
         # Check if item already exists in cart
@@ -79,10 +77,7 @@ def add_to_cart():
         
         if existing_item:
             # Update quantity
-            new_quantity = existing_item.quantity + quantity
-            if product.stock_quantity < new_quantity:
-                return jsonify({'success': False, 'error': 'Insufficient stock'}), 400
-            existing_item.quantity = new_quantity
+            existing_item.quantity = existing_item.quantity + quantity
         else:
             # Create new cart item
             cart_item = CartItem(
@@ -93,6 +88,12 @@ def add_to_cart():
                 custom_engraving=custom_engraving
             )
             db.session.add(cart_item)
+        db.session.flush()
+        
+        # Hold stock for the product's total quantity in this cart
+        if not reservation_service.sync_hold(cart.id, product_id):
+            db.session.rollback()
+            return jsonify({'success': False, 'error': 'Insufficient stock'}), 400
         
         db.session.commit()
         
@@ -117,15 +118,19 @@ def update_cart_item():
             return jsonify({'success': False, 'error': 'Cart item ID and quantity required'}), 400
         
         cart_item = CartItem.query.get_or_404(cart_item_id)
+        cart_id, product_id = cart_item.cart_id, cart_item.product_id
         
         if quantity <= 0:
             # Remove item if quantity is 0 or negative
             db.session.delete(cart_item)
         else:
-            # Check stock
-            if cart_item.product.stock_quantity < quantity:
-                return jsonify({'success': False, 'error': 'Insufficient stock'}), 400
             cart_item.quantity = quantity
+        db.session.flush()
+        
+        # Resize the stock hold to the new quantity
+        if not reservation_service.sync_hold(cart_id, product_id):
+            db.session.rollback()
+            return jsonify({'success': False, 'error': 'Insufficient stock'}), 400
         
         db.session.commit()
         
@@ -149,8 +154,11 @@ def remove_from_cart():
         
         cart_item = CartItem.query.get_or_404(cart_item_id)
         cart = cart_item.cart
+        product_id = cart_item.product_id
         
         db.session.delete(cart_item)
+        db.session.flush()
+        reservation_service.sync_hold(cart.id, product_id)
         db.session.commit()
         
         return jsonify({
@@ -179,6 +187,7 @@ def clear_cart():
         
         if cart:
             CartItem.query.filter_by(cart_id=cart.id).delete()
+            reservation_service.release_cart_holds(cart.id)
             db.session.commit()
         
         return jsonify({
@@ -189,6 +198,76 @@ def clear_cart():
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@cart_bp.route('/cart/reserve', methods=['POST'])
+def reserve_cart():
+    """Hold stock for every cart item before payment (restarts the hold timer)"""
+    try:
+        data = request.get_json()
+        user_id = data.get('user_id')
+        session_id = data.get('session_id')
+        
+        if not user_id and not session_id:
+            return jsonify({'success': False, 'error': 'User ID or Session ID required'}), 400
+        
+        if user_id:
+            cart = Cart.query.filter_by(user_id=user_id).first()
+        else:
+            cart = Cart.query.filter_by(session_id=session_id).first()
+        
+        if not cart or not cart.items:
+            return jsonify({'success': False, 'error': 'Cart is empty'}), 400
+        
+        failed = reservation_service.hold_cart(cart.id)
+        if failed:
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'error': 'Insufficient stock',
+                'unavailable_product_ids': failed
+            }), 400
+        
+        db.session.commit()
+        holds = StockHold.query.filter_by(cart_id=cart.id).all()
+        
+        return jsonify({
+            'success': True,
+            'holds': [hold.to_dict() for hold in holds]
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@cart_bp.route('/cart/price-lock', methods=['POST'])
+def lock_cart_prices():
+    """Quote the cart at the current gold price and return a token that fixes it for checkout"""
+    try:
+        data = request.get_json()
+        user_id = data.get('user_id')
+        session_id = data.get('session_id')
+        
+        if not user_id and not session_id:
+            return jsonify({'success': False, 'error': 'User ID or Session ID required'}), 400
+        
+        if user_id:
+            cart = Cart.query.filter_by(user_id=user_id).first()
+        else:
+            cart = Cart.query.filter_by(session_id=session_id).first()
+        
+        if not cart or not cart.items:
+            return jsonify({'success': False, 'error': 'Cart is empty'}), 400
+        
+        quote = cart.quote()
+        token, expires_at = quote_engine.lock(cart.id, quote)
+        
+        return jsonify({
+            'success': True,
+            'price_lock': token,
+            'expires_at': expires_at.isoformat(),
+            'quote': quote
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @cart_bp.route('/cart/count', methods=['GET'])
 def get_cart_count():
     """Get total items count in cart"""
@@ -1,12 +1,37 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
 from src.models.user import db
 from src.models.gold_price import GoldPrice, SizeGuide, AIFitting
+from src.models.gold_price_history import GoldPriceCandle
+from src.models.price_alert import PriceAlert, PRICE_ALERT_DIRECTIONS
 from src.gold_price_service import gold_service
-from datetime import datetime
+from src.gold_price_stream import broadcaster
+from src.price_alerts import ALERT_KARATS
+from src.size_guides import size_guide_cache
+from src.security import limiter
+from src.ai_fitting import (
+    FITTING_CATEGORIES, HashingUpload, UploadError, pending_count, submit_fitting, upload_dir
+)
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import parse_form_data
+from datetime import datetime, timedelta
 import requests
+import time
+import json
+import hashlib
+import base64
+import binascii
 
 gold_price_bp = Blueprint('gold_price', __name__)
 
+# Largest number of candles /gold-prices/history returns in one response
+HISTORY_MAX_POINTS = 2000
+
+# Serialized /gold-prices/matrix body and ETag by price version
+_matrix_responses = {}
+
+# Largest page /ai-fitting/history returns
+FITTING_HISTORY_MAX_LIMIT = 100
+
 @gold_price_bp.route('/gold-prices', methods=['GET'])
 def get_gold_prices():
     """Get current gold prices"""
@@ -30,31 +55,28 @@ def update_gold_prices():
     """Update gold prices (Admin only or automated)"""
     try:
         data = request.get_json()
+        rows = []
         
         for price_data in data.get('prices', []):
             karat = price_data.get('karat')
             price_per_gram = price_data.get('price_per_gram')
-            source = price_data.get('source', 'manual')
-            
-            # Find existing price or create new one
-            gold_price = GoldPrice.query.filter_by(karat=karat).first()
-            if gold_price:
-                gold_price.price_per_gram = price_per_gram
-                gold_price.source = source
-                gold_price.last_updated = datetime.utcnow()
-            else:
-                gold_price = GoldPrice(
-                    karat=karat,
-                    price_per_gram=price_per_gram,
-                    source=source
-                )
-                db.session.add(gold_price)
+            if not karat or price_per_gram is None:
+                return jsonify({'success': False, 'error': 'Each price needs karat and price_per_gram'}), 400
+            rows.append({
+                'karat': karat,
+                'currency': price_data.get('currency', 'SAR'),
+                'price_per_gram': price_per_gram,
+                'source': price_data.get('source', 'manual')
+            })
         
+        # One upsert for the whole table plus the history ticks, in one transaction
+        updated = GoldPrice.save_prices(rows)
         db.session.commit()
         
         return jsonify({
             'success': True,
-            'message': 'Gold prices updated successfully'
+            'message': 'Gold prices updated successfully',
+            'updated': updated
         })
     except Exception as e:
         db.session.rollback()
@@ -64,33 +86,25 @@ def update_gold_prices():
 def fetch_gold_prices():
     """Fetch gold prices from external API (Admin only)"""
     try:
-        # استخدام الخدمة التلقائية لجلب الأسعار
-        updated_prices = gold_service.update_prices()
-        
-        # تحديث قاعدة البيانات بالأسعار الجديدة
-        for karat, price in [('18k', updated_prices['karat18']), 
-                            ('21k', updated_prices['karat21']), 
-                            ('24k', updated_prices['karat24'])]:
-            
-            gold_price = GoldPrice.query.filter_by(karat=karat).first()
-            if gold_price:
-                gold_price.price_per_gram = price
-                gold_price.source = 'api_auto'
-                gold_price.last_updated = datetime.utcnow()
-            else:
-                gold_price = GoldPrice(
-                    karat=karat,
-                    price_per_gram=price,
-                    source='api_auto'
-                )
-                db.session.add(gold_price)
+        data = request.get_json(silent=True) or {}
+        # لا ننتظر المزود الخارجي إلا إذا طُلب ذلك صراحةً (بحد أقصى wait_seconds)
+        wait_seconds = min(float(data.get('wait_seconds', 0)), 10)
         
-        db.session.commit()
+        # استخدام الخدمة التلقائية لجلب الأسعار (تحديث واحد في الخلفية مهما تعدد الطلبات)
+        version = gold_service.version
+        refresh_started = gold_service.refresh_async()
+        if wait_seconds > 0:
+            gold_service.wait_for_refresh(wait_seconds)
+        updated_prices = gold_service.get_current_prices()
         
+        # كل تحديث ناجح يُحفظ في قاعدة البيانات والسجل مرة واحدة عبر مستمع الأسعار (start_recording)
         return jsonify({
             'success': True,
             'message': 'Gold prices fetched and updated successfully',
-            'prices': updated_prices
+            'prices': updated_prices,
+            'refresh_started': refresh_started,
+            'refreshed': gold_service.version > version,
+            'status': gold_service.get_status()
         })
     except Exception as e:
         db.session.rollback()
@@ -103,11 +117,14 @@ def start_auto_update():
         data = request.get_json()
         interval_minutes = data.get('interval_minutes', 30)  # افتراضي 30 دقيقة
         
-        gold_service.start_auto_update(interval_minutes)
+        # Safe to call repeatedly: an already running updater only changes its interval
+        started = gold_service.start_auto_update(interval_minutes)
         
         return jsonify({
             'success': True,
-            'message': f'Auto-update started with {interval_minutes} minutes interval'
+            'message': f'Auto-update {"started" if started else "already running"} with {interval_minutes} minutes interval',
+            'started': started,
+            'status': gold_service.get_status()
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -120,30 +137,226 @@ def get_live_prices():
         
         return jsonify({
             'success': True,
-            'prices': live_prices
+            'prices': live_prices,
+            'status': gold_service.get_status()
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@gold_price_bp.route('/size-guide', methods=['GET'])
-def get_size_guide():
-    """Get size guide for jewelry"""
+@gold_price_bp.route('/gold-prices/matrix', methods=['GET'])
+def get_price_matrix():
+    """Prices for every karat × currency × unit, serialized once per price version"""
+    try:
+        matrix = gold_service.get_price_matrix()
+        cached = _matrix_responses.get(matrix['version'])
+        if cached is None:
+            body = json.dumps({'success': True, 'matrix': matrix}, separators=(',', ':'))
+            cached = (body, hashlib.sha1(body.encode()).hexdigest())
+            # Only the current version is ever served again
+            _matrix_responses.clear()
+            _matrix_responses[matrix['version']] = cached
+        
+        response = Response(cached[0], mimetype='application/json')
+        response.set_etag(cached[1])
+        # Clients keep the table and revalidate with If-None-Match (304 until the next tick)
+        response.headers['Cache-Control'] = 'public, no-cache'
+        return response.make_conditional(request)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def stream_capacity_response():
+    response = jsonify({'success': False, 'error': 'Too many open price streams, try again shortly'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '5'
+    return response
+
+@gold_price_bp.route('/gold-prices/stream', methods=['GET'])
+@limiter.exempt
+def stream_gold_prices():
+    """Server-Sent Events stream pushing the prices each time they change.
+    
+    The current prices are sent on connect (unless Last-Event-ID already
+    matches), then one event per new version and a comment line as
+    heartbeat. The server ends the stream after a while; EventSource
+    reconnects on its own, resuming from Last-Event-ID.
+    
+    In production the reverse proxy sends this path and /gold-prices/poll
+    to src/price_stream_server.py; these in-app versions hold a thread per
+    client and are the single-process fallback.
+    """
+    broadcaster.start()
+    heartbeat = current_app.config.get('GOLD_PRICE_STREAM_HEARTBEAT_SECONDS', 15)
+    max_seconds = current_app.config.get('GOLD_PRICE_STREAM_MAX_SECONDS', 600)
+    last_event_id = request.headers.get('Last-Event-ID')
+    
+    # Every open stream holds a worker thread; past the cap clients fall back to /gold-prices/live
+    if not broadcaster.subscribe(current_app.config.get('GOLD_PRICE_MAX_STREAMS')):
+        return stream_capacity_response()
+    
+    def generate():
+        yield "retry: 5000\n\n"
+        version = broadcaster.version
+        if str(version) != last_event_id:
+            yield broadcaster.event
+        
+        deadline = time.monotonic() + max_seconds
+        while time.monotonic() < deadline:
+            new_version, _, event = broadcaster.wait_for_change(version, heartbeat)
+            if new_version == version:
+                yield ": keep-alive\n\n"
+            else:
+                version = new_version
+                yield event
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Stop nginx from buffering the stream
+    })
+    # Runs even if the client disconnects before the first chunk
+    response.call_on_close(broadcaster.unsubscribe)
+    return response
+
+@gold_price_bp.route('/gold-prices/poll', methods=['GET'])
+@limiter.exempt
+def poll_gold_prices():
+    """Long-poll fallback: answers as soon as the version differs from ?version=, or on timeout"""
+    try:
+        broadcaster.start()
+        version = request.args.get('version', type=int)
+        timeout = min(request.args.get('timeout', current_app.config.get('GOLD_PRICE_LONG_POLL_SECONDS', 25), type=float), 60)
+        
+        # Waiting long-polls share the stream cap
+        if not broadcaster.subscribe(current_app.config.get('GOLD_PRICE_MAX_STREAMS')):
+            return stream_capacity_response()
+        try:
+            new_version, prices, _ = broadcaster.wait_for_change(version, timeout)
+        finally:
+            broadcaster.unsubscribe()
+        
+        return jsonify({
+            'success': True,
+            'changed': new_version != version,
+            'version': new_version,
+            'prices': prices
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@gold_price_bp.route('/gold-prices/history', methods=['GET'])
+def get_gold_price_history():
+    """OHLC chart data for one karat and currency"""
     try:
-        category = request.args.get('category')
+        karat = request.args.get('karat', '21k')
+        currency = request.args.get('currency', 'SAR')
+        resolution = request.args.get('resolution')  # 1m, 1h, 1d (default: finest that fits)
+        
+        try:
+            end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else datetime.utcnow()
+            start = datetime.fromisoformat(request.args['start']) if request.args.get('start') else end - timedelta(days=30)
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Invalid date'}), 400
+        if start >= end:
+            return jsonify({'success': False, 'error': 'start must be before end'}), 400
         
-        query = SizeGuide.query.filter_by(is_active=True)
-        if category:
-            query = query.filter_by(category=category)
+        if resolution is None:
+            resolution = GoldPriceCandle.resolution_for(start, end, HISTORY_MAX_POINTS)
+        elif resolution not in GoldPriceCandle.RESOLUTIONS:
+            return jsonify({'success': False, 'error': 'Invalid resolution'}), 400
+        elif (end - start) / GoldPriceCandle.RESOLUTIONS[resolution] > HISTORY_MAX_POINTS:
+            return jsonify({'success': False, 'error': f'Range too large for {resolution} resolution'}), 400
         
-        sizes = query.order_by(SizeGuide.size_value.asc()).all()
+        candles = GoldPriceCandle.query_range(karat, currency, resolution, start, end)
         
         return jsonify({
             'success': True,
-            'sizes': [size.to_dict() for size in sizes]
+            'karat': karat,
+            'currency': currency,
+            'resolution': resolution,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'candles': [candle.to_dict() for candle in candles]
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@gold_price_bp.route('/gold-prices/alerts', methods=['POST'])
+def create_price_alert():
+    """Subscribe to a gold price alert (e.g. 21k below 200 SAR/g)"""
+    try:
+        data = request.get_json()
+        user_id = data.get('user_id')
+        karat = data.get('karat')
+        direction = data.get('direction', 'below')
+        target_price = data.get('target_price')
+        
+        if not user_id or karat not in ALERT_KARATS:
+            return jsonify({'success': False, 'error': 'user_id and a valid karat are required'}), 400
+        if direction not in PRICE_ALERT_DIRECTIONS:
+            return jsonify({'success': False, 'error': 'direction must be below or above'}), 400
+        if not isinstance(target_price, (int, float)) or target_price <= 0:
+            return jsonify({'success': False, 'error': 'target_price must be a positive number'}), 400
+        
+        alert = PriceAlert(user_id=user_id, karat=karat, direction=direction, target_price=target_price)
+        db.session.add(alert)
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'alert': alert.to_dict()
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@gold_price_bp.route('/gold-prices/alerts', methods=['GET'])
+def get_price_alerts():
+    """List a user's price alerts"""
+    try:
+        user_id = request.args.get('user_id', type=int)
+        if not user_id:
+            return jsonify({'success': False, 'error': 'user_id is required'}), 400
+        
+        alerts = PriceAlert.query.filter_by(user_id=user_id).order_by(PriceAlert.created_at.desc()).all()
+        
+        return jsonify({
+            'success': True,
+            'alerts': [alert.to_dict() for alert in alerts]
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@gold_price_bp.route('/gold-prices/alerts/<int:alert_id>', methods=['DELETE'])
+def delete_price_alert(alert_id):
+    """Cancel a price alert"""
+    try:
+        alert = PriceAlert.query.get_or_404(alert_id)
+        db.session.delete(alert)
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Price alert deleted'
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@gold_price_bp.route('/size-guide', methods=['GET'])
+def get_size_guide():
+    """Get size guide for jewelry"""
+    try:
+        category = request.args.get('category') or None
+        
+        # Served from memory until the size_guides table changes
+        body, etag = size_guide_cache.get(category)
+        
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'public, max-age=60'
+        return response.make_conditional(request)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @gold_price_bp.route('/size-guide', methods=['POST'])
 def create_size_guide():
     """Create size guide entry (Admin only)"""
@@ -159,6 +372,7 @@ def create_size_guide():
         
         db.session.add(size_guide)
         db.session.commit()
+        size_guide_cache.invalidate()
         
         return jsonify({
             'success': True,
@@ -170,58 +384,123 @@ def create_size_guide():
 
 @gold_price_bp.route('/ai-fitting', methods=['POST'])
 def ai_fitting():
-    """AI-powered size fitting"""
+    """Submit a hand/wrist image for AI size fitting.
+    
+    Takes a multipart upload (image file plus category, user_id, session_id)
+    streamed straight to disk, or the legacy JSON body with base64
+    image_data. Returns 202 with the queued fitting to poll, or 200 with the
+    result when the same image was measured before.
+    """
+    upload = None
     try:
-        data = request.get_json()
-        user_id = data.get('user_id')
-        session_id = data.get('session_id')
+        # Backpressure: refuse new work while the workers are behind
+        if pending_count() >= current_app.config.get('AI_FITTING_MAX_PENDING', 100):
+            response = jsonify({'success': False, 'error': 'Fitting queue is full, try again shortly'})
+            response.headers['Retry-After'] = str(current_app.config.get('AI_FITTING_RETRY_AFTER_SECONDS', 5))
+            return response, 503
+        
+        max_bytes = current_app.config.get('AI_FITTING_MAX_UPLOAD_MB', 5) * 1024 * 1024
+        directory = upload_dir()
+        
+        if request.mimetype == 'multipart/form-data':
+            def stream_factory(total_content_length, content_type, filename, content_length=None):
+                nonlocal upload
+                if upload is not None:
+                    raise UploadError('Upload a single image')
+                upload = HashingUpload(directory, max_bytes)
+                return upload
+            _, data, files = parse_form_data(request.environ, stream_factory=stream_factory,
+                                             max_content_length=max_bytes + 64 * 1024)
+            if 'image' not in files:
+                return jsonify({'success': False, 'error': 'Category and image required'}), 400
+        else:
+            data = request.get_json() or {}
+            image_data = data.get('image_data')  # Base64 encoded image
+            if image_data:
+                upload = HashingUpload(directory, max_bytes)
+                upload.write(base64.b64decode(image_data.split(',', 1)[-1]))
+        
         category = data.get('category')  # ring, bracelet
-        image_data = data.get('image_data')  # Base64 encoded image
-        
-        if not category or not image_data:
-            return jsonify({'success': False, 'error': 'Category and image data required'}), 400
-        
-        # This is a placeholder for AI processing
-        # In a real implementation, you would:
-        # 1. Process the image using computer vision
-        # 2. Detect hand/wrist measurements
-        # 3. Calculate recommended size
-        
-        # Mock AI processing result
-        mock_measurements = {
-            'width': 18.5 if category == 'ring' else 16.2,
-            'length': 20.1 if category == 'ring' else 18.8,
-            'circumference': 58.2 if category == 'ring' else 165.4
-        }
-        
-        if category == 'ring':
-            recommended_size = 'M' if mock_measurements['circumference'] < 60 else 'L'
-        else:  # bracelet
-            recommended_size = 'S' if mock_measurements['circumference'] < 160 else 'M'
-        
-        confidence_score = 0.85  # Mock confidence
-        
-        # Save AI fitting result
-        ai_fitting = AIFitting(
-            user_id=user_id,
-            session_id=session_id,
-            category=category,
-            measurements=mock_measurements,
-            recommended_size=recommended_size,
-            confidence_score=confidence_score
-        )
+        if category not in FITTING_CATEGORIES or upload is None:
+            return jsonify({'success': False, 'error': 'Category and image required'}), 400
         
-        db.session.add(ai_fitting)
+        image_hash = upload.finish()
+        upload = None
+        fitting = submit_fitting(
+            image_hash, category,
+            user_id=data.get('user_id') or None,
+            session_id=data.get('session_id') or None
+        )
         db.session.commit()
         
-        return jsonify({
+        if fitting.status == 'done':
+            return jsonify({
+                'success': True,
+                'cached': True,
+                'fitting': fitting.to_dict(),
+                'message': f'Recommended size: {fitting.recommended_size} (Confidence: {int(fitting.confidence_score * 100)}%)'
+            })
+        
+        response = jsonify({
             'success': True,
-            'fitting': ai_fitting.to_dict(),
-            'message': f'Recommended size: {recommended_size} (Confidence: {int(confidence_score * 100)}%)'
+            'cached': False,
+            'job_id': fitting.id,
+            'fitting': fitting.to_dict(),
+            'poll_url': f"{request.script_root}/api/ai-fitting/{fitting.id}",
+            'events_url': f"{request.script_root}/api/ai-fitting/{fitting.id}/events"
         })
+        response.headers['Location'] = f"{request.script_root}/api/ai-fitting/{fitting.id}"
+        return response, 202
+    except (UploadError, binascii.Error) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except RequestEntityTooLarge:
+        return jsonify({'success': False, 'error': 'Image is too large'}), 413
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        if upload is not None:
+            upload.discard()
+
+@gold_price_bp.route('/ai-fitting/<int:fitting_id>', methods=['GET'])
+def get_ai_fitting(fitting_id):
+    """Poll a fitting job"""
+    try:
+        fitting = AIFitting.query.get_or_404(fitting_id)
+        
+        return jsonify({
+            'success': True,
+            'fitting': fitting.to_dict()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@gold_price_bp.route('/ai-fitting/<int:fitting_id>/events', methods=['GET'])
+@limiter.exempt
+def stream_ai_fitting(fitting_id):
+    """Server-Sent Events: the fitting on every status change, closing once it is done or failed"""
+    max_seconds = current_app.config.get('AI_FITTING_STREAM_MAX_SECONDS', 120)
+    
+    def events():
+        status = None
+        deadline = time.monotonic() + max_seconds
+        while time.monotonic() < deadline:
+            fitting = db.session.get(AIFitting, fitting_id, populate_existing=True)
+            if fitting is None:
+                yield "event: error\ndata: {\"error\":\"Fitting not found\"}\n\n"
+                return
+            if fitting.status != status:
+                status = fitting.status
+                yield f"event: {status}\ndata: {json.dumps(fitting.to_dict(), separators=(',', ':'))}\n\n"
+                if status in ('done', 'failed'):
+                    return
+            db.session.rollback()  # End the read transaction so the next poll sees new commits
+            time.sleep(0.5)
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
 @gold_price_bp.route('/ai-fitting/history', methods=['GET'])
 def get_ai_fitting_history():
@@ -233,17 +512,24 @@ def get_ai_fitting_history():
         if not user_id and not session_id:
             return jsonify({'success': False, 'error': 'User ID or Session ID required'}), 400
         
-        query = AIFitting.query
+        limit = max(1, min(request.args.get('limit', 20, type=int), FITTING_HISTORY_MAX_LIMIT))
+        cursor = request.args.get('cursor', type=int)  # id of the last fitting of the previous page
+        
+        # Newest first by id, walking the (user_id, id) / (session_id, id) index
+        query = db.session.query(*[getattr(AIFitting, column) for column in AIFitting.HISTORY_COLUMNS])
         if user_id:
-            query = query.filter_by(user_id=user_id)
+            query = query.filter(AIFitting.user_id == user_id)
         else:
-            query = query.filter_by(session_id=session_id)
+            query = query.filter(AIFitting.session_id == session_id)
+        if cursor:
+            query = query.filter(AIFitting.id < cursor)
         
-        fittings = query.order_by(AIFitting.created_at.desc()).all()
+        rows = query.order_by(AIFitting.id.desc()).limit(limit + 1).all()
         
         return jsonify({
             'success': True,
-            'fittings': [fitting.to_dict() for fitting in fittings]
+            'fittings': [AIFitting.history_to_dict(row) for row in rows[:limit]],
+            'next_cursor': rows[limit - 1].id if len(rows) > limit else None
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
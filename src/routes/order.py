@@ -1,20 +1,48 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from src.models.user import db
-from src.models.order import Order, OrderItem
+from src.models.order import Order, OrderItem, OrderArchive, OrderItemArchive, OrderStats, ORDER_STATUSES, ORDER_STATUS_TRANSITIONS
 from src.models.cart import Cart, CartItem
 from src.models.product import Product
-from datetime import datetime
+from src.models.sales_rollup import SalesDailyRollup
+from src.stock_reservation_service import reservation_service
+from src.job_queue import job_queue
+from src.idempotency import idempotent
+from src.quote_engine import quote_engine, PriceLockError
+from src.security import admin_required
+from sqlalchemy import update, insert, bindparam, or_, select, literal, union_all
+from datetime import datetime, date, timedelta
 import uuid
+import csv
+import io
+import json
 
 order_bp = Blueprint('order', __name__)
 
+BULK_STATUS_MAX_UPDATES = 5000
+BULK_STATUS_CHUNK_SIZE = 500
+
+EXPORT_ORDER_COLUMNS = [
+    'order_number', 'created_at', 'status', 'payment_status', 'payment_method', 'user_id',
+    'shipping_name', 'shipping_city', 'shipping_country',
+    'total_amount', 'shipping_cost', 'tax_amount', 'discount_amount'
+]
+EXPORT_ITEM_COLUMNS = ['item_id', 'product_id', 'product_name', 'gold_karat', 'quantity', 'unit_price', 'line_total']
+EXPORT_BATCH_SIZE = 1000
+
 def generate_order_number():
     """Generate unique order number"""
     timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
     random_suffix = str(uuid.uuid4())[:8].upper()
     return f"ORD-{timestamp}-{random_suffix}"
 
+def order_not_found(order_id):
+    """404 for an unknown order, 409 for one moved to the archive (archived orders are read-only)"""
+    if db.session.get(OrderArchive, order_id):
+        return jsonify({'success': False, 'error': 'Order is archived and can no longer be changed'}), 409
+    return jsonify({'success': False, 'error': 'Order not found'}), 404
+
 @order_bp.route('/orders', methods=['POST'])
+@idempotent
 def create_order():
     """Create new order from cart"""
     try:
@@ -31,21 +59,58 @@ def create_order():
         else:
             cart = Cart.query.filter_by(session_id=session_id).first()
         
-        if not cart or not cart.items:
+        lines = [] if not cart else db.session.query(
+            CartItem.product_id, CartItem.quantity, CartItem.size, CartItem.custom_engraving
+        ).filter(CartItem.cart_id == cart.id).order_by(CartItem.id).all()
+        if not lines:
             return jsonify({'success': False, 'error': 'Cart is empty'}), 400
         
-        # Validate stock for all items
-        for item in cart.items:
-            if item.product.stock_quantity < item.quantity:
+        # Load every product in the cart with one IN query
+        quantities = {}
+        for line in lines:
+            quantities[line.product_id] = quantities.get(line.product_id, 0) + line.quantity
+        products = {
+            product.id: product
+            for product in db.session.query(
+                Product.id, Product.name, Product.price, Product.gold_karat,
+                Product.weight, Product.making_charge, Product.updated_at
+            ).filter(Product.id.in_(list(quantities)))
+        }
+        
+        # Unit prices: a valid price lock is used as is, otherwise quote the current gold price
+        if data.get('price_lock'):
+            try:
+                unit_prices = quote_engine.read_lock(data['price_lock'], cart.id)
+            except PriceLockError as e:
+                return jsonify({'success': False, 'error': str(e)}), 409
+            unlocked = [product_id for product_id in quantities if product_id not in unit_prices]
+            if unlocked:
                 return jsonify({
-                    'success': False, 
-                    'error': f'Insufficient stock for {item.product.name}'
-                }), 400
+                    'success': False,
+                    'error': 'Price lock does not cover every cart item',
+                    'unlocked_product_ids': unlocked
+                }), 409
+        else:
+            matrix = quote_engine.current_matrix()
+            unit_prices = {
+                product_id: quote_engine.quote_product(product, matrix)['unit_price']
+                for product_id, product in products.items()
+            }
         
-        # Calculate totals
-        subtotal = sum(item.quantity * item.product.price for item in cart.items)
+        # Convert the cart's stock holds (lines sharing a product are checked together)
+        failed_product_id = reservation_service.convert_cart_holds(cart.id, quantities)
+        if failed_product_id is not None:
+            db.session.rollback()
+            product = products.get(failed_product_id)
+            return jsonify({
+                'success': False, 
+                'error': f'Insufficient stock for {product.name if product else failed_product_id}'
+            }), 400
+        
+        # Calculate totals (VAT is computed here; a tax_amount sent by the client is ignored)
+        subtotal = round(sum(line.quantity * unit_prices[line.product_id] for line in lines), 2)
         shipping_cost = data.get('shipping_cost', 0)
-        tax_amount = data.get('tax_amount', 0)
+        tax_amount = quote_engine.vat(subtotal)
         discount_amount = data.get('discount_amount', 0)
         total_amount = subtotal + shipping_cost + tax_amount - discount_amount
         
@@ -69,27 +134,28 @@ def create_order():
         
         db.session.add(order)
         db.session.flush()  # Get order ID
+        OrderStats.record(new_status=order.status)
         
-        # Create order items
-        for cart_item in cart.items:
-            order_item = OrderItem(
-                order_id=order.id,
-                product_id=cart_item.product_id,
-                quantity=cart_item.quantity,
-                unit_price=cart_item.product.price,
-                size=cart_item.size,
-                custom_engraving=cart_item.custom_engraving
-            )
-            db.session.add(order_item)
-            
-            # Update product stock
-            cart_item.product.stock_quantity -= cart_item.quantity
+        # Create all order items with one bulk insert
+        db.session.execute(insert(OrderItem), [{
+            'order_id': order.id,
+            'product_id': line.product_id,
+            'quantity': line.quantity,
+            'unit_price': unit_prices[line.product_id],
+            'size': line.size,
+            'custom_engraving': line.custom_engraving
+        } for line in lines])
         
         # Clear cart
         CartItem.query.filter_by(cart_id=cart.id).delete()
         
+        # Post-checkout work runs in the job worker once this transaction commits
+        job_queue.enqueue('order_created', {'order_id': order.id})
+        
         db.session.commit()
         
+        # Reload with eager loading so serializing a large order stays a few queries
+        order = Order.query.options(*Order.detail_options()).populate_existing().filter_by(id=order.id).one()
         return jsonify({
             'success': True,
             'order': order.to_dict()
@@ -106,28 +172,58 @@ def get_orders():
         per_page = request.args.get('per_page', 10, type=int)
         user_id = request.args.get('user_id', type=int)
         status = request.args.get('status')
+        view = request.args.get('view', 'full')  # summary, full
         
-        query = Order.query
+        if view not in ('summary', 'full'):
+            return jsonify({'success': False, 'error': 'Invalid view'}), 400
         
-        if user_id:
-            query = query.filter(Order.user_id == user_id)
-        if status:
-            query = query.filter(Order.status == status)
+        page, per_page = max(page, 1), max(per_page, 1)
         
-        orders = query.order_by(Order.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        def filters(model):
+            conditions = []
+            if user_id:
+                conditions.append(model.user_id == user_id)
+            if status:
+                conditions.append(model.status == status)
+            return conditions
+        
+        # Archived orders stay in the history: page over the ids of both tables, newest first
+        listing = union_all(*[
+            select(model.id, model.created_at, literal(model is OrderArchive).label('archived')).where(*filters(model))
+            for model in (Order, OrderArchive)
+        ]).subquery()
+        total = db.session.scalar(select(db.func.count()).select_from(listing))
+        rows = db.session.execute(
+            select(listing.c.id, listing.c.archived)
+            .order_by(listing.c.created_at.desc(), listing.c.id.desc())
+            .limit(per_page).offset((page - 1) * per_page)
+        ).all()
+        
+        # Then load the page from each table with the view's query
+        orders = {}
+        for model in (Order, OrderArchive):
+            archived = model is OrderArchive
+            ids = [row.id for row in rows if bool(row.archived) == archived]
+            if not ids:
+                continue
+            if view == 'summary':
+                for order in model.summary_query().filter(model.id.in_(ids)):
+                    orders[(archived, order.id)] = model.summary_to_dict(order)
+            else:
+                for order in model.query.options(*model.detail_options()).filter(model.id.in_(ids)):
+                    orders[(archived, order.id)] = order.to_dict()
+        pages = -(-total // per_page)
         
         return jsonify({
             'success': True,
-            'orders': [order.to_dict() for order in orders.items],
+            'orders': [orders[(bool(row.archived), row.id)] for row in rows],
             'pagination': {
                 'page': page,
                 'per_page': per_page,
-                'total': orders.total,
-                'pages': orders.pages,
-                'has_next': orders.has_next,
-                'has_prev': orders.has_prev
+                'total': total,
+                'pages': pages,
+                'has_next': page < pages,
+                'has_prev': page > 1
             }
         })
     except Exception as e:
@@ -137,7 +233,12 @@ def get_orders():
 def get_order(order_id):
     """Get single order by ID"""
     try:
-        order = Order.query.get_or_404(order_id)
+        order = Order.query.options(*Order.detail_options()).get(order_id)
+        if not order:
+            # Fall through to archived orders
+            order = OrderArchive.query.get(order_id)
+        if not order:
+            return jsonify({'success': False, 'error': 'Order not found'}), 404
         
         return jsonify({
             'success': True,
@@ -150,14 +251,17 @@ def get_order(order_id):
 def update_order_status(order_id):
     """Update order status (Admin only)"""
     try:
-        order = Order.query.get_or_404(order_id)
+        order = db.session.get(Order, order_id)
+        if not order:
+            return order_not_found(order_id)
         data = request.get_json()
         
         new_status = data.get('status')
-        if new_status not in ['pending', 'confirmed', 'processing', 'shipped', 'delivered', 'cancelled']:
+        if new_status not in ORDER_STATUSES:
             return jsonify({'success': False, 'error': 'Invalid status'}), 400
         
-        order.status = new_status
+        if new_status != order.status and new_status not in ORDER_STATUS_TRANSITIONS.get(order.status, []):
+            return jsonify({'success': False, 'error': f'Invalid transition {order.status} -> {new_status}'}), 400
         
         # Update tracking info if provided
         if 'tracking_number' in data:
@@ -165,9 +269,19 @@ def update_order_status(order_id):
         if 'estimated_delivery' in data:
             order.estimated_delivery = datetime.fromisoformat(data['estimated_delivery'])
         
-        # Set delivered timestamp if status is delivered
-        if new_status == 'delivered':
-            order.delivered_at = datetime.utcnow()
+        # An unchanged status is not a change: no counters, no customer notification
+        if new_status != order.status:
+            OrderStats.record(order.status, new_status)
+            job_queue.enqueue('order_status_changed', {
+                'order_id': order.id,
+                'old_status': order.status,
+                'new_status': new_status
+            })
+            order.status = new_status
+            
+            # Set delivered timestamp if status is delivered
+            if new_status == 'delivered':
+                order.delivered_at = datetime.utcnow()
         
         db.session.commit()
         
@@ -179,23 +293,169 @@ def update_order_status(order_id):
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def apply_bulk_status_chunk(entries):
+    """Validate and apply one chunk of bulk status updates in a single transaction.
+    
+    The chunk's orders are loaded (and locked where supported) with one query,
+    then all valid rows are written with one executemany UPDATE. Returns a
+    result dict per entry, in input order.
+    """
+    order_ids = [entry['order_id'] for entry in entries if entry.get('order_id') is not None]
+    order_numbers = [entry['order_number'] for entry in entries if entry.get('order_number')]
+    
+    rows = db.session.query(Order.id, Order.order_number, Order.status).filter(
+        or_(Order.id.in_(order_ids), Order.order_number.in_(order_numbers))
+    ).with_for_update().all()
+    by_id = {row.id: row for row in rows}
+    by_number = {row.order_number: row for row in rows}
+    
+    now = datetime.utcnow()
+    results = []
+    params = []
+    transitions = {}
+    seen = set()
+    
+    for entry in entries:
+        ref = entry.get('order_id') if entry.get('order_id') is not None else entry.get('order_number')
+        result = {'order': ref, 'success': False}
+        results.append(result)
+        
+        row = by_id.get(entry.get('order_id')) or by_number.get(entry.get('order_number'))
+        if not row:
+            result['error'] = 'Order not found'
+            continue
+        result['order_id'] = row.id
+        if row.id in seen:
+            result['error'] = 'Duplicate order in request'
+            continue
+        seen.add(row.id)
+        
+        new_status = entry.get('status')
+        if new_status not in ORDER_STATUSES:
+            result['error'] = 'Invalid status'
+            continue
+        if new_status != row.status and new_status not in ORDER_STATUS_TRANSITIONS.get(row.status, []):
+            result['error'] = f'Invalid transition {row.status} -> {new_status}'
+            continue
+        
+        try:
+            estimated_delivery = entry.get('estimated_delivery')
+            estimated_delivery = datetime.fromisoformat(estimated_delivery) if estimated_delivery else None
+        except (TypeError, ValueError):
+            result['error'] = 'Invalid estimated_delivery'
+            continue
+        
+        params.append({
+            'b_id': row.id,
+            'b_status': new_status,
+            'b_tracking_number': entry.get('tracking_number'),
+            'b_estimated_delivery': estimated_delivery,
+            'b_delivered_at': now if new_status == 'delivered' and row.status != 'delivered' else None
+        })
+        transitions.setdefault((row.status, new_status), []).append(row.id)
+        result.update({'success': True, 'old_status': row.status, 'status': new_status})
+    
+    if params:
+        # Fields that are not supplied keep their current value
+        db.session.execute(
+            update(Order.__table__)
+            .where(Order.__table__.c.id == bindparam('b_id'))
+            .values(
+                status=bindparam('b_status'),
+                tracking_number=db.func.coalesce(bindparam('b_tracking_number'), Order.__table__.c.tracking_number),
+                estimated_delivery=db.func.coalesce(bindparam('b_estimated_delivery'), Order.__table__.c.estimated_delivery),
+                delivered_at=db.func.coalesce(bindparam('b_delivered_at'), Order.__table__.c.delivered_at),
+                updated_at=now
+            ),
+            params
+        )
+        
+        for (old_status, new_status), changed_ids in transitions.items():
+            OrderStats.record(old_status, new_status, count=len(changed_ids))
+        job_queue.enqueue_many('order_status_changed', [
+            {'order_id': order_id, 'old_status': old_status, 'new_status': new_status}
+            for (old_status, new_status), changed_ids in transitions.items()
+            for order_id in changed_ids
+        ])
+    
+    db.session.commit()
+    return results
+
+@order_bp.route('/orders/bulk-status', methods=['PUT'])
+@admin_required
+def bulk_update_order_status():
+    """Update the status of many orders at once (Admin only)"""
+    try:
+        data = request.get_json()
+        updates = data.get('updates') if data else None
+        
+        if not isinstance(updates, list) or not updates:
+            return jsonify({'success': False, 'error': 'updates list required'}), 400
+        if len(updates) > BULK_STATUS_MAX_UPDATES:
+            return jsonify({
+                'success': False,
+                'error': f'At most {BULK_STATUS_MAX_UPDATES} updates per request'
+            }), 400
+        if not all(isinstance(entry, dict) for entry in updates):
+            return jsonify({'success': False, 'error': 'Each update must be an object'}), 400
+        
+        results = []
+        for start in range(0, len(updates), BULK_STATUS_CHUNK_SIZE):
+            chunk = updates[start:start + BULK_STATUS_CHUNK_SIZE]
+            try:
+                results.extend(apply_bulk_status_chunk(chunk))
+            except Exception as e:
+                # Chunks are independent transactions; earlier chunks stay applied
+                db.session.rollback()
+                results.extend({
+                    'order': entry.get('order_id') if entry.get('order_id') is not None else entry.get('order_number'),
+                    'success': False,
+                    'error': str(e)
+                } for entry in chunk)
+        
+        updated = sum(1 for result in results if result['success'])
+        
+        return jsonify({
+            'success': True,
+            'updated': updated,
+            'failed': len(results) - updated,
+            'results': results
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @order_bp.route('/orders/<int:order_id>/payment', methods=['PUT'])
+@idempotent
 def update_payment_status(order_id):
     """Update payment status"""
     try:
-        order = Order.query.get_or_404(order_id)
+        order = db.session.get(Order, order_id)
+        if not order:
+            return order_not_found(order_id)
         data = request.get_json()
         
         new_payment_status = data.get('payment_status')
         if new_payment_status not in ['pending', 'paid', 'failed', 'refunded']:
             return jsonify({'success': False, 'error': 'Invalid payment status'}), 400
         
+        old_payment_status = order.payment_status
+        old_status = order.status
         order.payment_status = new_payment_status
         
         # If payment is confirmed, update order status
         if new_payment_status == 'paid' and order.status == 'pending':
             order.status = 'confirmed'
         
+        # Keep revenue counters and daily sales rollups in step with the paid state
+        was_paid, is_paid = old_payment_status == 'paid', new_payment_status == 'paid'
+        if was_paid != is_paid:
+            sign = 1 if is_paid else -1
+            OrderStats.record(old_status, order.status, sign * (order.total_amount - (order.tax_amount or 0)))
+            SalesDailyRollup.record_order(order, sign)
+        else:
+            OrderStats.record(old_status, order.status)
+        
         db.session.commit()
         
         return jsonify({
@@ -210,7 +470,12 @@ def update_payment_status(order_id):
 def track_order(order_number):
     """Track order by order number"""
     try:
-        order = Order.query.filter_by(order_number=order_number).first_or_404()
+        order = Order.query.filter_by(order_number=order_number).first()
+        if not order:
+            # Fall through to archived orders
+            order = OrderArchive.query.filter_by(order_number=order_number).first()
+        if not order:
+            return jsonify({'success': False, 'error': 'Order not found'}), 404
         
         return jsonify({
             'success': True,
@@ -228,34 +493,123 @@ def track_order(order_number):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @order_bp.route('/orders/stats', methods=['GET'])
+@admin_required
 def get_order_stats():
     """Get order statistics (Admin only)"""
     try:
-        total_orders = Order.query.count()
-        pending_orders = Order.query.filter_by(status='pending').count()
-        confirmed_orders = Order.query.filter_by(status='confirmed').count()
-        processing_orders = Order.query.filter_by(status='processing').count()
-        shipped_orders = Order.query.filter_by(status='shipped').count()
-        delivered_orders = Order.query.filter_by(status='delivered').count()
-        cancelled_orders = Order.query.filter_by(status='cancelled').count()
-        
-        total_revenue = db.session.query(db.func.sum(Order.total_amount)).filter(
-            Order.payment_status == 'paid'
-        ).scalar() or 0
+        # Served from the materialized counters
+        stats = OrderStats.get_stats()
         
         return jsonify({
             'success': True,
-            'stats': {
-                'total_orders': total_orders,
-                'pending_orders': pending_orders,
-                'confirmed_orders': confirmed_orders,
-                'processing_orders': processing_orders,
-                'shipped_orders': shipped_orders,
-                'delivered_orders': delivered_orders,
-                'cancelled_orders': cancelled_orders,
-                'total_revenue': total_revenue
-            }
+            'stats': stats
         })
     except Exception as e:
+        db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@order_bp.route('/orders/stats/rebuild', methods=['POST'])
+@admin_required
+def rebuild_order_stats():
+    """Recompute the order statistics counters from the orders (Admin only)"""
+    try:
+        stats = OrderStats.rebuild()
+        
+        return jsonify({
+            'success': True,
+            'stats': stats
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def export_rows(start_date, end_date, payment_status):
+    """Yield one flat dict per order line, archived orders first, from server-side cursors"""
+    for order_model, item_model in ((OrderArchive, OrderItemArchive), (Order, OrderItem)):
+        statement = select(
+            *[getattr(order_model, column) for column in EXPORT_ORDER_COLUMNS],
+            order_model.id.label('order_id'),
+            item_model.id.label('item_id'),
+            item_model.product_id,
+            Product.name_en.label('product_name'),
+            Product.gold_karat,
+            item_model.quantity,
+            item_model.unit_price
+        ).join(item_model, item_model.order_id == order_model.id).outerjoin(
+            Product, Product.id == item_model.product_id
+        ).where(
+            order_model.created_at >= datetime.combine(start_date, datetime.min.time()),
+            order_model.created_at < datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+        ).order_by(order_model.id, item_model.id)
+        if payment_status != 'all':
+            statement = statement.where(order_model.payment_status == payment_status)
+        
+        # yield_per streams from a server-side cursor instead of buffering the result
+        result = db.session.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for row in result.mappings():
+            line = dict(row)
+            line['created_at'] = line['created_at'].isoformat() if line['created_at'] else None
+            line['line_total'] = line['quantity'] * line['unit_price']
+            yield line
+
+def export_csv(rows):
+    """One CSV row per order line, flushed in batches"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_ORDER_COLUMNS + EXPORT_ITEM_COLUMNS)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([row[column] for column in EXPORT_ORDER_COLUMNS + EXPORT_ITEM_COLUMNS])
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def export_ndjson(rows):
+    """One JSON object per order with its lines nested (rows arrive grouped by order)"""
+    order = None
+    for row in rows:
+        if order is None or order['order_id'] != row['order_id']:
+            if order is not None:
+                yield json.dumps(order, ensure_ascii=False) + '\n'
+            order = {column: row[column] for column in EXPORT_ORDER_COLUMNS}
+            order['order_id'] = row['order_id']
+            order['items'] = []
+        order['items'].append({column: row[column] for column in EXPORT_ITEM_COLUMNS})
+    if order is not None:
+        yield json.dumps(order, ensure_ascii=False) + '\n'
+
+@order_bp.route('/orders/export', methods=['GET'])
+@admin_required
+def export_orders():
+    """Stream orders with their line items as CSV or NDJSON (Admin only)"""
+    try:
+        export_format = request.args.get('format', 'csv')  # csv, ndjson
+        payment_status = request.args.get('payment_status', 'paid')  # pending, paid, failed, refunded, all
+        end = request.args.get('end')
+        start = request.args.get('start')
+        
+        if export_format not in ('csv', 'ndjson'):
+            return jsonify({'success': False, 'error': 'Invalid format'}), 400
+        if payment_status not in ('pending', 'paid', 'failed', 'refunded', 'all'):
+            return jsonify({'success': False, 'error': 'Invalid payment status'}), 400
+        
+        end_date = date.fromisoformat(end) if end else date.today()
+        start_date = date.fromisoformat(start) if start else end_date.replace(day=1)
+        
+        rows = export_rows(start_date, end_date, payment_status)
+        if export_format == 'csv':
+            body, mimetype = export_csv(rows), 'text/csv'
+        else:
+            body, mimetype = export_ndjson(rows), 'application/x-ndjson'
+        
+        filename = f"orders-{start_date.isoformat()}-{end_date.isoformat()}.{export_format}"
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
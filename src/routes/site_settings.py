@@ -1,7 +1,8 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.site_settings import SiteSettings, db
 from src.models.user import User
+from src.site_settings_cache import site_settings_cache
 from src.security import admin_required, sanitize_input, log_security_event, limiter
 
 site_settings_bp = Blueprint('site_settings', __name__)
@@ -10,36 +11,13 @@ site_settings_bp = Blueprint('site_settings', __name__)
 def get_site_settings():
     """Get current site settings (public endpoint for frontend)"""
     try:
-        settings = SiteSettings.get_settings()
+        # Served from memory until the settings row changes
+        body, etag = site_settings_cache.get()
         
-        # Return only public settings for frontend
-        public_settings = {
-            'site_name': settings.site_name,
-            'site_title': settings.site_title,
-            'site_description': settings.site_description,
-            'site_keywords': settings.site_keywords,
-            'site_logo': settings.site_logo,
-            'site_favicon': settings.site_favicon,
-            'contact_email': settings.contact_email,
-            'contact_phone': settings.contact_phone,
-            'contact_whatsapp': settings.contact_whatsapp,
-            'contact_address': settings.contact_address,
-            'facebook_url': settings.facebook_url,
-            'instagram_url': settings.instagram_url,
-            'twitter_url': settings.twitter_url,
-            'youtube_url': settings.youtube_url,
-            'tiktok_url': settings.tiktok_url,
-            'business_hours': settings.business_hours,
-            'currency': settings.currency,
-            'language': settings.language,
-            'newsletter_enabled': settings.newsletter_enabled,
-            'newsletter_title': settings.newsletter_title,
-            'newsletter_description': settings.newsletter_description,
-            'maintenance_mode': settings.maintenance_mode,
-            'maintenance_message': settings.maintenance_message
-        }
-        
-        return jsonify(public_settings), 200
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'  # Revalidate with the ETag so admin edits show at once
+        return response.make_conditional(request)
         
     except Exception as e:
         log_security_event('settings_error', details={'error': str(e)})
@@ -77,6 +55,7 @@ def update_site_settings():
         
         # Update settings
         settings.update_settings(data, current_user_id)
+        site_settings_cache.invalidate()
         
         # Log the update
         log_security_event('settings_updated', user_id=current_user_id, details={'updated_fields': list(data.keys())})
@@ -124,6 +103,7 @@ def update_seo_settings():
         
         # Update SEO settings
         settings.update_settings(seo_data, current_user_id)
+        site_settings_cache.invalidate()
         
         # Log the update
         log_security_event('seo_settings_updated', user_id=current_user_id, details={'updated_fields': list(seo_data.keys())})
@@ -183,6 +163,7 @@ def update_social_settings():
         
         # Update social settings
         settings.update_settings(social_data, current_user_id)
+        site_settings_cache.invalidate()
         
         # Log the update
         log_security_event('social_settings_updated', user_id=current_user_id, details={'updated_fields': list(social_data.keys())})
@@ -219,6 +200,7 @@ def toggle_maintenance_mode():
             'maintenance_mode': maintenance_mode,
             'maintenance_message': maintenance_message
         }, current_user_id)
+        site_settings_cache.refresh(force=True)  # Flip this worker's maintenance gate right away
         
         # Log the change
         log_security_event('maintenance_mode_changed', user_id=current_user_id, details={
@@ -284,6 +266,7 @@ def restore_settings():
         
         # Restore settings
         settings.update_settings(backup_data, current_user_id)
+        site_settings_cache.invalidate()
         
         # Log the restore
         log_security_event('settings_restored', user_id=current_user_id, details={'restored_fields': list(backup_data.keys())})
@@ -2,6 +2,9 @@ import os
 import re
 import hashlib
 import secrets
+import time
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify, current_app
@@ -62,9 +65,12 @@ def init_security(app):
     def check_if_token_revoked(jwt_header, jwt_payload):
         jti = jwt_payload['jti']
         if redis_client:
-            return redis_client.get(f"blacklist:{jti}") is not None
-        else:
-            return jti in blacklisted_tokens
+            if redis_client.get(f"blacklist:{jti}") is not None:
+                return True
+        elif jti in blacklisted_tokens:
+            return True
+        # Tokens issued before the user's last security version bump are revoked too
+        return not token_is_current(jwt_payload)
 
 def hash_password(password):
     """Hash a password using bcrypt"""
@@ -131,16 +137,75 @@ def rate_limit_by_user():
         return decorated_function
     return decorator
 
+class UserAuthCache:
+    """Short-lived cache of each user's (is_admin, is_active, security_version, name, email).
+    
+    Authorization reads these on every authenticated request; the cache
+    answers them from memory for `ttl_seconds` after one small query. A
+    security version bump, deactivation or role change made in this process
+    calls invalidate() and applies at once; other processes see it once
+    their entry expires.
+    """
+    
+    def __init__(self, ttl_seconds=30, max_entries=10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # user_id -> (expires_at, state)
+        self._lock = threading.Lock()
+    
+    def get(self, user_id):
+        """The user's auth state row, or None if the user does not exist"""
+        user_id = int(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > now:
+                return entry[1]
+        
+        from src.models.user import User, db
+        state = db.session.query(
+            User.is_admin, User.is_active, User.security_version, User.name, User.email
+        ).filter(User.id == user_id).first()
+        
+        ttl = current_app.config.get('AUTH_CACHE_TTL_SECONDS', self.ttl_seconds)
+        with self._lock:
+            self._entries[user_id] = (now + ttl, state)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return state
+    
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(int(user_id), None)
+
+# Shared user auth cache instance
+user_auth_cache = UserAuthCache()
+
+def create_user_token(user):
+    """Access token carrying the user's role and security version as claims"""
+    return create_access_token(
+        identity=str(user.id),  # PyJWT only accepts string subjects
+        additional_claims={'is_admin': bool(user.is_admin), 'security_version': user.security_version},
+        expires_delta=timedelta(hours=24)
+    )
+
+def token_is_current(claims):
+    """Whether the token's user is still active and its security version not superseded"""
+    state = user_auth_cache.get(claims['sub'])
+    return bool(state and state.is_active and claims.get('security_version') == state.security_version)
+
 def admin_required(f):
     """Decorator to require admin privileges"""
     @wraps(f)
     @jwt_required()
     def decorated_function(*args, **kwargs):
-        current_user_id = get_jwt_identity()
-        # Check if user is admin (implement based on your user model)
-        from src.models.user import User
-        user = User.query.get(current_user_id)
-        if not user or not user.is_admin:
+        # The role claim rejects customers without a lookup; the cached state
+        # catches admins demoted since the token was issued
+        if not get_jwt().get('is_admin'):
+            return jsonify({'error': 'صلاحيات المدير مطلوبة'}), 403
+        state = user_auth_cache.get(get_jwt_identity())
+        if not state or not state.is_admin:
             return jsonify({'error': 'صلاحيات المدير مطلوبة'}), 403
         return f(*args, **kwargs)
     return decorated_function
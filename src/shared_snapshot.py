@@ -0,0 +1,132 @@
+import os
+import json
+import mmap
+import struct
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; every process is its own leader there
+    fcntl = None
+
+# Header: sequence number (odd while a write is in progress) and payload length
+HEADER = struct.Struct('<QI')
+
+class SharedSnapshot:
+    """A JSON document shared by all worker processes through a memory-mapped file.
+    
+    Writes are guarded by a sequence lock: the writer makes the sequence odd,
+    writes the payload, then makes it even again. Readers never take a lock;
+    they retry if the sequence was odd or changed while they were reading, and
+    they only decode the payload again when the sequence has moved. There
+    must be a single writer (see LeaderLock).
+    """
+    
+    READ_ATTEMPTS = 10000
+    
+    def __init__(self, path, size=65536):
+        self.path = path
+        self.size = size
+        self._map = None
+        self._open_lock = threading.Lock()
+        self._cached_seq = None
+        self._cached_value = None
+    
+    def _mapping(self):
+        if self._map is None:
+            with self._open_lock:
+                if self._map is None:
+                    fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                    try:
+                        if os.fstat(fd).st_size < self.size:
+                            os.ftruncate(fd, self.size)
+                        self._map = mmap.mmap(fd, self.size)  # Shared, read/write mapping
+                    finally:
+                        os.close(fd)
+        return self._map
+    
+    def sequence(self):
+        """Current write sequence (even when idle; 0 if nothing was ever written)"""
+        return HEADER.unpack_from(self._mapping(), 0)[0]
+    
+    def read(self):
+        """Latest published value, or None if nothing was published yet"""
+        mapping = self._mapping()
+        for _ in range(self.READ_ATTEMPTS):
+            seq, length = HEADER.unpack_from(mapping, 0)
+            if seq == 0:
+                return None
+            if seq == self._cached_seq:
+                return self._cached_value
+            if seq % 2:
+                continue  # Write in progress
+            payload = mapping[HEADER.size:HEADER.size + length]
+            if HEADER.unpack_from(mapping, 0)[0] != seq:
+                continue  # Overwritten while copying
+            value = json.loads(payload)
+            self._cached_seq, self._cached_value = seq, value
+            return value
+        # A writer died mid-write; serve the last value read until the next write
+        return self._cached_value
+    
+    def write(self, value):
+        payload = json.dumps(value).encode()
+        if HEADER.size + len(payload) > self.size:
+            raise ValueError(f'Snapshot of {len(payload)} bytes does not fit in {self.path}')
+        
+        mapping = self._mapping()
+        seq = HEADER.unpack_from(mapping, 0)[0]
+        seq += 2 if seq % 2 == 0 else 1
+        HEADER.pack_into(mapping, 0, seq - 1, 0)
+        mapping[HEADER.size:HEADER.size + len(payload)] = payload
+        HEADER.pack_into(mapping, 0, seq, len(payload))
+
+class LeaderLock:
+    """Non-blocking exclusive file lock electing one leader process.
+    
+    Once acquired the lock is held until the process exits, at which point
+    the operating system releases it and another process can take over.
+    A forked child never inherits leadership.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+    
+    def _reset_after_fork(self):
+        # The child shares the parent's lock; closing its copy keeps the parent's lock held
+        if self._fd is not None and self._fd >= 0:
+            os.close(self._fd)
+        self._fd = None
+        self._pid = None
+        self._lock = threading.Lock()
+    
+    def is_leader(self):
+        return self._fd is not None and self._pid == os.getpid()
+    
+    def acquire(self):
+        """Become the leader if no other process is; returns whether this process leads"""
+        if self.is_leader():
+            return True
+        if fcntl is None:
+            self._pid = os.getpid()
+            self._fd = -1
+            return True
+        
+        with self._lock:
+            if self.is_leader():
+                return True
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            os.ftruncate(fd, 0)
+            os.write(fd, str(os.getpid()).encode())
+            self._fd, self._pid = fd, os.getpid()
+            return True
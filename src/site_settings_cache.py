@@ -0,0 +1,92 @@
+import json
+import time
+import hashlib
+import threading
+from src.models.user import db
+from src.models.site_settings import SiteSettings
+
+class SiteSettingsCache:
+    """The public site settings, serialized once per settings version.
+    
+    Every write to the settings row bumps SiteSettings.version. Each worker
+    reads just that column at most every `check_interval_seconds` and only
+    loads and re-serializes the row when it changed; in between, requests
+    are answered from memory with a precomputed ETag and no query at all.
+    Writes through this process call invalidate() so they show up on the
+    next request; other workers pick them up on their next check.
+    """
+    
+    def __init__(self, check_interval_seconds=2):
+        self.check_interval_seconds = check_interval_seconds
+        self.version = None
+        self.response = None  # (body, etag)
+        self.maintenance_mode = False
+        self.maintenance_message = None
+        self.maintenance_body = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self._watcher_thread = None
+        self._watcher_lock = threading.Lock()
+    
+    def _rebuild(self):
+        settings = SiteSettings.get_settings()
+        public_settings = settings.to_public_dict()
+        body = json.dumps(public_settings, ensure_ascii=False, separators=(',', ':'))
+        self.response = (body, hashlib.sha1(body.encode()).hexdigest())
+        self.maintenance_mode = bool(settings.maintenance_mode)
+        self.maintenance_message = settings.maintenance_message
+        self.maintenance_body = json.dumps(
+            {'error': settings.maintenance_message or 'الموقع تحت الصيانة، سنعود قريباً', 'maintenance_mode': True},
+            ensure_ascii=False
+        ).encode()
+        self.version = settings.version
+    
+    def refresh(self, force=False):
+        """Reload the settings if the row changed since the last check (at most once per interval)"""
+        with self._lock:
+            now = time.monotonic()
+            if force or self._checked_at is None or now - self._checked_at >= self.check_interval_seconds:
+                version = db.session.query(SiteSettings.version).order_by(SiteSettings.id).limit(1).scalar()
+                if version is None or version != self.version:
+                    self._rebuild()
+                self._checked_at = now
+    
+    def get(self):
+        """(body, etag) of the public settings"""
+        if self._watcher_thread is None or self._checked_at is None:
+            self.refresh()  # The watcher keeps the cache checked otherwise
+        return self.response
+    
+    def invalidate(self):
+        """Check the settings version again on the next request"""
+        with self._lock:
+            self._checked_at = None
+    
+    def start_watcher(self, app):
+        """Start the background thread checking the settings version (once per process).
+        
+        With the watcher running, requests find the cache already checked and
+        the maintenance flag current without touching the database.
+        """
+        with self._watcher_lock:
+            if self._watcher_thread and self._watcher_thread.is_alive():
+                return
+            
+            interval = app.config.get('SITE_SETTINGS_CHECK_SECONDS', self.check_interval_seconds)
+            self.check_interval_seconds = interval
+            
+            def watch_loop():
+                while True:
+                    with app.app_context():
+                        try:
+                            self.refresh(force=True)
+                        except Exception as e:
+                            db.session.rollback()
+                            print(f"Site settings watcher error: {e}")
+                    time.sleep(interval)
+            
+            self._watcher_thread = threading.Thread(target=watch_loop, daemon=True)
+            self._watcher_thread.start()
+
+# Shared site settings cache instance
+site_settings_cache = SiteSettingsCache()
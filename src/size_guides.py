@@ -0,0 +1,67 @@
+import json
+import time
+import hashlib
+import threading
+from src.models.user import db
+from src.models.gold_price import SizeGuide
+
+class SizeGuideCache:
+    """Active size guides, grouped by category and serialized once per table version.
+    
+    The table version is a single aggregate query (row count, highest id and
+    latest updated_at), run at most every `check_interval_seconds`; while it
+    is unchanged every request is served from memory with a precomputed
+    ETag. Writes through this process call invalidate() so they show up on
+    the next request; other processes pick them up on their next check.
+    """
+    
+    def __init__(self, check_interval_seconds=5):
+        self.check_interval_seconds = check_interval_seconds
+        self.version = None
+        self.responses = {}  # category (None for all) -> (body, etag)
+        self._checked_at = None
+        self._lock = threading.Lock()
+    
+    def _table_version(self):
+        count, max_id, updated_at = db.session.query(
+            db.func.count(SizeGuide.id), db.func.max(SizeGuide.id), db.func.max(SizeGuide.updated_at)
+        ).one()
+        return f"{count}:{max_id}:{updated_at}"
+    
+    def _serialize(self, sizes):
+        body = json.dumps({'success': True, 'sizes': sizes}, ensure_ascii=False, separators=(',', ':'))
+        return body, hashlib.sha1(body.encode()).hexdigest()
+    
+    def _rebuild(self, version):
+        sizes = [size.to_dict() for size in SizeGuide.query.filter_by(is_active=True).order_by(
+            SizeGuide.size_value.asc(), SizeGuide.id.asc()
+        )]
+        by_category = {}
+        for size in sizes:
+            by_category.setdefault(size['category'], []).append(size)
+        responses = {category: self._serialize(entries) for category, entries in by_category.items()}
+        responses[None] = self._serialize(sizes)
+        self.responses = responses
+        self.version = version
+    
+    def get(self, category=None):
+        """(body, etag) of the active sizes for `category` (all categories when None)"""
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is None or now - self._checked_at >= self.check_interval_seconds:
+                version = self._table_version()
+                if version != self.version:
+                    self._rebuild(version)
+                self._checked_at = now
+            response = self.responses.get(category)
+            if response is None:
+                response = self._serialize([])
+            return response
+    
+    def invalidate(self):
+        """Check the table version again on the next request"""
+        with self._lock:
+            self._checked_at = None
+
+# Shared size guide cache instance
+size_guide_cache = SizeGuideCache()
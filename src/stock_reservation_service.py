@@ -0,0 +1,228 @@
+from datetime import datetime, timedelta
+import time
+import threading
+from flask import current_app
+from sqlalchemy import update, delete, bindparam
+from src.models.user import db
+from src.models.product import Product
+from src.models.cart import CartItem, StockHold
+
+class StockReservationService:
+    """Time-limited stock holds for carts.
+    
+    Every hold is mirrored in products.reserved_quantity, which is only ever
+    changed through conditional UPDATE statements, so available stock is
+    simply stock_quantity - reserved_quantity on the product row.
+    """
+    
+    def __init__(self, hold_minutes=15, reaper_interval_seconds=60, reaper_batch_size=500):
+        self.hold_minutes = hold_minutes
+        self.reaper_interval_seconds = reaper_interval_seconds
+        self.reaper_batch_size = reaper_batch_size
+        self._reaper_thread = None
+        self._reaper_lock = threading.Lock()
+    
+    def hold_expiry(self):
+        """Expiry timestamp for a hold created or extended now"""
+        minutes = current_app.config.get('STOCK_HOLD_MINUTES', self.hold_minutes)
+        return datetime.utcnow() + timedelta(minutes=minutes)
+    
+    def cart_quantities(self, cart_id):
+        """Total quantity per product across all lines of a cart"""
+        rows = db.session.query(CartItem.product_id, db.func.sum(CartItem.quantity)).filter(
+            CartItem.cart_id == cart_id
+        ).group_by(CartItem.product_id).all()
+        return {product_id: int(quantity) for product_id, quantity in rows}
+    
+    def _claim_hold(self, cart_id, product_id, expires_at):
+        """Extend an existing hold so the reaper can no longer release it.
+        
+        Returns (hold_id, held_quantity), or (None, 0) if there is no hold or the
+        reaper released it first.
+        """
+        hold = db.session.query(StockHold.id, StockHold.quantity).filter_by(
+            cart_id=cart_id, product_id=product_id
+        ).first()
+        if not hold:
+            return None, 0
+        
+        result = db.session.execute(
+            update(StockHold)
+            .where(StockHold.id == hold.id)
+            .values(expires_at=expires_at)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            return None, 0
+        return hold.id, hold.quantity
+    
+    def _adjust_reserved(self, product_id, delta):
+        """Add delta to a product's reserved quantity; growth must fit in free stock"""
+        statement = update(Product).where(Product.id == product_id)
+        if delta > 0:
+            statement = statement.where(Product.stock_quantity - Product.reserved_quantity >= delta)
+        result = db.session.execute(
+            statement
+            .values(reserved_quantity=Product.reserved_quantity + delta)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+    
+    def sync_hold(self, cart_id, product_id):
+        """Make the cart's hold on a product match its cart lines and restart the timer.
+        
+        Returns False if there is not enough unreserved stock for the increase.
+        The caller owns the transaction and must roll back on failure.
+        """
+        wanted = self.cart_quantities(cart_id).get(product_id, 0)
+        expires_at = self.hold_expiry()
+        hold_id, held = self._claim_hold(cart_id, product_id, expires_at)
+        
+        delta = wanted - held
+        if delta and not self._adjust_reserved(product_id, delta):
+            return False
+        
+        if hold_id and wanted == 0:
+            db.session.execute(delete(StockHold).where(StockHold.id == hold_id))
+        elif hold_id:
+            db.session.execute(
+                update(StockHold)
+                .where(StockHold.id == hold_id)
+                .values(quantity=wanted)
+                .execution_options(synchronize_session=False)
+            )
+        elif wanted:
+            db.session.add(StockHold(
+                cart_id=cart_id,
+                product_id=product_id,
+                quantity=wanted,
+                expires_at=expires_at
+            ))
+        return True
+    
+    def hold_cart(self, cart_id):
+        """(Re)hold every product in a cart; returns the product ids that could not be held"""
+        failed = []
+        for product_id in sorted(self.cart_quantities(cart_id)):
+            if not self.sync_hold(cart_id, product_id):
+                failed.append(product_id)
+        return failed
+    
+    def release_cart_holds(self, cart_id):
+        """Release every hold of a cart (e.g. when it is cleared)"""
+        holds = db.session.query(StockHold.id, StockHold.product_id, StockHold.quantity).filter(
+            StockHold.cart_id == cart_id
+        ).order_by(StockHold.product_id).all()
+        for hold_id, product_id, quantity in holds:
+            result = db.session.execute(delete(StockHold).where(StockHold.id == hold_id))
+            if result.rowcount == 1:
+                self._adjust_reserved(product_id, -quantity)
+    
+    def convert_cart_holds(self, cart_id, quantities):
+        """Turn a cart's holds into stock decrements at checkout.
+        
+        `quantities` maps product_id to the quantity being ordered. The cart's
+        holds are claimed and consumed with one UPDATE and one DELETE, then every
+        product is written by a single executemany UPDATE (ascending id order)
+        that consumes the hold and decrements stock, so a line covered by a live
+        hold always succeeds and a line whose hold expired is validated against
+        unreserved stock only. Holds on products no longer in the cart are
+        released by the same statement. Returns the first product id that could
+        not be fulfilled, or None.
+        """
+        # Extending the holds stops the reaper from releasing them under us
+        db.session.execute(
+            update(StockHold)
+            .where(StockHold.cart_id == cart_id)
+            .values(expires_at=self.hold_expiry())
+            .execution_options(synchronize_session=False)
+        )
+        holds = {
+            hold.product_id: hold
+            for hold in db.session.query(StockHold.id, StockHold.product_id, StockHold.quantity).filter(
+                StockHold.cart_id == cart_id
+            )
+        }
+        if holds:
+            db.session.execute(delete(StockHold).where(StockHold.id.in_([hold.id for hold in holds.values()])))
+        
+        params = [{
+            'b_id': product_id,
+            'b_quantity': quantities.get(product_id, 0),
+            'b_held': holds[product_id].quantity if product_id in holds else 0
+        } for product_id in sorted(set(quantities) | set(holds))]
+        if not params:
+            return None
+        
+        products = Product.__table__
+        statement = (
+            update(products)
+            .where(
+                products.c.id == bindparam('b_id'),
+                products.c.stock_quantity - products.c.reserved_quantity + bindparam('b_held') >= bindparam('b_quantity')
+            )
+            .values(
+                stock_quantity=products.c.stock_quantity - bindparam('b_quantity'),
+                reserved_quantity=products.c.reserved_quantity - bindparam('b_held')
+            )
+        )
+        
+        if db.session.get_bind().dialect.supports_sane_multi_rowcount:
+            savepoint = db.session.begin_nested()
+            result = db.session.execute(statement, params)
+            if result.rowcount == len(params):
+                savepoint.commit()
+                return None
+            # Some product is short; redo the rows one by one to find which
+            savepoint.rollback()
+        
+        for row in params:
+            if db.session.execute(statement, row).rowcount != 1:
+                return row['b_id']
+        return None
+    
+    def release_expired_holds(self, batch_size=None):
+        """Release one batch of expired holds and commit; returns how many were released"""
+        batch_size = batch_size or self.reaper_batch_size
+        now = datetime.utcnow()
+        expired = db.session.query(StockHold.id, StockHold.product_id, StockHold.quantity).filter(
+            StockHold.expires_at < now
+        ).order_by(StockHold.product_id).limit(batch_size).all()
+        
+        released = 0
+        for hold_id, product_id, quantity in expired:
+            # A checkout or cart update may have consumed or extended the hold meanwhile
+            result = db.session.execute(
+                delete(StockHold).where(StockHold.id == hold_id, StockHold.expires_at < now)
+            )
+            if result.rowcount == 1:
+                self._adjust_reserved(product_id, -quantity)
+                released += 1
+        
+        db.session.commit()
+        return released
+    
+    def start_reaper(self, app):
+        """Start the background thread releasing expired holds (once per process)"""
+        with self._reaper_lock:
+            if self._reaper_thread and self._reaper_thread.is_alive():
+                return
+            
+            interval = app.config.get('STOCK_HOLD_REAPER_INTERVAL_SECONDS', self.reaper_interval_seconds)
+            
+            def reap_loop():
+                while True:
+                    with app.app_context():
+                        try:
+                            while self.release_expired_holds() >= self.reaper_batch_size:
+                                pass
+                        except Exception as e:
+                            db.session.rollback()
+                            print(f"Stock hold reaper error: {e}")
+                    time.sleep(interval)
+            
+            self._reaper_thread = threading.Thread(target=reap_loop, daemon=True)
+            self._reaper_thread.start()
+
+# Shared service instance
+reservation_service = StockReservationService()